@@ -305,6 +305,8 @@ if (supabase) {
             { event: 'INSERT', schema: 'public', table: 'system_remote_commands' },
             async (payload) => {
                 const { id, server_name, command } = payload.new;
+                // Other WhatsApp commands (pause, resend-order...) are claimed by bot.py itself
+                if (server_name === 'whatsapp' && !['start', 'stop', 'restart'].includes(command)) return;
                 console.log(`📥 Commande à distance : [${server_name}] ${command}`);
 
                 await supabase
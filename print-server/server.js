@@ -41,6 +41,11 @@ let logoBytes = null;
 const POLL_INTERVAL = 10000;
 let lastEventReceivedAt = Date.now();
 
+// WhatsApp bot local ingest (whatsapp-bot-python/ingest.py): new orders are handed over at once
+// instead of waiting for the bot's own poll. Off without BOT_INGEST_SECRET (same value for the bot).
+const BOT_INGEST_SECRET = (process.env.BOT_INGEST_SECRET || '').trim();
+const BOT_INGEST_URL = `http://127.0.0.1:${process.env.BOT_INGEST_PORT || '8765'}/orders`;
+
 // Validate — exit immediately (Electron restarts us in 5s) if keys missing
 if (!SUPABASE_URL || !SUPABASE_ANON_KEY) {
     console.error('[PRINT ERR] Missing SUPABASE_URL / SUPABASE_ANON_KEY');
@@ -1910,6 +1915,19 @@ async function printDualTickets(order) {
 
 const processingOrders = new Set();
 
+// Fire-and-forget: the bot deduplicates against its poll, which stays the safety net
+function notifyBot(order) {
+    if (!BOT_INGEST_SECRET || !order.id) return;
+    fetch(BOT_INGEST_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-Bot-Secret': BOT_INGEST_SECRET },
+        body: JSON.stringify({ order }),
+        signal: AbortSignal.timeout(2000),
+    }).then((res) => {
+        if (res.status === 401) console.log('⚠️ Bot WhatsApp: BOT_INGEST_SECRET refusé');
+    }).catch(() => {}); // Bot stopped: it catches up by polling
+}
+
 // Handle new order with zero-race deduplication. `force` = bypass the printed cache (manual recovery).
 async function handleNewOrder(order, force = false) {
     if (!order) return false;
@@ -1939,6 +1957,7 @@ async function handleNewOrder(order, force = false) {
 
     if (idKey) processingOrders.add(idKey);
     if (numKey) processingOrders.add(numKey);
+    if (!force) notifyBot(order); // Confirmation sent while the ticket prints
 
     console.log(`\n${'='.repeat(50)}`);
     console.log(`📦 NOUVELLE COMMANDE: ${order.order_number}`);
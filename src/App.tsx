@@ -28,6 +28,7 @@ const TVDashboard = lazy(() => import("./pages/TVDashboard"));
 import PaymentSuccess from "./pages/PaymentSuccess";
 const PaymentCancel = lazy(() => import("./pages/PaymentCancel"));
 const TicketPortal = lazy(() => import("./pages/TicketPortal"));
+const ShortLink = lazy(() => import("./pages/ShortLink"));
 const CrewDashboard = lazy(() => import("./pages/CrewDashboard"));
 const KitchenDashboard = lazy(() => import("./pages/KitchenDashboard"));
 const NotFound = lazy(() => import("./pages/NotFound"));
@@ -102,6 +103,7 @@ const App = () => {
                                             <Route path="/payment/cancel" element={<PaymentCancel />} />
                                             <Route path="/tickets" element={<TicketPortal />} />
                                             <Route path="/ticket" element={<TicketPortal />} />
+                                            <Route path="/t/:code" element={<ShortLink />} />
                                             <Route path="/kitchen" element={<KitchenDashboard />} />
                                             <Route path="/courses" element={<CoursesPage />} />
                                             <Route path="/orders" element={<CoursesPage />} />
@@ -0,0 +1,38 @@
+import { useEffect, useState } from 'react';
+import { Navigate, useParams } from 'react-router-dom';
+import { supabase } from '@/integrations/supabase/client';
+
+// Short tracking links sent by the WhatsApp bot (/t/<code>) -> /ticket?phone=...
+export default function ShortLink() {
+    const { code } = useParams();
+    const [target, setTarget] = useState<string | null>(null);
+
+    useEffect(() => {
+        if (!code) {
+            setTarget('/ticket');
+            return;
+        }
+
+        let cancelled = false;
+        const resolve = async () => {
+            const { data, error } = await supabase
+                .rpc('resolve_short_link', { p_code: code });
+
+            if (cancelled) return;
+            if (error) console.error('Error resolving short link:', error);
+            setTarget(data ? `/ticket?phone=${encodeURIComponent(data as string)}` : '/ticket');
+        };
+        resolve();
+        return () => {
+            cancelled = true;
+        };
+    }, [code]);
+
+    if (target) return <Navigate to={target} replace />;
+
+    return (
+        <div className="flex min-h-screen items-center justify-center bg-muted">
+            <p className="text-muted-foreground">Chargement de votre commande...</p>
+        </div>
+    );
+}
@@ -0,0 +1,60 @@
+-- Short tracking links sent by the WhatsApp bot: https://twinpizza.fr/t/<code>
+-- The code is derived locally by the bot from the customer phone (stable per customer),
+-- registered here in the background, and resolved by the /t/:code route of the site.
+-- usage: SELECT resolve_short_link('aB3xK9q');
+
+CREATE TABLE IF NOT EXISTS public.short_links (
+  code TEXT PRIMARY KEY,
+  phone TEXT NOT NULL,
+  order_id UUID,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  last_used_at TIMESTAMP WITH TIME ZONE
+);
+
+ALTER TABLE public.short_links ENABLE ROW LEVEL SECURITY;
+
+-- No direct read access (the table must not be listable): go through the functions below
+CREATE POLICY "Admins can manage short links" ON public.short_links FOR ALL USING (has_role(auth.uid(), 'admin'::app_role));
+
+-- Register a code (idempotent). Returns false if the code is already taken by another phone.
+CREATE OR REPLACE FUNCTION public.register_short_link(p_code text, p_phone text, p_order_id uuid DEFAULT NULL)
+RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  stored_phone text;
+BEGIN
+  IF p_code !~ '^[0-9A-Za-z]{6,12}$' OR p_phone !~ '^\+?[0-9]{8,15}$' THEN
+    RETURN false;
+  END IF;
+
+  INSERT INTO public.short_links (code, phone, order_id)
+  VALUES (p_code, p_phone, p_order_id)
+  ON CONFLICT (code) DO UPDATE
+    SET order_id = COALESCE(EXCLUDED.order_id, short_links.order_id)
+    WHERE short_links.phone = EXCLUDED.phone;
+
+  SELECT phone INTO stored_phone FROM public.short_links WHERE code = p_code;
+  RETURN stored_phone = p_phone;
+END;
+$$;
+
+-- Resolve a code to the phone used by the ticket portal (NULL if unknown)
+CREATE OR REPLACE FUNCTION public.resolve_short_link(p_code text)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  found_phone text;
+BEGIN
+  UPDATE public.short_links SET last_used_at = now()
+  WHERE code = p_code
+  RETURNING phone INTO found_phone;
+  RETURN found_phone;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.register_short_link(text, text, uuid) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.resolve_short_link(text) TO anon, authenticated;
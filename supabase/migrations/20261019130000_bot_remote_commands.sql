@@ -0,0 +1,68 @@
+-- Remote control of the WhatsApp bot through system_remote_commands
+-- The bot only has the anon key and the table is admin-only, so commands are claimed and
+-- completed through SECURITY DEFINER functions. bot_poll() returns the new orders AND claims
+-- the pending commands in a single request, so the command channel costs no extra round trip.
+-- Commands may carry an argument after a space: 'resend-order <order id>'.
+-- usage: SELECT bot_poll(now() - interval '1 minute', 50, 'whatsapp', ARRAY['pause', 'resume']);
+
+-- Atomically move pending commands to 'processing' (concurrent callers never get the same row)
+CREATE OR REPLACE FUNCTION public.claim_remote_commands(p_server_name text, p_commands text[], p_limit integer DEFAULT 5)
+RETURNS SETOF public.system_remote_commands
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.system_remote_commands c
+  SET status = 'processing', updated_at = now()
+  WHERE c.id IN (
+    SELECT id FROM public.system_remote_commands
+    WHERE server_name = p_server_name
+      AND status = 'pending'
+      AND split_part(command, ' ', 1) = ANY (p_commands)
+      AND created_at > now() - interval '1 hour'  -- Stale commands are never replayed
+    ORDER BY created_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING c.*;
+$$;
+
+-- Report the outcome of a claimed command
+CREATE OR REPLACE FUNCTION public.complete_remote_command(p_id uuid, p_ok boolean, p_error text DEFAULT NULL)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.system_remote_commands
+  SET status = CASE WHEN p_ok THEN 'completed' ELSE 'failed' END,
+      error_message = p_error,
+      updated_at = now()
+  WHERE id = p_id AND status = 'processing';
+$$;
+
+-- Bot poll: orders created after p_since (oldest first) + claimed commands, as one JSON object.
+-- Orders are read with the caller's rights (SECURITY INVOKER).
+CREATE OR REPLACE FUNCTION public.bot_poll(p_since timestamptz, p_limit integer, p_server_name text, p_commands text[])
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  result json;
+BEGIN
+  SELECT json_build_object(
+    'orders', COALESCE((
+      SELECT json_agg(o ORDER BY o.created_at)
+      FROM (SELECT * FROM public.orders WHERE created_at > p_since ORDER BY created_at LIMIT p_limit) o
+    ), '[]'::json),
+    'commands', COALESCE((
+      SELECT json_agg(c) FROM public.claim_remote_commands(p_server_name, p_commands) c
+    ), '[]'::json)
+  ) INTO result;
+  RETURN result;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.claim_remote_commands(text, text[], integer) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.complete_remote_command(uuid, boolean, text) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_poll(timestamptz, integer, text, text[]) TO anon, authenticated;
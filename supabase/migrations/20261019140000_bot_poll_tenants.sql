@@ -0,0 +1,66 @@
+-- One WhatsApp bot process for every tenant: bot_poll() selects the orders and claims the
+-- commands of several tenants in a single request (the bot polls with the service key and fans
+-- the rows out per tenant_id). Without p_tenant_ids, both stay scoped to current_tenant_id()
+-- (x-tenant-id header, default tenant otherwise), as for the single-tenant bot.
+-- usage: SELECT bot_poll(now() - interval '1 minute', 200, 'whatsapp', ARRAY['pause'], ARRAY['00000000-0000-0000-0000-000000000001']::uuid[]);
+
+DROP FUNCTION IF EXISTS public.bot_poll(timestamptz, integer, text, text[]);
+DROP FUNCTION IF EXISTS public.claim_remote_commands(text, text[], integer);
+
+-- Atomically move pending commands to 'processing' (concurrent callers never get the same row)
+CREATE OR REPLACE FUNCTION public.claim_remote_commands(p_server_name text, p_commands text[], p_limit integer DEFAULT 5,
+                                                        p_tenant_ids uuid[] DEFAULT NULL)
+RETURNS SETOF public.system_remote_commands
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.system_remote_commands c
+  SET status = 'processing', updated_at = now()
+  WHERE c.id IN (
+    SELECT id FROM public.system_remote_commands
+    WHERE server_name = p_server_name
+      AND status = 'pending'
+      AND split_part(command, ' ', 1) = ANY (p_commands)
+      AND tenant_id = ANY (COALESCE(p_tenant_ids, ARRAY[public.current_tenant_id()]))
+      AND created_at > now() - interval '1 hour'  -- Stale commands are never replayed
+    ORDER BY created_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING c.*;
+$$;
+
+-- Bot poll: orders created after p_since (oldest first, every requested tenant) + claimed commands.
+-- Orders are read with the caller's rights (SECURITY INVOKER): other tenants need the service key.
+CREATE OR REPLACE FUNCTION public.bot_poll(p_since timestamptz, p_limit integer, p_server_name text, p_commands text[],
+                                           p_tenant_ids uuid[] DEFAULT NULL)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  result json;
+BEGIN
+  SELECT json_build_object(
+    'orders', COALESCE((
+      SELECT json_agg(o ORDER BY o.created_at)
+      FROM (
+        SELECT * FROM public.orders
+        WHERE created_at > p_since
+          AND (p_tenant_ids IS NULL OR tenant_id = ANY (p_tenant_ids))
+        ORDER BY created_at
+        LIMIT p_limit
+      ) o
+    ), '[]'::json),
+    'commands', COALESCE((
+      SELECT json_agg(c) FROM public.claim_remote_commands(p_server_name, p_commands, 5, p_tenant_ids) c
+    ), '[]'::json)
+  ) INTO result;
+  RETURN result;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_orders_tenant_created_at ON public.orders (tenant_id, created_at);
+
+GRANT EXECUTE ON FUNCTION public.claim_remote_commands(text, text[], integer, uuid[]) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_poll(timestamptz, integer, text, text[], uuid[]) TO anon, authenticated;
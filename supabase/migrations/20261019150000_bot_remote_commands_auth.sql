@@ -0,0 +1,51 @@
+-- Remote commands of the WhatsApp bot: tenant scoping of the SECURITY DEFINER functions
+-- The anon key ships with the web app, so anyone holding it could claim (and so silently
+-- swallow) the admin's commands of any tenant through p_tenant_ids, or mark any command
+-- completed. Now:
+--   - p_tenant_ids is only honoured for the service role (the multi-tenant bot); every other
+--     caller stays scoped to current_tenant_id() (x-tenant-id header, default tenant otherwise);
+--   - complete_remote_command() only touches a 'processing' row of the caller's tenant
+--     (any tenant for the service role).
+
+CREATE OR REPLACE FUNCTION public.claim_remote_commands(p_server_name text, p_commands text[], p_limit integer DEFAULT 5,
+                                                        p_tenant_ids uuid[] DEFAULT NULL)
+RETURNS SETOF public.system_remote_commands
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.system_remote_commands c
+  SET status = 'processing', updated_at = now()
+  WHERE c.id IN (
+    SELECT id FROM public.system_remote_commands
+    WHERE server_name = p_server_name
+      AND status = 'pending'
+      AND split_part(command, ' ', 1) = ANY (p_commands)
+      AND tenant_id = ANY (CASE WHEN auth.role() = 'service_role' AND p_tenant_ids IS NOT NULL
+                                THEN p_tenant_ids
+                                ELSE ARRAY[public.current_tenant_id()] END)
+      AND created_at > now() - interval '1 hour'  -- Stale commands are never replayed
+    ORDER BY created_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING c.*;
+$$;
+
+CREATE OR REPLACE FUNCTION public.complete_remote_command(p_id uuid, p_ok boolean, p_error text DEFAULT NULL)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.system_remote_commands
+  SET status = CASE WHEN p_ok THEN 'completed' ELSE 'failed' END,
+      error_message = p_error,
+      updated_at = now()
+  WHERE id = p_id
+    AND status = 'processing'
+    AND (auth.role() = 'service_role' OR tenant_id = public.current_tenant_id());
+$$;
+
+GRANT EXECUTE ON FUNCTION public.claim_remote_commands(text, text[], integer, uuid[]) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.complete_remote_command(uuid, boolean, text) TO anon, authenticated;
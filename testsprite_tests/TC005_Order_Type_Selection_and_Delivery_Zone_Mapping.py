@@ -1,66 +1,24 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
+from harness import open_app, run_standalone
+
+LOGIN = None
+
+
+async def run_test(context):
+    # Open a new page in the browser context and navigate to the app
+    page = await context.new_page()
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
     try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:8081", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Order successfully placed for delivery')).to_be_visible(timeout=30000)
-        except AssertionError:
-            raise AssertionError("Test case failed: The test plan to verify 'Delivery' or 'Pickup' selection and correct delivery zone display on map did not pass. Delivery zone map or delivery options are not displayed or validated as expected.")
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+        await expect(frame.locator('text=Order successfully placed for delivery')).to_be_visible(timeout=30000)
+    except AssertionError:
+        raise AssertionError("Test case failed: The test plan to verify 'Delivery' or 'Pickup' selection and correct delivery zone display on map did not pass. Delivery zone map or delivery options are not displayed or validated as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test, login=LOGIN))
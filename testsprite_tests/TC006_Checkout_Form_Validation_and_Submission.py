@@ -1,157 +1,102 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
+from harness import open_app, run_standalone
+
+LOGIN = None
+
+
+async def run_test(context):
+    # Open a new page in the browser context and navigate to the app
+    page = await context.new_page()
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Click on the 'Commander Maintenant' button (index 23) to start the checkout process.
+    frame = context.pages[-1]
+    # Click the 'Commander Maintenant' button to start the checkout process.
+    elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div[2]/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Try clicking the 'Commander' button at index 3 to see if it initiates the checkout process.
+    frame = context.pages[-1]
+    # Click the 'Commander' button at index 3 to attempt to start the checkout process.
+    elem = frame.locator('xpath=html/body/div/div[2]/header/div/div/nav/button[3]').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on 'À Emporter' option (index 16) to proceed to the checkout form.
+    frame = context.pages[-1]
+    # Click on 'À Emporter' option to proceed to the checkout form.
+    elem = frame.locator('xpath=html/body/div[2]/div/div').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on the 'Pizzas' category (index 4) to view pizza products and add one to the cart.
+    frame = context.pages[-1]
+    # Click on 'Pizzas' category to view pizza products.
+    elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div/div/img').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on a pizza product to add it to the cart.
+    frame = context.pages[-1]
+    # Click on a pizza product to add it to the cart.
+    elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on the 'Panier' button (index 7) to check if the cart has any items and proceed to checkout.
+    frame = context.pages[-1]
+    # Click on the 'Panier' button to view cart and proceed to checkout.
+    elem = frame.locator('xpath=html/body/div/div[2]/header/div/div/div[2]/button[2]').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click the 'Commander Maintenant' button (index 21) to attempt to start the checkout process again.
+    frame = context.pages[-1]
+    # Click the 'Commander Maintenant' button to start the checkout process.
+    elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div[2]/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on 'À Emporter' option (index 9) to proceed to product selection and checkout.
+    frame = context.pages[-1]
+    # Click on 'À Emporter' option to proceed to product selection and checkout.
+    elem = frame.locator('xpath=html/body/div/div[2]/section/div[3]/div[2]/div/div/div').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on the 'Pizzas' category (index 3) to view pizza products and add one to the cart.
+    frame = context.pages[-1]
+    # Click on 'Pizzas' category to view pizza products.
+    elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click on the 'Margherita' pizza (index 7) to add it to the cart.
+    frame = context.pages[-1]
+    # Click on 'Margherita' pizza to add it to the cart.
+    elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div[2]/div/div/div/div/img').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click the 'Ajouter au panier' button (index 12) to add the Margherita pizza to the cart and proceed to checkout.
+    frame = context.pages[-1]
+    # Click the 'Ajouter au panier' button to add the Margherita pizza to the cart.
+    elem = frame.locator('xpath=html/body/div/div[2]/section/div[3]/div[2]/div/div[2]/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click the close button (index 38) on the scheduling popup to dismiss it and return to the product detail page.
+    frame = context.pages[-1]
+    # Click the close button on the scheduling popup to dismiss it.
+    elem = frame.locator('xpath=html/body/div[3]/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # -> Click the 'Ajouter au panier' button (index 18) to add the product to the cart and proceed to checkout.
+    frame = context.pages[-1]
+    # Click the 'Ajouter au panier' button to add the product to the cart.
+    elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div/button').nth(0)
+    await elem.click(timeout=5000)
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
     try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:8081", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Click on the 'Commander Maintenant' button (index 23) to start the checkout process.
-        frame = context.pages[-1]
-        # Click the 'Commander Maintenant' button to start the checkout process.
-        elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try clicking the 'Commander' button at index 3 to see if it initiates the checkout process.
-        frame = context.pages[-1]
-        # Click the 'Commander' button at index 3 to attempt to start the checkout process.
-        elem = frame.locator('xpath=html/body/div/div[2]/header/div/div/nav/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on 'À Emporter' option (index 16) to proceed to the checkout form.
-        frame = context.pages[-1]
-        # Click on 'À Emporter' option to proceed to the checkout form.
-        elem = frame.locator('xpath=html/body/div[2]/div/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the 'Pizzas' category (index 4) to view pizza products and add one to the cart.
-        frame = context.pages[-1]
-        # Click on 'Pizzas' category to view pizza products.
-        elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div/div/img').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on a pizza product to add it to the cart.
-        frame = context.pages[-1]
-        # Click on a pizza product to add it to the cart.
-        elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the 'Panier' button (index 7) to check if the cart has any items and proceed to checkout.
-        frame = context.pages[-1]
-        # Click on the 'Panier' button to view cart and proceed to checkout.
-        elem = frame.locator('xpath=html/body/div/div[2]/header/div/div/div[2]/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Commander Maintenant' button (index 21) to attempt to start the checkout process again.
-        frame = context.pages[-1]
-        # Click the 'Commander Maintenant' button to start the checkout process.
-        elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on 'À Emporter' option (index 9) to proceed to product selection and checkout.
-        frame = context.pages[-1]
-        # Click on 'À Emporter' option to proceed to product selection and checkout.
-        elem = frame.locator('xpath=html/body/div/div[2]/section/div[3]/div[2]/div/div/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the 'Pizzas' category (index 3) to view pizza products and add one to the cart.
-        frame = context.pages[-1]
-        # Click on 'Pizzas' category to view pizza products.
-        elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the 'Margherita' pizza (index 7) to add it to the cart.
-        frame = context.pages[-1]
-        # Click on 'Margherita' pizza to add it to the cart.
-        elem = frame.locator('xpath=html/body/div/div[2]/div[2]/div/div[2]/div/div/div/div/img').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Ajouter au panier' button (index 12) to add the Margherita pizza to the cart and proceed to checkout.
-        frame = context.pages[-1]
-        # Click the 'Ajouter au panier' button to add the Margherita pizza to the cart.
-        elem = frame.locator('xpath=html/body/div/div[2]/section/div[3]/div[2]/div/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the close button (index 38) on the scheduling popup to dismiss it and return to the product detail page.
-        frame = context.pages[-1]
-        # Click the close button on the scheduling popup to dismiss it.
-        elem = frame.locator('xpath=html/body/div[3]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Ajouter au panier' button (index 18) to add the product to the cart and proceed to checkout.
-        frame = context.pages[-1]
-        # Click the 'Ajouter au panier' button to add the product to the cart.
-        elem = frame.locator('xpath=html/body/div/div[2]/section[3]/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Order Confirmation Successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: The checkout form did not validate inputs properly or the order confirmation screen was not displayed as expected.")
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+        await expect(frame.locator('text=Order Confirmation Successful').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: The checkout form did not validate inputs properly or the order confirmation screen was not displayed as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test, login=LOGIN))
@@ -0,0 +1,120 @@
+"""
+Shared Playwright plumbing for the testsprite_tests suite
+
+Each TC0xx module exposes `async def run_test(context)` (and optionally
+`LOGIN = 'admin' | 'crew'`). `run_suite.py` runs them all against one shared
+browser; `run_standalone()` keeps `python TC0xx_....py` working on its own.
+"""
+
+import os
+import time
+import weakref
+
+from playwright import async_api
+
+BASE_URL = os.environ.get('TESTSPRITE_BASE_URL', 'http://localhost:8081')
+DEFAULT_TIMEOUT_MS = 5000
+
+BROWSER_ARGS = [
+    "--window-size=1280,720",         # Set the browser window size
+    "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
+    "--ipc=host",                     # Use host-level IPC for better stability
+]
+
+# Cached logins (Playwright storage state), reused until they expire
+AUTH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.auth')
+AUTH_MAX_AGE = float(os.environ.get('TESTSPRITE_AUTH_MAX_AGE', str(12 * 3600)))
+
+# Crew dashboard uses the same back-office accounts; override with TESTSPRITE_CREW_* if needed
+CREDENTIALS = {
+    'admin': ('TESTSPRITE_ADMIN_EMAIL', 'TESTSPRITE_ADMIN_PASSWORD'),
+    'crew': ('TESTSPRITE_CREW_EMAIL', 'TESTSPRITE_CREW_PASSWORD'),
+}
+
+
+async def launch_browser(pw, headless: bool = True):
+    """One Chromium for the whole run (no --single-process so contexts run in parallel)"""
+    return await pw.chromium.launch(headless=headless, args=BROWSER_ARGS)
+
+
+async def new_test_context(browser, storage_state: str = None, **kwargs):
+    """Isolated browser context (like an incognito window) for one test"""
+    context = await browser.new_context(storage_state=storage_state, **kwargs)
+    context.set_default_timeout(DEFAULT_TIMEOUT_MS)
+    return context
+
+
+# Per-context coroutines run on each page right before open_app() navigates
+# (used by perf_budgets.py to attach CDP throttling before the first request)
+_page_hooks = weakref.WeakKeyDictionary()
+
+
+def add_page_hook(context, hook):
+    _page_hooks.setdefault(context, []).append(hook)
+
+
+async def open_app(page, path: str = '/'):
+    """Navigate to the app and wait for the document (and its iframes) to be parsed"""
+    for hook in _page_hooks.get(page.context, []):
+        await hook(page)
+    await page.goto(f"{BASE_URL}{path}", wait_until="commit", timeout=10000)
+    try:
+        await page.wait_for_load_state("domcontentloaded", timeout=3000)
+    except async_api.Error:
+        pass
+    for frame in page.frames:
+        try:
+            await frame.wait_for_load_state("domcontentloaded", timeout=3000)
+        except async_api.Error:
+            pass
+    return page
+
+
+def _credentials(role: str):
+    email_var, password_var = CREDENTIALS[role]
+    email = os.environ.get(email_var) or os.environ.get('TESTSPRITE_ADMIN_EMAIL')
+    password = os.environ.get(password_var) or os.environ.get('TESTSPRITE_ADMIN_PASSWORD')
+    return email, password
+
+
+async def login_state(browser, role: str, refresh: bool = False) -> str:
+    """Return a storage-state file for `role`, logging in through /admin only when the cache is stale"""
+    path = os.path.join(AUTH_DIR, f"{role}.json")
+    if not refresh and os.path.exists(path) and time.time() - os.path.getmtime(path) < AUTH_MAX_AGE:
+        return path
+
+    email, password = _credentials(role)
+    if not email or not password:
+        raise RuntimeError(f"Login '{role}' requis: definissez TESTSPRITE_ADMIN_EMAIL / TESTSPRITE_ADMIN_PASSWORD")
+
+    context = await new_test_context(browser)
+    try:
+        page = await context.new_page()
+        await open_app(page, '/admin')
+        await page.locator('input[type="email"]').fill(email)
+        await page.locator('input[type="password"]').fill(password)
+        await page.locator('button[type="submit"]').click()
+        await page.wait_for_url("**/admin/dashboard", timeout=15000)
+        os.makedirs(AUTH_DIR, exist_ok=True)
+        await context.storage_state(path=path)
+    finally:
+        await context.close()
+    return path
+
+
+async def run_standalone(run_test, login: str = None, headless: bool = True):
+    """Run a single test module the old way: own Playwright, own browser"""
+    pw = await async_api.async_playwright().start()
+    browser = None
+    context = None
+    try:
+        browser = await launch_browser(pw, headless=headless)
+        storage_state = await login_state(browser, login) if login else None
+        context = await new_test_context(browser, storage_state)
+        await run_test(context)
+    finally:
+        if context:
+            await context.close()
+        if browser:
+            await browser.close()
+        await pw.stop()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Front-end performance budgets on top of the testsprite flows
+
+Replays the TC001 (menu browsing), TC012 (PWA) and TC013 (responsive)
+flows under throttled network/CPU profiles, collects Core Web Vitals
+(LCP, CLS, TBT) in the page and bytes transferred per resource type
+through CDP, fails when a budget is exceeded and writes one JSON trend
+file per run to perf_results/.
+
+Run me with:
+    python perf_budgets.py                       # every flow x every profile
+    python perf_budgets.py --profile mobile-4g   # only the 4G phone profile
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import weakref
+from datetime import datetime
+
+from playwright import async_api
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+import harness  # noqa: E402
+from run_suite import load_module  # noqa: E402
+
+RESULTS_DIR = os.path.join(TESTS_DIR, 'perf_results')
+
+FLOWS = {
+    'menu': 'TC001_Menu_Browsing___Category_Display.py',
+    'pwa': 'TC012_Progressive_Web_App_PWA_Features_Verification.py',
+    'responsive': 'TC013_Responsive_Design_Validation.py',
+}
+
+# Network numbers follow the Lighthouse/DevTools presets (throughput in bytes/s)
+PROFILES = {
+    'mobile-4g': {
+        'viewport': {'width': 390, 'height': 844}, 'is_mobile': True, 'device_scale_factor': 3,
+        'latency_ms': 150, 'download': 1.6 * 1024 * 1024 / 8, 'upload': 750 * 1024 / 8,
+        'cpu_slowdown': 4,
+    },
+    'desktop': {
+        'viewport': {'width': 1280, 'height': 720}, 'is_mobile': False, 'device_scale_factor': 1,
+        'latency_ms': 40, 'download': 10 * 1024 * 1024 / 8, 'upload': 5 * 1024 * 1024 / 8,
+        'cpu_slowdown': 1,
+    },
+}
+
+# Budgets per profile: timings in ms, sizes in KB (transferred, i.e. compressed)
+BUDGETS = {
+    'mobile-4g': {'lcp_ms': 4000, 'cls': 0.1, 'tbt_ms': 600, 'js_kb': 700, 'css_kb': 120, 'image_kb': 1500},
+    'desktop': {'lcp_ms': 2500, 'cls': 0.1, 'tbt_ms': 300, 'js_kb': 700, 'css_kb': 120, 'image_kb': 2500},
+}
+
+# Collected in the page from the very first byte (context init script)
+WEB_VITALS_SCRIPT = """
+(() => {
+  const perf = window.__perf = { lcp: 0, cls: 0, longTasks: [], fcp: 0 };
+  const observe = (type, cb) => {
+    try { new PerformanceObserver((list) => list.getEntries().forEach(cb)).observe({ type, buffered: true }); }
+    catch (e) { /* entry type not supported */ }
+  };
+  observe('largest-contentful-paint', (e) => { perf.lcp = e.renderTime || e.loadTime || e.startTime; });
+  observe('layout-shift', (e) => { if (!e.hadRecentInput) perf.cls += e.value; });
+  observe('longtask', (e) => { perf.longTasks.push([e.startTime, e.duration]); });
+  observe('paint', (e) => { if (e.name === 'first-contentful-paint') perf.fcp = e.startTime; });
+})();
+"""
+
+RESOURCE_KEYS = {'Script': 'js', 'Stylesheet': 'css', 'Image': 'image'}
+
+# ===========================================
+# CDP INSTRUMENTATION
+# ===========================================
+
+class PageMeter:
+    """Throttles one page through CDP and counts transferred bytes per resource type"""
+
+    def __init__(self, profile: dict):
+        self.profile = profile
+        self.types = {}
+        self.bytes = {'js': 0, 'css': 0, 'image': 0, 'other': 0}
+        self.cdp = None
+
+    async def attach(self, page):
+        self.cdp = await page.context.new_cdp_session(page)
+        await self.cdp.send('Network.enable')
+        await self.cdp.send('Network.emulateNetworkConditions', {
+            'offline': False,
+            'latency': self.profile['latency_ms'],
+            'downloadThroughput': self.profile['download'],
+            'uploadThroughput': self.profile['upload'],
+        })
+        await self.cdp.send('Emulation.setCPUThrottlingRate', {'rate': self.profile['cpu_slowdown']})
+        self.cdp.on('Network.responseReceived', self._on_response)
+        self.cdp.on('Network.loadingFinished', self._on_finished)
+
+    def _on_response(self, event):
+        self.types[event['requestId']] = event.get('type', 'Other')
+
+    def _on_finished(self, event):
+        key = RESOURCE_KEYS.get(self.types.pop(event['requestId'], 'Other'), 'other')
+        self.bytes[key] += event.get('encodedDataLength', 0)
+
+
+_meters = weakref.WeakKeyDictionary()  # context -> PageMeter (first page opened by the flow)
+
+
+async def _instrument(page):
+    meter = _meters.get(page.context)
+    if meter and meter.cdp is None:
+        await meter.attach(page)
+
+
+def total_blocking_time(long_tasks: list, fcp: float) -> float:
+    """TBT: sum of (duration - 50ms) for long tasks starting after FCP"""
+    return sum(max(0.0, duration - 50) for start, duration in long_tasks if start >= fcp)
+
+# ===========================================
+# RUN
+# ===========================================
+
+async def measure(browser, flow: str, profile_name: str, settle_ms: int) -> dict:
+    profile = PROFILES[profile_name]
+    module = load_module(os.path.join(TESTS_DIR, FLOWS[flow]))
+    context = await harness.new_test_context(
+        browser, viewport=profile['viewport'], is_mobile=profile['is_mobile'],
+        device_scale_factor=profile['device_scale_factor'],
+    )
+    await context.add_init_script(WEB_VITALS_SCRIPT)
+    meter = PageMeter(profile)
+    _meters[context] = meter
+    harness.add_page_hook(context, _instrument)
+
+    functional = 'passed'
+    started = time.perf_counter()
+    try:
+        try:
+            await module.run_test(context)
+        except AssertionError:
+            functional = 'failed'  # Budgets are judged independently of the functional assertion
+        page = context.pages[0]
+        try:
+            await page.wait_for_load_state('networkidle', timeout=settle_ms)
+        except async_api.Error:
+            pass
+        vitals = await page.evaluate('window.__perf')
+    finally:
+        await context.close()
+
+    kb = {k: round(v / 1024, 1) for k, v in meter.bytes.items()}
+    return {
+        'flow': flow,
+        'profile': profile_name,
+        'functional': functional,
+        'duration_s': round(time.perf_counter() - started, 2),
+        'lcp_ms': round(vitals['lcp'], 1),
+        'cls': round(vitals['cls'], 4),
+        'tbt_ms': round(total_blocking_time(vitals['longTasks'], vitals['fcp']), 1),
+        'js_kb': kb['js'],
+        'css_kb': kb['css'],
+        'image_kb': kb['image'],
+        'other_kb': kb['other'],
+    }
+
+
+def check_budgets(result: dict, budgets: dict) -> list:
+    budget = budgets[result['profile']]
+    return [f"{metric} {result[metric]} > {limit}" for metric, limit in budget.items() if result[metric] > limit]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=TESTS_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+async def run(flows: list, profiles: list, budgets: dict, settle_ms: int) -> list:
+    pw = await async_api.async_playwright().start()
+    browser = None
+    results = []
+    try:
+        browser = await harness.launch_browser(pw)
+        # Sequential on purpose: parallel contexts would skew CPU-throttled timings
+        for profile in profiles:
+            for flow in flows:
+                result = await measure(browser, flow, profile, settle_ms)
+                result['violations'] = check_budgets(result, budgets)
+                status = 'FAIL' if result['violations'] else 'OK  '
+                print(f"[{status}] {flow:<11} {profile:<10} LCP {result['lcp_ms']:>6.0f}ms  "
+                      f"CLS {result['cls']:.3f}  TBT {result['tbt_ms']:>5.0f}ms  "
+                      f"JS {result['js_kb']:>6.0f}KB  CSS {result['css_kb']:>5.0f}KB  IMG {result['image_kb']:>6.0f}KB")
+                for violation in result['violations']:
+                    print(f"         budget exceeded: {violation}")
+                results.append(result)
+    finally:
+        if browser:
+            await browser.close()
+        await pw.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance budgets for the customer front-end")
+    parser.add_argument('--flow', action='append', choices=sorted(FLOWS), help="Flow(s) to measure")
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES), help="Profile(s) to use")
+    parser.add_argument('--budgets', help="JSON file overriding BUDGETS ({profile: {metric: limit}})")
+    parser.add_argument('--settle', type=int, default=5000, help="Max wait for network idle after the flow (ms)")
+    args = parser.parse_args()
+
+    budgets = {name: dict(limits) for name, limits in BUDGETS.items()}
+    if args.budgets:
+        with open(args.budgets, encoding='utf-8') as f:
+            for name, limits in json.load(f).items():
+                budgets.setdefault(name, {}).update(limits)
+
+    flows = args.flow or list(FLOWS)
+    profiles = args.profile or list(PROFILES)
+    results = asyncio.run(run(flows, profiles, budgets, args.settle))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(RESULTS_DIR, f"perf-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'base_url': harness.BASE_URL,
+            'revision': git_revision(),
+            'budgets': budgets,
+            'results': results,
+        }, f, indent=2)
+    print(f"\n[*] Tendance ecrite dans {path}")
+
+    return 1 if any(r['violations'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Parallel runner for the testsprite_tests suite
+
+Launches a single Chromium, gives every test its own isolated context,
+runs the tests on N concurrent workers and prints per-test durations
+(slowest first). Admin/crew logins are done once and reused through the
+cached storage state in .auth/ (see harness.login_state).
+
+Run me with:
+    python run_suite.py                    # every TC0xx_*.py, 4 workers
+    python run_suite.py -w 8 -k TC00       # only TC00x, 8 workers
+    python run_suite.py --json report.json
+"""
+
+import argparse
+import asyncio
+import glob
+import importlib.util
+import json
+import os
+import sys
+import time
+import traceback
+
+from playwright import async_api
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+import harness  # noqa: E402
+
+
+def discover(pattern: str = None) -> list:
+    paths = sorted(glob.glob(os.path.join(TESTS_DIR, 'TC0*.py')))
+    if pattern:
+        paths = [p for p in paths if pattern.lower() in os.path.basename(p).lower()]
+    return paths
+
+
+def load_module(path: str):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def run_one(browser, module, storage_states: dict, timeout: float) -> dict:
+    name = module.__name__
+    login = getattr(module, 'LOGIN', None)
+    result = {'test': name, 'status': 'passed', 'duration': 0.0, 'error': None}
+    context = None
+    started = time.perf_counter()
+    try:
+        if login and login not in storage_states:
+            raise RuntimeError(f"Pas de session '{login}' disponible")
+        context = await harness.new_test_context(browser, storage_states.get(login))
+        await asyncio.wait_for(module.run_test(context), timeout)
+    except AssertionError as e:
+        result.update(status='failed', error=str(e))
+    except asyncio.TimeoutError:
+        result.update(status='error', error=f"timeout after {timeout:.0f}s")
+    except Exception as e:
+        result.update(status='error', error=f"{type(e).__name__}: {e}")
+        if os.environ.get('TESTSPRITE_DEBUG'):
+            traceback.print_exc()
+    finally:
+        result['duration'] = time.perf_counter() - started
+        if context:
+            await context.close()
+    return result
+
+
+async def run_suite(paths: list, workers: int, timeout: float, headless: bool, refresh_auth: bool) -> list:
+    modules = [load_module(p) for p in paths]
+    queue = asyncio.Queue()
+    for module in modules:
+        queue.put_nowait(module)
+    results = []
+
+    pw = await async_api.async_playwright().start()
+    browser = None
+    try:
+        browser = await harness.launch_browser(pw, headless=headless)
+
+        # Log in once per role, before the workers start
+        storage_states = {}
+        for role in sorted({getattr(m, 'LOGIN', None) for m in modules} - {None}):
+            try:
+                storage_states[role] = await harness.login_state(browser, role, refresh=refresh_auth)
+            except Exception as e:
+                print(f"[WARN] Login '{role}' impossible: {e}")
+
+        async def worker():
+            while True:
+                try:
+                    module = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await run_one(browser, module, storage_states, timeout)
+                mark = {'passed': 'OK  ', 'failed': 'FAIL', 'error': 'ERR '}[result['status']]
+                print(f"[{mark}] {result['test']} ({result['duration']:.1f}s)")
+                results.append(result)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    finally:
+        if browser:
+            await browser.close()
+        await pw.stop()
+    return results
+
+
+def print_report(results: list, wall: float, slow_threshold: float):
+    print("\n" + "=" * 70)
+    print(f"{'TEST':<58} {'STATUS':<7} {'TIME':>5}")
+    print("-" * 70)
+    for r in sorted(results, key=lambda r: r['duration'], reverse=True):
+        slow = ' SLOW' if r['duration'] >= slow_threshold else ''
+        print(f"{r['test'][:58]:<58} {r['status']:<7} {r['duration']:>4.1f}s{slow}")
+    print("-" * 70)
+    passed = sum(r['status'] == 'passed' for r in results)
+    serial = sum(r['duration'] for r in results)
+    print(f"{passed}/{len(results)} passed - wall {wall:.1f}s (sum of tests {serial:.1f}s)")
+    for r in results:
+        if r['error']:
+            print(f"\n[{r['test']}] {r['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run testsprite_tests in parallel on one shared browser")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="Concurrent tests")
+    parser.add_argument('-k', dest='pattern', help="Only run tests whose file name contains this")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Per-test timeout (s)")
+    parser.add_argument('--slow', type=float, default=10.0, help="Flag tests slower than this (s)")
+    parser.add_argument('--headed', action='store_true', help="Show the browser")
+    parser.add_argument('--refresh-auth', action='store_true', help="Ignore cached admin/crew sessions")
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    paths = discover(args.pattern)
+    if not paths:
+        print("[ERROR] Aucun test trouve")
+        return 1
+
+    started = time.perf_counter()
+    results = asyncio.run(run_suite(paths, args.workers, args.timeout, not args.headed, args.refresh_auth))
+    wall = time.perf_counter() - started
+    print_report(results, wall, args.slow)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'wall_seconds': wall, 'results': results}, f, indent=2)
+    return 0 if all(r['status'] == 'passed' for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,10 @@ const PRINTER_IP   = process.env.PRINTER_IP   || '192.168.1.200';
 const PRINTER_PORT = parseInt(process.env.PRINTER_PORT || '9100');
 const printer = new PrinterManager(PRINTER_IP, PRINTER_PORT);
 
+// Python WhatsApp bot local ingest (whatsapp-bot-python/ingest.py) — empty secret = off
+const BOT_INGEST_SECRET = (process.env.BOT_INGEST_SECRET || '').trim();
+const BOT_INGEST_URL    = `http://127.0.0.1:${process.env.BOT_INGEST_PORT || '8765'}/orders`;
+
 // ─── State ────────────────────────────────────────────────────────────────────
 let viteProcess    = null;
 let fileServer     = null;
@@ -141,6 +145,17 @@ function generateGentleReviewMessage(order) {
   return msg;
 }
 
+// Hand a new order to the Python bot right away (it skips orders it already has)
+function notifyBot(order) {
+  if (!BOT_INGEST_SECRET) return;
+  fetch(BOT_INGEST_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'X-Bot-Secret': BOT_INGEST_SECRET },
+    body: JSON.stringify({ order }),
+    signal: AbortSignal.timeout(2000),
+  }).catch(() => {}); // Bot not running — its poll catches up
+}
+
 // Handle one order: UI + notification (once) and WhatsApp (once, when connected)
 function handleIncomingOrder(order) {
   if (!order || !order.id) return;
@@ -149,6 +164,7 @@ function handleIncomingOrder(order) {
   if (!seenOrders.has(order.id)) {
     seenOrders.add(order.id);
     console.log('🔔 New order:', order.order_number);
+    notifyBot(order);
 
     Object.values(windows).forEach(w => {
       if (!w.isDestroyed()) w.webContents.send('new-order', order);
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the Chrome / WhatsApp Web launch time, before and after pruning
+
+Copies the WhatsApp profile to a temporary folder (the real one is never
+modified), starts Chrome on the copy a few times and measures the time
+until Chrome answers and until WhatsApp Web shows the chat list (or the QR
+code when the profile is not linked), then prunes the copy with
+chrome_profile.prune() and measures again.
+
+Run me with Chrome and the bot closed:
+    python bench_launch.py
+    python bench_launch.py --runs 5 --headless
+    python bench_launch.py --profile tenants/<slug>/whatsapp_session
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+
+import chrome_profile
+from config import CHROMEDRIVER_PATH, DATA_FOLDER, WHATSAPP_WEB_URL
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QR_SELECTORS = ('canvas[aria-label]', 'div[data-ref]')
+
+
+def launch_once(chrome_path: str, driver_path: str, profile: str, headless: bool, timeout: float):
+    """(seconds until Chrome answers, seconds until WhatsApp Web is usable, 'chats' / 'qr' / None)"""
+    from bot import LOGIN_SELECTORS
+
+    options = Options()
+    options.binary_location = chrome_path
+    options.add_argument(f"--user-data-dir={profile}")
+    options.add_argument("--profile-directory=Default")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--log-level=3")
+    if headless:
+        options.add_argument("--headless=new")
+
+    started = time.perf_counter()
+    driver = webdriver.Chrome(service=Service(executable_path=driver_path), options=options)
+    try:
+        browser = time.perf_counter() - started
+        driver.get(WHATSAPP_WEB_URL)
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if any(driver.find_elements(By.CSS_SELECTOR, selector) for selector in LOGIN_SELECTORS):
+                return browser, time.perf_counter() - started, 'chats'
+            if any(driver.find_elements(By.CSS_SELECTOR, selector) for selector in QR_SELECTORS):
+                return browser, time.perf_counter() - started, 'qr'
+            time.sleep(0.1)
+        return browser, time.perf_counter() - started, None
+    finally:
+        driver.quit()
+
+
+def bench(label: str, runs: int, *args) -> list:
+    results = []
+    for run in range(runs):
+        browser, ready, screen = launch_once(*args)
+        results.append(ready)
+        print(f"  {label} #{run + 1}: Chrome {browser:.2f}s, WhatsApp Web {ready:.2f}s ({screen or 'timeout'})")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', default=os.path.join(BOT_DIR, DATA_FOLDER))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    if chrome_profile.profile_in_use(args.profile):
+        print("Chrome utilise ce profil - arretez le bot d'abord.")
+        return 1
+    from bot import find_chrome_path
+    chrome_path = find_chrome_path()
+    if not chrome_path:
+        print("Chrome introuvable (BOT_CHROME_PATH)")
+        return 1
+    if CHROMEDRIVER_PATH:
+        driver_path = CHROMEDRIVER_PATH
+    else:
+        from webdriver_manager.chrome import ChromeDriverManager
+        driver_path = ChromeDriverManager().install()
+
+    workdir = tempfile.mkdtemp(prefix='bench_launch_')
+    copy = os.path.join(workdir, 'profile')
+    try:
+        shutil.copytree(args.profile, copy, symlinks=True,
+                        ignore=shutil.ignore_patterns(*chrome_profile.LOCK_FILES))
+        size = chrome_profile.folder_size(copy)
+        print(f"Profil: {size / chrome_profile.MB:.0f} Mo, dont cache "
+              f"{chrome_profile.cache_size(copy) / chrome_profile.MB:.0f} Mo ({args.runs} lancements)")
+        before = bench('avant', args.runs, chrome_path, driver_path, copy, args.headless, args.timeout)
+        freed = chrome_profile.prune(copy)
+        print(f"Cache supprime: {freed / chrome_profile.MB:.0f} Mo")
+        after = bench('apres', args.runs, chrome_path, driver_path, copy, args.headless, args.timeout)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # The first launch after pruning rebuilds the caches: the median tells the steady state
+    print(f"\nWhatsApp Web pret (mediane): avant {statistics.median(before):.2f}s, "
+          f"apres {statistics.median(after):.2f}s (1er lancement apres nettoyage: {after[0]:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
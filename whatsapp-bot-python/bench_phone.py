@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for phone normalization
+
+Compares the old inline format_phone (regex compiled on every call, no
+validation) with phones.normalize, cold (memo cleared) and warm, and times
+the batch API over the customer CSV files at the repo root.
+
+Run me with:
+    python bench_phone.py
+    python bench_phone.py --number 200000
+"""
+
+import argparse
+import glob
+import os
+import re
+import timeit
+
+import phones
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = [
+    '06 12 34 56 78', '+33 6 12 34 56 78', '0033612345678', '06-12-34-56-78',
+    '612345678', '+33 (0)6 12 34 56 78', '+32 470 12 34 56', '+41 79 123 45 67',
+    '06.84.48.49.43', '12345', 'abc', '',
+]
+
+
+def legacy_format_phone(phone: str) -> str:
+    """bot.format_phone before phones.py"""
+    if not phone:
+        return ""
+    phone = re.sub(r'[\s\-\.\(\)]', '', phone)
+    phone = phone.lstrip('+')
+    if phone.startswith('0'):
+        phone = '33' + phone[1:]
+    return phone
+
+
+def bench(label: str, func, number: int):
+    seconds = timeit.timeit(func, number=number)
+    per_call = seconds / (number * len(SAMPLES)) * 1e9
+    print(f"  {label:<28} {per_call:8.0f} ns/numero")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la normalisation des numeros")
+    parser.add_argument('--number', type=int, default=50000, help="Iterations sur l'echantillon")
+    args = parser.parse_args()
+
+    print(f"[*] {len(SAMPLES)} numeros x {args.number} iterations")
+    bench("legacy format_phone", lambda: [legacy_format_phone(p) for p in SAMPLES], args.number)
+
+    def cold():
+        phones.normalize.cache_clear()
+        return [phones.normalize(p) for p in SAMPLES]
+
+    bench("phones.normalize (froid)", cold, args.number)
+    bench("phones.normalize (memo)", lambda: phones.normalize_many(SAMPLES), args.number)
+
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, 'clients_*.csv'))):
+        phones.normalize.cache_clear()
+        seconds = timeit.timeit(lambda: sum(1 for _ in phones.normalize_csv_column(path)), number=1)
+        rows = list(phones.normalize_csv_column(path))
+        valid = sum(1 for _, normalized in rows if normalized)
+        print(f"  {os.path.basename(path):<28} {len(rows):6d} lignes, {valid} valides, "
+              f"{seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark for order message rendering
+
+Renders synthetic 50-item orders with the old inline builder (f-string +
+items_text += per line) and with the precompiled templates of templates/.
+
+Run me with:
+    python bench_templates.py
+    python bench_templates.py --items 200 --orders 500
+"""
+
+import argparse
+import json
+import random
+import time
+
+from config import TEMPLATES_FOLDER
+from message_templates import MessageTemplates, order_values
+from models import JSON_BACKEND, Order, decode_orders
+
+CATEGORIES = ('pizzas', 'tacos', 'burgers', 'boissons', 'desserts')
+MEATS = ('Poulet', 'Boeuf', 'Merguez', 'Kebab', 'Cordon bleu')
+SAUCES = ('Algerienne', 'Samourai', 'Blanche', 'Harissa', 'Ketchup')
+
+
+def make_item(rng: random.Random, index: int) -> dict:
+    category = rng.choice(CATEGORIES)
+    customization = {}
+    if category in ('pizzas', 'tacos', 'burgers'):
+        customization = {
+            'size': rng.choice(('senior', 'mega', 'none')),
+            'meats': rng.sample(MEATS, rng.randint(0, 3)),
+            'sauces': rng.sample(SAUCES, rng.randint(0, 2)),
+            'supplements': ['Oeuf'] if rng.random() < 0.3 else [],
+            'menuOption': rng.choice(('none', 'frites', 'boisson')),
+        }
+    item = {'quantity': rng.randint(1, 3), 'totalPrice': round(rng.uniform(2, 18), 2), 'customization': customization}
+    if rng.random() < 0.5:
+        item.update(name=f"Produit {index}", category=category)
+    else:
+        item['item'] = {'name': f"Produit {index}", 'category': category}
+    if rng.random() < 0.2:
+        item['note'] = 'Bien cuit'
+    return item
+
+
+def make_order(rng: random.Random, n_items: int) -> dict:
+    return {
+        'id': 'bench', 'order_number': f"{rng.randint(1, 999):03d}", 'customer_name': 'Client Bench',
+        'customer_phone': '0612345678', 'order_type': rng.choice(('livraison', 'emporter', 'surplace')),
+        'customer_address': '12 rue de la Paix', 'customer_notes': 'Code 1234',
+        'total': 123.4, 'items': [make_item(rng, i) for i in range(n_items)],
+    }
+
+
+def legacy_render(order: dict, portal_url: str) -> str:
+    """Message builder of bot.send_order_confirmation before message_templates.py"""
+    customer_name = order.get('customer_name', 'Client')
+    order_number = order.get('order_number', 'N/A')
+    total = order.get('total', 0)
+    order_type = order.get('order_type', '')
+    order_type_text = {'livraison': 'Livraison', 'emporter': 'A emporter', 'surplace': 'Sur place'}.get(order_type, order_type)
+    items_text = ""
+    for item in order.get('items', []):
+        qty = item.get('quantity', 1)
+        name = item.get('name', '')
+        if not name and item.get('item'):
+            name = item['item'].get('name', 'Produit')
+        if not name:
+            name = 'Produit'
+        price = item.get('totalPrice', item.get('price', 0))
+        items_text += f"\n  {qty}x {name}"
+        if price:
+            items_text += f" - {price:.2f} EUR"
+        customization = item.get('customization', {})
+        if customization:
+            details = []
+            item_category = (item.get('category', '') or item.get('item', {}).get('category', '') or '').lower()
+            if 'pizza' in item_category:
+                size = customization.get('size', '')
+                if size and size.lower() not in ['', 'none']:
+                    details.append("*MEGA*" if size.upper() == 'MEGA' else f"{size.upper()}")
+            meats = customization.get('meats', [])
+            if isinstance(meats, list) and meats:
+                details.append(f"Viandes: {', '.join(meats)}")
+            elif customization.get('meat'):
+                details.append(f"Viande: {customization.get('meat')}")
+            for key, label in (('sauces', 'Sauces'), ('garnitures', 'Garnitures'),
+                               ('supplements', 'Supplements'), ('cheeseSupplements', 'Fromages')):
+                values = customization.get(key, [])
+                if isinstance(values, list) and values:
+                    details.append(f"{label}: {', '.join(values)}")
+            menu = customization.get('menuOption', '')
+            if menu and menu.lower() not in ['', 'none']:
+                details.append(f"Menu: {menu}")
+            if details:
+                items_text += f"\n     ({' | '.join(details)})"
+        note = item.get('note', '') or (customization.get('note', '') if customization else '')
+        if note:
+            items_text += f"\n     Note: {note}"
+
+    message = f"""*TWIN PIZZA*
+================================
+
+Bonjour {customer_name} !
+
+Votre commande *{order_number}* est confirmee.
+
+--------------------------------
+*VOTRE COMMANDE :*
+{items_text if items_text else '  (aucun article)'}
+
+--------------------------------
+*RECAPITULATIF :*
+- Mode : *{order_type_text}*
+- Total : *{total:.2f} EUR*
+- Delai estime : *15 a 25 minutes*"""
+    if order_type == 'livraison' and order.get('customer_address'):
+        message += f"\n- Adresse : {order['customer_address']}"
+    if order.get('customer_notes'):
+        message += f"\n- Note : {order['customer_notes']}"
+    message += f"""
+
+--------------------------------
+Suivez votre commande :
+{portal_url}
+
+Merci pour votre confiance !
+*TWIN PIZZA*"""
+    return message
+
+
+def bench(label: str, render, orders: list, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for order in orders:
+            render(order)
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<24} {best / len(orders) * 1e6:8.1f} us/commande")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des messages de commande")
+    parser.add_argument('--items', type=int, default=50, help="Articles par commande")
+    parser.add_argument('--orders', type=int, default=200, help="Commandes synthetiques")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions (meilleur temps garde)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    orders = [make_order(rng, args.items) for _ in range(args.orders)]
+    portal_url = 'https://twinpizza.fr/ticket?phone=0612345678'
+
+    started = time.perf_counter()
+    templates = MessageTemplates(TEMPLATES_FOLDER)
+    print(f"[*] Compilation des templates: {(time.perf_counter() - started) * 1000:.2f} ms")
+    print(f"[*] {args.orders} commandes x {args.items} articles")
+
+    bench("legacy f-string +=", lambda o: legacy_render(o, portal_url), orders, args.repeat)
+    bench("templates precompiles",
+          lambda o: templates.render('confirmation', order_values(o, portal_url), o['order_type']),
+          orders, args.repeat)
+    models = [Order(o) for o in orders]
+    bench("templates + Order",
+          lambda o: templates.render('confirmation', order_values(o, portal_url), o.order_type),
+          models, args.repeat)
+
+    # Decoding a PostgREST page of orders (bytes -> objects)
+    body = json.dumps(orders).encode()
+    started = time.perf_counter()
+    json.loads(body)
+    dict_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    decoded = decode_orders(body)
+    decode_ms = (time.perf_counter() - started) * 1000
+    print(f"[*] Decodage de {len(decoded)} commandes ({len(body) // 1024} Ko): "
+          f"json.loads {dict_ms:.1f} ms, decode_orders ({JSON_BACKEND}) {decode_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the order ticket image renderer
+
+Renders synthetic orders (see bench_templates.py) to PNG and WebP and
+reports per-ticket render time. Target: a few milliseconds per ticket once
+fonts, logo and QR codes are warm.
+
+Run me with:
+    python bench_ticket.py
+    python bench_ticket.py --items 12 --tickets 300 --save ticket_sample.png
+"""
+
+import argparse
+import random
+import time
+
+from bench_templates import make_order
+from loadtest.stats import format_summary, summarize
+from models import Order
+from ticket_image import render_ticket
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des tickets image")
+    parser.add_argument('--items', type=int, default=6, help="Articles par commande")
+    parser.add_argument('--tickets', type=int, default=200, help="Tickets a rendre")
+    parser.add_argument('--save', help="Enregistrer un ticket exemple (PNG)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    orders = [Order(make_order(rng, args.items)) for _ in range(args.tickets)]
+    portal_url = 'https://twinpizza.fr/ticket?phone=0612345678'
+
+    started = time.perf_counter()
+    first = render_ticket(orders[0], portal_url)
+    print(f"[*] Premier ticket (froid: polices, logo, QR): {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{len(first) // 1024} Ko")
+
+    for image_format in ('PNG', 'WEBP'):
+        timings = []
+        size = 0
+        for order in orders:
+            started = time.perf_counter()
+            size = len(render_ticket(order, portal_url, image_format))
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"  {image_format:<5} {format_summary(summarize(timings), 'ms')}  (~{size // 1024} Ko)")
+
+    if args.save:
+        with open(args.save, 'wb') as f:
+            f.write(first)
+        print(f"[OK] Exemple: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
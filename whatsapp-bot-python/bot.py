@@ -7,25 +7,17 @@ Sends order notifications via WhatsApp Web
 import os
 import sys
 import time
-import re
 import json
 import subprocess
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta, timezone
 
 # Fix Windows console encoding for emoji support
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
     sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
-def safe_print(text):
-    """Print with fallback for unsupported characters"""
-    try:
-        print(text)
-    except UnicodeEncodeError:
-        # Remove or replace emojis if console doesn't support them
-        import re
-        cleaned = re.sub(r'[\U0001F300-\U0001F9FF]', '*', text)
-        print(cleaned)
+from console import safe_print
 
 # Selenium imports for WhatsApp Web automation
 from selenium import webdriver
@@ -35,52 +27,142 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
 # HTTP client for Supabase API calls (avoiding supabase-py proxy issues)
 import httpx
 
 # Configuration
-from config import SUPABASE_URL, SUPABASE_ANON_KEY, DATA_FOLDER
+from config import SUPABASE_URL, SUPABASE_ANON_KEY, DATA_FOLDER, SITE_URL
+from config import WHATSAPP_WEB_URL, CHROME_PATH, CHROMEDRIVER_PATH, HEADLESS, POLL_INTERVAL
+from config import PHONE_CACHE_FILE, CHAT_OPEN_TIMEOUT, TEMPLATES_FOLDER
+from config import LEDGER_FILE, CATCHUP_MAX_AGE_HOURS, POLL_OVERLAP_SECONDS, POLL_LIMIT
+from config import READY_NOTIFICATIONS, READY_LOOKBACK_SECONDS
+from config import SEND_RATE, SEND_BURST, TRANSACTIONAL_RATE, TRANSACTIONAL_BURST, TRANSACTIONAL_DAILY_CAP
+from config import BULK_RATE, BULK_BURST, BULK_DAILY_CAP, WARNING_COOLDOWN, GOVERNOR_STATE_FILE
+from config import IMAGE_CACHE_FOLDER, IMAGE_CACHE_MAX_MB, SEND_TICKET_IMAGE, TICKETS_FOLDER
+from config import NOTIFICATION_BACKENDS, NOTIFICATION_COALESCE_SECONDS, NOTIFICATION_QUEUE_SIZE
+from config import MULTI_TENANT, SUPABASE_SERVICE_KEY, STATE_FOLDER
+from config import OFFLINE_JOURNAL_FILE, SUPABASE_FAILURE_THRESHOLD, SUPABASE_RETRY_SECONDS, SUPABASE_RETRY_MAX_SECONDS
+from config import REPLAY_BATCH_SIZE, FALLBACK_CHANNELS, CONFIRMATION_DEADLINE, HEDGE_ABOVE, HEDGE_DELAY
+from config import SCHEDULED_MESSAGES, SCHEDULE_FILE, SCHEDULE_PLAN_INTERVAL, SCHEDULE_RELEASE_INTERVAL
+from config import SCHEDULE_RETRY_SECONDS, SCHEDULE_MAX_ATTEMPTS
+from config import FEEDBACK_DELAY_MINUTES, REENGAGE_AFTER_DAYS, LOYALTY_REMINDER_DAYS, COALESCE_WINDOW
+from config import WATCHDOG_INTERVAL, WATCHDOG_HEAP_LIMIT_MB, TAB_MAX_AGE_HOURS, BROWSER_MAX_AGE_HOURS
+from config import PROFILE_MAINTENANCE, PROFILE_CACHE_LIMIT_MB, PROFILE_HISTORY_FILE
+from config import INGEST_PORT, INGEST_SECRET
+
+from channels import ChannelRouter, channels_from_names
+import chrome_profile
+from notifications import NotificationService, default_backends, backends_from_names
+from governor import SendGovernor, TRANSACTIONAL, BULK, CAP_REACHED, HELD
+from image_cache import ImageCache
+from ingest import IngestServer, IngestError
+import ledger
+from ledger import SendLedger
+from message_templates import MessageTemplates, order_values
+from models import as_order, decode_orders
+import offline
+from offline import CircuitBreaker, OfflineJournal, is_outage
+from remote_commands import RemoteCommands
+from scheduler import MessageScheduler, OpeningHours
+from priority import READY, CONFIRMATION, RECOVERY, MARKETING
+from watchdog import BrowserWatchdog, RELOAD, RESTART
+import phones
+from shortlinks import ShortLinks
+from tenants import Tenant, TenantContext, DEFAULT_TENANT, FIRST_DEBUG_PORT, load_tenants, tenant_folder
+from ticket_image import save_ticket
+import phone_cache
+from phone_cache import PhoneStatusCache
 
 # ===========================================
 # GLOBALS
 # ===========================================
-driver = None
-is_ready = False
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.abspath(STATE_FOLDER) if STATE_FOLDER else BOT_DIR  # Ledgers, caches, tenants/
+os.makedirs(STATE_DIR, exist_ok=True)
+
+# Known-bad numbers are rejected before opening a chat (shared: a number's status doesn't depend on the tenant)
+phone_status = PhoneStatusCache(os.path.join(STATE_DIR, PHONE_CACHE_FILE))
+
+# Commands from the admin dashboard, claimed by the orders poll (handlers registered below)
+remote = RemoteCommands(SUPABASE_URL)
+
+# Downloaded images (created on first use, see download_image)
+image_cache = None
+
+# Kinds of scheduled messages planned for every tenant (feedback / reengage / loyalty)
+scheduled_kinds = {kind.strip() for kind in SCHEDULED_MESSAGES.split(',') if kind.strip()}
+
+# Supabase calls are skipped while it is unreachable; writes go to each tenant's offline journal
+supabase_breaker = CircuitBreaker(SUPABASE_FAILURE_THRESHOLD, SUPABASE_RETRY_SECONDS, SUPABASE_RETRY_MAX_SECONDS)
+replay_needed = threading.Event()  # Set when the connection comes back (journals replayed by the poll loop)
+
+# Orders are handed over once, whether the poll or a local service (ingest.py) saw them first
+handover_lock = threading.Lock()
+
+def make_context(tenant: Tenant, index: int) -> TenantContext:
+    """WhatsApp session, send ledger + order cursor, governor, templates and links of one tenant"""
+    folder = tenant_folder(tenant, STATE_DIR)
+    site_url = SITE_URL if tenant.is_default or not tenant.domain else f"https://{tenant.domain}"
+    return TenantContext(
+        tenant, folder,
+        session_folder=os.path.join(BOT_DIR, DATA_FOLDER) if tenant.is_default else os.path.join(folder, 'whatsapp_session'),
+        debug_port=FIRST_DEBUG_PORT + index,
+        site_url=site_url,
+        # What was sent (or is being sent) per order, checked before every send
+        ledger=SendLedger(os.path.join(folder, LEDGER_FILE)),
+        # Pacing of every send: session + per-lane token buckets, daily caps, slow-down on warnings
+        governor=SendGovernor(
+            SEND_RATE, SEND_BURST,
+            {TRANSACTIONAL: (TRANSACTIONAL_RATE, TRANSACTIONAL_BURST, TRANSACTIONAL_DAILY_CAP),
+             BULK: (BULK_RATE, BULK_BURST, BULK_DAILY_CAP)},
+            state_path=os.path.join(folder, GOVERNOR_STATE_FILE),
+            cooldown=WARNING_COOLDOWN),
+        # Message wording (templates/*.txt, tenant overrides in tenants/<slug>/templates), compiled once
+        templates=MessageTemplates(os.path.join(folder, 'templates') if not tenant.is_default else TEMPLATES_FOLDER,
+                                   fallback=None if tenant.is_default else TEMPLATES_FOLDER),
+        # Tracking links https://<site>/t/<code> (see shortlinks.py)
+        short_links=ShortLinks(site_url, SUPABASE_URL, SUPABASE_ANON_KEY),
+        # Status writes and confirmations that could not reach Supabase (see offline.py)
+        journal=OfflineJournal(os.path.join(folder, OFFLINE_JOURNAL_FILE)),
+        # WhatsApp deadline, SMS / staff push fallbacks and per-channel stats (see channels.py)
+        router=ChannelRouter(
+            channels_from_names(FALLBACK_CHANNELS.split(','), SUPABASE_URL, SUPABASE_ANON_KEY, tenant.id),
+            CONFIRMATION_DEADLINE, HEDGE_ABOVE, HEDGE_DELAY),
+        # Follow-ups, loyalty reminders, re-engagement, released when due (see scheduler.py)
+        scheduler=MessageScheduler(os.path.join(folder, SCHEDULE_FILE)),
+        # Liveness / memory probes of the browser, warm restarts (see watchdog.py)
+        watchdog=BrowserWatchdog(WATCHDOG_HEAP_LIMIT_MB, TAB_MAX_AGE_HOURS * 3600, BROWSER_MAX_AGE_HOURS * 3600),
+    )
+
+# Twin Pizza; the other tenants are added by listen_for_orders in multi-tenant mode
+default_context = make_context(DEFAULT_TENANT, 0)
+contexts = {DEFAULT_TENANT.id: default_context}
+_local = threading.local()
+
+def ctx() -> TenantContext:
+    """Tenant served by the current thread (tenant workers), the default tenant otherwise"""
+    return getattr(_local, 'context', None) or default_context
 
 # ===========================================
-# WINDOWS NOTIFICATIONS
+# DESKTOP NOTIFICATIONS
 # ===========================================
 
+notifier = NotificationService(
+    backends=backends_from_names(NOTIFICATION_BACKENDS.split(',')) if NOTIFICATION_BACKENDS else default_backends(),
+    max_queue=NOTIFICATION_QUEUE_SIZE,
+    coalesce_window=NOTIFICATION_COALESCE_SECONDS
+)
+
 def show_notification(title: str, message: str, is_error: bool = False):
-    """Show Windows notification using PowerShell"""
-    try:
-        icon = "Warning" if is_error else "Information"
-        ps_script = f'''
-        [Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] > $null
-        $template = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent([Windows.UI.Notifications.ToastTemplateType]::ToastText02)
-        $textNodes = $template.GetElementsByTagName("text")
-        $textNodes.Item(0).AppendChild($template.CreateTextNode("{title}")) > $null
-        $textNodes.Item(1).AppendChild($template.CreateTextNode("{message}")) > $null
-        $toast = [Windows.UI.Notifications.ToastNotification]::new($template)
-        $notifier = [Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Twin Pizza")
-        $notifier.Show($toast)
-        '''
-        subprocess.run(["powershell", "-Command", ps_script], capture_output=True, timeout=5)
-    except Exception as e:
-        # Fallback to simple message box if toast fails
-        try:
-            msg_type = 48 if is_error else 64  # 48=Warning, 64=Info
-            subprocess.run([
-                "powershell", "-Command",
-                f'[System.Windows.Forms.MessageBox]::Show("{message}", "{title}", "OK", "{icon}")'
-            ], capture_output=True, timeout=5)
-        except:
-            safe_print(f"[NOTIF] {title}: {message}")
+    """Queue a desktop notification (returns immediately, shown by a background worker)"""
+    notifier.notify(title, message, is_error=is_error)
 
 def is_browser_already_running():
-    """Check if WhatsApp session is already running"""
+    """Check if the WhatsApp session of the current tenant is already running"""
+    context = ctx()
     try:
         # Check if there's a Chrome process using our data folder
         result = subprocess.run(
@@ -88,12 +170,12 @@ def is_browser_already_running():
              "Get-Process chrome -ErrorAction SilentlyContinue | Select-Object -ExpandProperty CommandLine"],
             capture_output=True, text=True, timeout=5
         )
-        if "whatsapp_session" in result.stdout.lower():
+        if context.session_folder.lower() in result.stdout.lower():
             return True
         
-        # Also check if port 9222 is in use (Chrome remote debugging)
+        # Also check if our debugging port is in use (Chrome remote debugging)
         result = subprocess.run(
-            ["powershell", "-Command", "netstat -an | Select-String '9222'"],
+            ["powershell", "-Command", f"netstat -an | Select-String ':{context.debug_port} '"],
             capture_output=True, text=True, timeout=5
         )
         if "LISTENING" in result.stdout:
@@ -113,21 +195,8 @@ def print_banner():
     safe_print("="*50 + "\n")
 
 def format_phone(phone: str) -> str:
-    """Format phone number to international format (33XXXXXXXXX)"""
-    if not phone:
-        return ""
-    
-    # Remove spaces and special characters
-    phone = re.sub(r'[\s\-\.\(\)]', '', phone)
-    
-    # Remove leading +
-    phone = phone.lstrip('+')
-    
-    # Convert 0X to 33X (French numbers)
-    if phone.startswith('0'):
-        phone = '33' + phone[1:]
-    
-    return phone
+    """Format phone number to international format (33XXXXXXXXX), '' if invalid"""
+    return phones.normalize(phone)
 
 def get_order_type_text(order_type: str) -> str:
     """Get readable order type in French"""
@@ -143,7 +212,18 @@ def get_order_type_text(order_type: str) -> str:
 # ===========================================
 
 def find_chrome_path():
-    """Find Chrome executable path on Windows"""
+    """Find Chrome executable path (registry/default paths on Windows, PATH elsewhere)"""
+    if CHROME_PATH:
+        return CHROME_PATH if os.path.exists(CHROME_PATH) else None
+    
+    if sys.platform != 'win32':
+        import shutil
+        for name in ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]:
+            path = shutil.which(name)
+            if path:
+                return path
+        return None
+    
     import winreg
     try:
         # Try to get Chrome path from registry
@@ -163,9 +243,27 @@ def find_chrome_path():
                 return path
     return None
 
+def record_launch(context: TenantContext, entry: dict, started: float):
+    """Profile size and launch time of this Chrome start, kept in the profile history"""
+    seconds = time.monotonic() - started
+    safe_print(f"[*] WhatsApp Web pret en {seconds:.0f}s")
+    if entry:
+        entry['launch'] = round(seconds, 1)
+        chrome_profile.ProfileHistory(os.path.join(context.folder, PROFILE_HISTORY_FILE)).record(entry)
+
+# Any of these means WhatsApp Web is logged in (chat list visible)
+LOGIN_SELECTORS = [
+    'div[data-testid="chat-list"]',
+    'div[aria-label="Discussions"]',
+    'div[aria-label="Chats"]',
+    '#pane-side',
+    'div[data-testid="default-user"]',
+    'span[data-testid="menu"]'
+]
+
 def init_whatsapp():
-    """Initialize WhatsApp Web browser session"""
-    global driver, is_ready
+    """Initialize the WhatsApp Web browser session of the current tenant"""
+    context = ctx()
     
     # Check if browser is already running
     if is_browser_already_running():
@@ -189,9 +287,17 @@ def init_whatsapp():
     chrome_options.binary_location = chrome_path
     
     # Create session folder if it doesn't exist
-    session_path = os.path.join(os.path.dirname(__file__), DATA_FOLDER)
+    session_path = context.session_folder
     os.makedirs(session_path, exist_ok=True)
     
+    # Prune the profile's caches while Chrome is closed (see chrome_profile.py)
+    profile_entry = None
+    if PROFILE_MAINTENANCE:
+        try:
+            profile_entry = chrome_profile.maintain(session_path, PROFILE_CACHE_LIMIT_MB)
+        except OSError as e:
+            safe_print(f"[WARN] Maintenance du profil Chrome impossible: {e}")
+    
     # User data directory to keep session
     chrome_options.add_argument(f"--user-data-dir={session_path}")
     chrome_options.add_argument("--profile-directory=Default")
@@ -201,18 +307,22 @@ def init_whatsapp():
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1200,900")
-    chrome_options.add_argument("--remote-debugging-port=9222")
+    chrome_options.add_argument(f"--remote-debugging-port={context.debug_port}")
     
-    # Don't run headless - we need to see QR code
-    # chrome_options.add_argument("--headless")
+    # Don't run headless - we need to see QR code (except against the local test harness)
+    if HEADLESS:
+        chrome_options.add_argument("--headless=new")
     
     # Suppress logging
     chrome_options.add_argument("--log-level=3")
     
     try:
-        safe_print("[*] Telechargement du ChromeDriver...")
-        # Initialize Chrome driver with explicit driver type for Windows
-        driver_path = ChromeDriverManager().install()
+        if CHROMEDRIVER_PATH:
+            driver_path = CHROMEDRIVER_PATH
+        else:
+            safe_print("[*] Telechargement du ChromeDriver...")
+            # Initialize Chrome driver with explicit driver type for Windows
+            driver_path = ChromeDriverManager().install()
         safe_print(f"[*] ChromeDriver: {driver_path}")
         
         # On Windows, make sure we're using the .exe file
@@ -225,11 +335,12 @@ def init_whatsapp():
                     break
         
         service = Service(executable_path=driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        launch_started = time.monotonic()
+        driver = context.driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # Navigate to WhatsApp Web
         safe_print("[*] Ouverture de WhatsApp Web...")
-        driver.get("https://web.whatsapp.com")
+        driver.get(WHATSAPP_WEB_URL)
         
         safe_print("\n" + "="*50)
         safe_print("[!] SCANNEZ LE QR CODE AVEC VOTRE TELEPHONE")
@@ -240,16 +351,6 @@ def init_whatsapp():
         safe_print("[...] En attente de connexion...")
         safe_print("[*] Une fois connecte, appuyez sur ENTREE dans ce terminal...")
         
-        # Try multiple selectors for login detection
-        login_selectors = [
-            'div[data-testid="chat-list"]',
-            'div[aria-label="Discussions"]',
-            'div[aria-label="Chats"]', 
-            '#pane-side',
-            'div[data-testid="default-user"]',
-            'span[data-testid="menu"]'
-        ]
-        
         # Poll for any of the selectors to appear
         max_wait = 300  # 5 minutes
         check_interval = 2
@@ -257,12 +358,13 @@ def init_whatsapp():
         
         while elapsed < max_wait:
             try:
-                for selector in login_selectors:
+                for selector in LOGIN_SELECTORS:
                     try:
                         element = driver.find_element(By.CSS_SELECTOR, selector)
                         if element:
                             safe_print(f"\n[OK] WhatsApp connecte avec succes! (detecte: {selector})")
-                            is_ready = True
+                            context.is_ready = True
+                            record_launch(context, profile_entry, launch_started)
                             return True
                     except:
                         pass
@@ -273,7 +375,8 @@ def init_whatsapp():
                     try:
                         driver.find_element(By.CSS_SELECTOR, 'div[id="side"]')
                         safe_print("\n[OK] WhatsApp connecte avec succes!")
-                        is_ready = True
+                        context.is_ready = True
+                        record_launch(context, profile_entry, launch_started)
                         return True
                     except:
                         pass
@@ -298,65 +401,161 @@ def init_whatsapp():
         safe_print(traceback.format_exc())
         return False
 
-def send_whatsapp_message(phone: str, message: str) -> bool:
-    """Send a message via WhatsApp Web"""
-    global driver
+# Multiple selectors for the message input box (WhatsApp changes these frequently)
+INPUT_SELECTORS = [
+    'div[data-testid="conversation-compose-box-input"]',
+    'p.selectable-text.copyable-text',
+    'div[contenteditable="true"][data-tab="10"]',
+    'div[contenteditable="true"][role="textbox"]',
+    'footer div[contenteditable="true"]',
+    'div[aria-placeholder="Entrez un message"]',
+    'div[aria-placeholder="Type a message"]',
+    'div[title="Taper un message"]',
+    'div[title="Type a message"]',
+    '#main footer div[contenteditable="true"]',
+    'div.lexical-rich-text-input div[contenteditable="true"]'
+]
+
+# Popup shown by WhatsApp when the number has no account. The same container is
+# also used for the transient "Demarrage de la discussion..." popup, so match the text.
+INVALID_NUMBER_SELECTOR = 'div[data-testid="popup-contents"]'
+INVALID_NUMBER_MARKERS = ("pas valide", "invalide", "invalid", "not valid")
+
+# Rate-limit / ban warnings shown by WhatsApp (checked after each send)
+WARNING_SELECTORS = ('div[data-testid="popup-contents"]', 'div[role="dialog"]', 'div[data-testid="alert-notification"]')
+WARNING_MARKERS = ("trop de messages", "too many messages", "reessayez plus tard", "réessayez plus tard",
+                   "try again later", "temporairement", "temporarily", "spam", "banni", "banned")
+
+def check_whatsapp_warning() -> bool:
+    """Report a visible rate-limit / ban warning to the send governor"""
+    context = ctx()
+    try:
+        for selector in WARNING_SELECTORS:
+            for element in context.driver.find_elements(By.CSS_SELECTOR, selector):
+                text = element.text.lower()
+                if any(marker in text for marker in WARNING_MARKERS):
+                    context.governor.report_warning(text.replace('\n', ' '))
+                    return True
+    except Exception:
+        pass
+    return False
+
+def wait_send_slot(lane: str) -> bool:
+    """Block until the governor allows a send on `lane` (False + last_send_error if refused)"""
+    context = ctx()
+    refused = context.governor.acquire(lane)
+    if refused:
+        safe_print(f"[WARN] Envoi refuse: {refused}")
+        context.last_send_error = refused
+        return False
+    return True
+
+def check_phone(phone: str):
+    """Return the formatted phone, or None (and set last_send_error) if it is known to be unreachable"""
+    context = ctx()
+    
+    formatted_phone = format_phone(phone)
+    if not formatted_phone:
+        safe_print(f"[WARN] Numero invalide: {phone}")
+        phone_status.set(phone, phone_cache.INVALID_FORMAT)
+        context.last_send_error = phone_cache.REASONS[phone_cache.INVALID_FORMAT]
+        return None
+    
+    cached = phone_status.get(formatted_phone)
+    if cached in (phone_cache.NOT_ON_WHATSAPP, phone_cache.INVALID_FORMAT):
+        safe_print(f"[SKIP] {formatted_phone}: {phone_cache.REASONS[cached]} (cache)")
+        context.last_send_error = phone_cache.REASONS[cached]
+        return None
+    
+    return formatted_phone
+
+def open_chat(formatted_phone: str):
+    """Open the chat and wait for either the compose box or the invalid-number popup.
+    Returns the input box, or None (and records the reason) if the chat can't be used."""
+    context = ctx()
+    driver = context.driver
+    
+    if context.chat_phone == formatted_phone:
+        # Next message of a coalesced batch: the chat is still open, no need to navigate
+        for selector in INPUT_SELECTORS:
+            found = driver.find_elements(By.CSS_SELECTOR, selector)
+            if found:
+                safe_print(f"[*] Conversation deja ouverte ({selector})")
+                return found[0]
+    context.chat_phone = None
+    
+    url = f"{WHATSAPP_WEB_URL}/send?phone={formatted_phone}"
+    driver.get(url)
+    
+    def chat_or_popup(d):
+        for popup in d.find_elements(By.CSS_SELECTOR, INVALID_NUMBER_SELECTOR):
+            if any(marker in popup.text.lower() for marker in INVALID_NUMBER_MARKERS):
+                return ('invalid', None)
+        for selector in INPUT_SELECTORS:
+            found = d.find_elements(By.CSS_SELECTOR, selector)
+            if found:
+                return (selector, found[0])
+        return False
     
-    if not driver or not is_ready:
+    try:
+        selector, input_box = WebDriverWait(driver, CHAT_OPEN_TIMEOUT, poll_frequency=0.5).until(chat_or_popup)
+    except TimeoutException:
+        check_whatsapp_warning()
+        context.watchdog.suspect()
+        safe_print("[ERROR] Impossible de trouver la zone de saisie")
+        context.last_send_error = "Zone de saisie introuvable"
+        return None
+    
+    if selector == 'invalid':
+        safe_print("[ERROR] Numero de telephone non valide sur WhatsApp")
+        phone_status.set(formatted_phone, phone_cache.NOT_ON_WHATSAPP)
+        context.last_send_error = phone_cache.REASONS[phone_cache.NOT_ON_WHATSAPP]
+        return None
+    
+    safe_print(f"[*] Input trouve avec: {selector}")
+    phone_status.set(formatted_phone, phone_cache.VALID)
+    context.chat_phone = formatted_phone
+    return input_box
+
+def check_whatsapp_number(phone: str):
+    """Probe a number without sending anything. Returns a phone_cache status."""
+    formatted_phone = format_phone(phone)
+    cached = phone_status.get(formatted_phone)
+    if cached:
+        return cached
+    if not check_phone(phone):
+        return phone_cache.INVALID_FORMAT
+    if not ctx().driver or not ctx().is_ready:
+        return None
+    open_chat(formatted_phone)
+    return phone_status.get(formatted_phone)
+
+def send_whatsapp_message(phone: str, message: str, lane: str = TRANSACTIONAL) -> bool:
+    """Send a message via WhatsApp Web (paced by the governor on `lane`)"""
+    context = ctx()
+    driver = context.driver
+    
+    context.last_send_error = None
+    if not driver or not context.is_ready:
         safe_print("[ERROR] WhatsApp non connecte")
+        context.last_send_error = "WhatsApp non connecte"
         return False
     
+    refund = False  # A granted slot that ends without a message doesn't count against the daily cap
     try:
-        # Format phone number
-        formatted_phone = format_phone(phone)
-        if len(formatted_phone) < 10:
-            safe_print(f"[WARN] Numero invalide: {phone}")
+        # Format phone number and reject known-bad numbers before opening a chat
+        formatted_phone = check_phone(phone)
+        if not formatted_phone:
             return False
         
+        if not wait_send_slot(lane):
+            return False
+        refund = True
         safe_print(f"[*] Envoi message a {formatted_phone}...")
         
         # Open chat with phone number using WhatsApp URL scheme
-        url = f"https://web.whatsapp.com/send?phone={formatted_phone}"
-        driver.get(url)
-        
-        # Wait for page to load
-        time.sleep(5)
-        
-        # Multiple selectors for the message input box (WhatsApp changes these frequently)
-        input_selectors = [
-            'div[data-testid="conversation-compose-box-input"]',
-            'p.selectable-text.copyable-text',
-            'div[contenteditable="true"][data-tab="10"]',
-            'div[contenteditable="true"][role="textbox"]',
-            'footer div[contenteditable="true"]',
-            'div[aria-placeholder="Entrez un message"]',
-            'div[aria-placeholder="Type a message"]',
-            'div[title="Taper un message"]',
-            'div[title="Type a message"]',
-            '#main footer div[contenteditable="true"]',
-            'div.lexical-rich-text-input div[contenteditable="true"]'
-        ]
-        
-        input_box = None
-        for selector in input_selectors:
-            try:
-                wait = WebDriverWait(driver, 10)
-                input_box = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                if input_box:
-                    safe_print(f"[*] Input trouve avec: {selector}")
-                    break
-            except:
-                continue
-        
+        input_box = open_chat(formatted_phone)
         if not input_box:
-            safe_print("[ERROR] Impossible de trouver la zone de saisie")
-            # Try to check if there's an error (invalid number)
-            try:
-                error_elem = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="popup-contents"]')
-                if error_elem:
-                    safe_print("[ERROR] Numero de telephone non valide sur WhatsApp")
-            except:
-                pass
             return False
         
         # Click on input box to focus - with retry
@@ -403,6 +602,7 @@ def send_whatsapp_message(phone: str, message: str) -> bool:
             except:
                 continue
         
+        refund = False
         if send_button:
             send_button.click()
             safe_print(f"[OK] Message envoye a {formatted_phone}")
@@ -413,11 +613,18 @@ def send_whatsapp_message(phone: str, message: str) -> bool:
         
         # Wait a bit for message to be sent
         time.sleep(2)
+        check_whatsapp_warning()
         return True
         
     except Exception as e:
         safe_print(f"[ERROR] Erreur envoi message a {phone}: {e}")
+        context.last_send_error = str(e)[:200]
+        context.chat_phone = None
+        context.watchdog.suspect()  # Chrome may have crashed
         return False
+    finally:
+        if refund:
+            context.governor.refund(lane)
 
 # ===========================================
 # ORDER NOTIFICATIONS
@@ -426,13 +633,11 @@ def send_whatsapp_message(phone: str, message: str) -> bool:
 def get_loyalty_info(phone: str, headers: dict) -> dict:
     """Fetch loyalty info for a customer"""
     try:
-        # Format phone for lookup
-        formatted = format_phone(phone)
-        
+        # Match the customer whatever spelling the website stored (06..., +336..., 336...)
         response = httpx.get(
             f"{SUPABASE_URL}/rest/v1/loyalty_points",
             headers=headers,
-            params={"select": "*", "customer_phone": f"eq.{phone}"},
+            params={"select": "*", "customer_phone": phones.postgrest_in(phone)},
             timeout=10.0
         )
         
@@ -445,55 +650,51 @@ def get_loyalty_info(phone: str, headers: dict) -> dict:
     return {}
 
 def download_image(url: str) -> str:
-    """Download image from URL and save to temp file, return file path"""
-    try:
-        response = httpx.get(url, timeout=30.0, follow_redirects=True)
-        if response.status_code == 200:
-            import tempfile
-            # Create temp file with .png extension
-            temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-            temp_file.write(response.content)
-            temp_file.close()
-            return temp_file.name
-    except Exception as e:
-        safe_print(f"[WARN] Could not download image: {e}")
-    return ""
+    """Return a local, WhatsApp-sized copy of the image at `url` (cached on disk)"""
+    global image_cache
+    if image_cache is None:
+        image_cache = ImageCache(
+            os.path.join(STATE_DIR, IMAGE_CACHE_FOLDER),
+            max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024)
+    return image_cache.get(url)
 
-def shorten_url(long_url: str) -> str:
-    """Shorten a URL using TinyURL API"""
-    try:
-        # TinyURL API (free, no API key needed)
-        api_url = f"http://tinyurl.com/api-create.php?url={long_url}"
-        response = httpx.get(api_url, timeout=10.0)
-        if response.status_code == 200:
-            short_url = response.text.strip()
-            safe_print(f"[*] URL shortened: {short_url}")
-            return short_url
-    except Exception as e:
-        safe_print(f"[WARN] Could not shorten URL: {e}")
-    return long_url  # Return original if shortening fails
+def shorten_url(phone: str, order_id: str = None) -> str:
+    """Short tracking link of a customer (local code, registered in the background)"""
+    return ctx().short_links.url_for(phone, order_id)
 
-def send_whatsapp_image(phone: str, image_path: str, caption: str = "") -> bool:
-    """Send an image via WhatsApp Web"""
-    global driver
+def send_whatsapp_image(phone: str, image_path: str, caption: str = "", lane: str = TRANSACTIONAL) -> bool:
+    """Send an image via WhatsApp Web (paced by the governor on `lane`).
+    `image_path` is a local file or an http(s) URL, fetched through the image cache."""
+    context = ctx()
+    driver = context.driver
     
-    if not driver or not is_ready:
+    context.last_send_error = None
+    if not driver or not context.is_ready:
         safe_print("[ERROR] WhatsApp non connecte")
+        context.last_send_error = "WhatsApp non connecte"
         return False
     
+    refund = False  # A granted slot that ends without a message doesn't count against the daily cap
     try:
-        # Format phone number
-        formatted_phone = format_phone(phone)
-        if len(formatted_phone) < 10:
-            safe_print(f"[WARN] Numero invalide: {phone}")
+        # Format phone number and reject known-bad numbers before opening a chat
+        formatted_phone = check_phone(phone)
+        if not formatted_phone:
             return False
         
+        if image_path.startswith(('http://', 'https://')):
+            image_path = download_image(image_path)
+            if not image_path:
+                context.last_send_error = "Image introuvable"
+                return False
+        
+        if not wait_send_slot(lane):
+            return False
+        refund = True
         safe_print(f"[*] Envoi image a {formatted_phone}...")
         
         # Open chat with phone number
-        url = f"https://web.whatsapp.com/send?phone={formatted_phone}"
-        driver.get(url)
-        time.sleep(5)
+        if not open_chat(formatted_phone):
+            return False
         
         # Find the attachment button
         attach_selectors = [
@@ -575,9 +776,11 @@ def send_whatsapp_image(phone: str, image_path: str, caption: str = "") -> bool:
             try:
                 send_btn = driver.find_element(By.CSS_SELECTOR, selector)
                 if send_btn:
+                    refund = False
                     send_btn.click()
                     safe_print(f"[OK] Image envoyee a {formatted_phone}")
                     time.sleep(2)
+                    check_whatsapp_warning()
                     return True
             except:
                 continue
@@ -587,185 +790,128 @@ def send_whatsapp_image(phone: str, image_path: str, caption: str = "") -> bool:
         
     except Exception as e:
         safe_print(f"[ERROR] Erreur envoi image a {phone}: {e}")
+        context.last_send_error = str(e)[:200]
         return False
+    finally:
+        if refund:
+            context.governor.refund(lane)
 
-def send_order_confirmation(order: dict):
-    """Send order confirmation message with FULL ORDER DETAILS in French"""
+def send_ticket_image(order, phone: str, portal_url: str, values: dict, lane: str = TRANSACTIONAL) -> bool:
+    """Send the order as a receipt image (ticket_image.py) with the short 'ticket' caption"""
+    context = ctx()
+    ticket_folder = os.path.join(context.folder, TICKETS_FOLDER)
+    try:
+        ticket_path = save_ticket(order, ticket_folder, portal_url, shop_name=context.tenant.shop_name)
+    except Exception as e:
+        safe_print(f"[WARN] Ticket image non genere: {e}")
+        return False
+    try:
+        caption = context.templates.render('ticket', values, order.order_type)
+        return send_whatsapp_image(phone, ticket_path, caption, lane)
+    finally:
+        try:
+            os.remove(ticket_path)
+        except OSError:
+            pass
+
+def send_order_confirmation(order, kind: str = 'confirmation', force: bool = False, ready: bool = False) -> bool:
+    """Send order confirmation message with FULL ORDER DETAILS in French
+    (`force`: send again even if the ledger says it already went out,
+    `ready`: the order is already ready, the ready notice goes in the same message)"""
     
-    phone = order.get('customer_phone', '')
+    order = as_order(order)
+    context = ctx()
+    sent_ledger = context.ledger
+    phone = order.customer_phone
     if not phone:
         safe_print("[WARN] Pas de numero de telephone pour cette commande")
-        return
-    
-    customer_name = order.get('customer_name', 'Client')
-    order_number = order.get('order_number', 'N/A')
-    total = order.get('total', 0)
-    order_type = order.get('order_type', '')
-    items = order.get('items', [])
-    customer_address = order.get('customer_address', '')
-    customer_notes = order.get('customer_notes', '')
-    
-    # Order type in French
-    order_type_text = {
-        'livraison': 'Livraison',
-        'emporter': 'A emporter',
-        'surplace': 'Sur place'
-    }.get(order_type, order_type)
+        return False
     
-    # Build detailed items list
-    items_text = ""
-    if isinstance(items, list):
-        for item in items:
-            qty = item.get('quantity', 1)
-            # Get product name from different possible structures
-            name = item.get('name', '')
-            if not name and item.get('item'):
-                name = item['item'].get('name', 'Produit')
-            if not name:
-                name = 'Produit'
-            
-            price = item.get('totalPrice', item.get('price', 0))
-            
-            # Build item line
-            items_text += f"\n  {qty}x {name}"
-            if price:
-                items_text += f" - {price:.2f} EUR"
-            
-            # Get customizations
-            customization = item.get('customization', {})
-            if customization:
-                details = []
-                
-                # Check if this is a pizza
-                item_category = (item.get('category', '') or item.get('item', {}).get('category', '') or '').lower()
-                is_pizza = 'pizza' in item_category
-                
-                # Size (Taille) - MEGA in bold - ONLY FOR PIZZAS
-                if is_pizza:
-                    size = customization.get('size', '')
-                    if size and size.lower() not in ['', 'none']:
-                        if size.upper() == 'MEGA':
-                            details.append(f"*MEGA*")
-                        else:
-                            details.append(f"{size.upper()}")
-                
-                # Base sauce removed - not needed
-                
-                # Meats (Viandes)
-                meats = customization.get('meats', [])
-                if isinstance(meats, list) and meats:
-                    details.append(f"Viandes: {', '.join(meats)}")
-                elif customization.get('meat'):
-                    details.append(f"Viande: {customization.get('meat')}")
-                
-                # Sauces
-                sauces = customization.get('sauces', [])
-                if isinstance(sauces, list) and sauces:
-                    details.append(f"Sauces: {', '.join(sauces)}")
-                
-                # Garnitures
-                garnitures = customization.get('garnitures', [])
-                if isinstance(garnitures, list) and garnitures:
-                    details.append(f"Garnitures: {', '.join(garnitures)}")
-                
-                # Supplements
-                supplements = customization.get('supplements', [])
-                if isinstance(supplements, list) and supplements:
-                    details.append(f"Supplements: {', '.join(supplements)}")
-                
-                # Cheese supplements
-                cheese = customization.get('cheeseSupplements', [])
-                if isinstance(cheese, list) and cheese:
-                    details.append(f"Fromages: {', '.join(cheese)}")
-                
-                # Menu option
-                menu = customization.get('menuOption', '')
-                if menu and menu.lower() not in ['', 'none']:
-                    details.append(f"Menu: {menu}")
-                
-                # Add details if any
-                if details:
-                    items_text += f"\n     ({' | '.join(details)})"
-            
-            # Item note
-            note = item.get('note', '') or (customization.get('note', '') if customization else '')
-            if note:
-                items_text += f"\n     Note: {note}"
+    # Exactly once: the local ledger knows whether this confirmation already went out
+    if order.id and not force and not sent_ledger.should_send(order.id, 'confirmation'):
+        if sent_ledger.state(order.id, 'confirmation') == ledger.SENT:
+            safe_print(f"[SKIP] Confirmation N{order.order_number} deja envoyee")
+            mark_whatsapp_sent(order.id, get_api_headers())
+        else:
+            safe_print(f"[SKIP] Confirmation N{order.order_number} interrompue pendant l'envoi - non renvoyee")
+        if ready:
+            send_ready_notification(order)
+        return False
     
     # Build portal URL with phone number
-    portal_url = f"https://twinpizza.fr/ticket?phone={phone.replace('+', '')}"
+    portal_url = shorten_url(phone, order.id)
     
-    # Build FULL message in French (no emojis for ChromeDriver compatibility)
-    message = f"""*TWIN PIZZA*
-================================
-
-Bonjour {customer_name} !
-
-Votre commande *{order_number}* est confirmee.
-
---------------------------------
-*VOTRE COMMANDE :*
-{items_text if items_text else '  (aucun article)'}
-
---------------------------------
-*RECAPITULATIF :*
-- Mode : *{order_type_text}*
-- Total : *{total:.2f} EUR*
-- Delai estime : *15 a 25 minutes*"""
-
-    # Add address for delivery
-    if order_type == 'livraison' and customer_address:
-        message += f"\n- Adresse : {customer_address}"
+    # FULL message in French (no emojis for ChromeDriver compatibility), see templates/
+    values = order_values(order, portal_url, context.tenant.shop_name)
     
-    # Add customer notes if any
-    if customer_notes:
-        message += f"\n- Note : {customer_notes}"
+    if ready and order.id and not sent_ledger.should_send(order.id, 'ready'):
+        ready = False  # Ready notice already sent on its own
+    kinds = ['confirmation', 'ready'] if ready else ['confirmation']
+    if order.id:
+        for sent_kind in kinds:
+            sent_ledger.begin(order.id, sent_kind)
     
-    message += f"""
-
---------------------------------
-Suivez votre commande :
-{portal_url}
-
-Merci pour votre confiance !
-*TWIN PIZZA*"""
+    # Receipt image + short caption, falling back to the full text message
+    # Recovery runs go through the bulk budget so they never starve live confirmations
+    lane = BULK if kind == 'recovery' else TRANSACTIONAL
+    def send_whatsapp():
+        _local.context = context  # Runs on the tenant's browser thread when fallbacks are enabled
+        message = context.templates.render(kind, values, order.order_type)
+        if ready:
+            # Confirmation and ready notice coalesced into a single message
+            return send_whatsapp_message(
+                phone, message + '\n\n' + context.templates.render('ready', values, order.order_type), lane)
+        if SEND_TICKET_IMAGE and send_ticket_image(order, phone, portal_url, values, lane):
+            return True
+        return send_whatsapp_message(phone, message, lane)
     
-    # Send the message
-    success = send_whatsapp_message(phone, message)
+    # Live confirmations fall back to SMS / a staff alert when WhatsApp fails or is too slow
+    # (never while sending is paused by hand)
+    messages = {}
+    if kind == 'confirmation' and not context.governor.held:
+        messages = {
+            'sms': context.templates.render('sms', values, order.order_type),
+            'push': f"N{order.order_number} - {order.customer_name} ({phone}): confirmation non recue, "
+                    f"merci d'appeler le client",
+        }
+    success = context.router.deliver(send_whatsapp, phone, order, messages, order.total) is not None
+    if order.id:
+        for sent_kind in kinds:
+            (sent_ledger.commit if success else sent_ledger.fail)(order.id, sent_kind)
     if success:
-        mark_whatsapp_sent(order.get('id'), get_api_headers())
+        mark_whatsapp_sent(order.id, get_api_headers())
         safe_print("[OK] Message complet envoye!")
     else:
-        mark_whatsapp_attempt(order.get('id'), "Failed to send message", get_api_headers())
+        if not mark_whatsapp_attempt(order.id, context.last_send_error or "Failed to send message", get_api_headers()):
+            # Offline: the database can't list it for recovery, the journal will resend it
+            context.journal.add(offline.ORDER, order.id)
         safe_print("[WARN] Echec envoi message")
+    return success
 
-def send_ready_notification(order: dict):
+def send_ready_notification(order):
     """Send order ready notification"""
     
-    phone = order.get('customer_phone', '')
+    order = as_order(order)
+    context = ctx()
+    sent_ledger = context.ledger
+    phone = order.customer_phone
     if not phone:
         return
+    if order.id and not sent_ledger.should_send(order.id, 'ready'):
+        safe_print(f"[SKIP] Notification 'prete' N{order.order_number} deja envoyee")
+        return True
     
-    customer_name = order.get('customer_name', 'Client')
-    order_number = order.get('order_number', 'N/A')
-    order_type = order.get('order_type', '')
-    
-    delivery_text = "Notre livreur arrive bientot !" if order_type == 'livraison' else "Venez la recuperer au restaurant !"
+    message = context.templates.render('ready', order_values(order, shop_name=context.tenant.shop_name),
+                                      order.order_type)
     
-    message = f"""*==============================*
-*      TWIN PIZZA*
-*      Commande PRETE !*
-*==============================*
-
-Bonjour {customer_name} !
-
-Votre commande *{order_number}* est *PRETE* !
-
-{delivery_text}
-
-A tres vite !"""
-    
-    success = send_whatsapp_message(phone, message)
+    if order.id:
+        sent_ledger.begin(order.id, 'ready')
+    def send_whatsapp():
+        _local.context = context
+        return send_whatsapp_message(phone, message)
+    success = context.router.deliver(send_whatsapp, phone, order, {}) is not None
+    if order.id:
+        (sent_ledger.commit if success else sent_ledger.fail)(order.id, 'ready')
     return success
 
 # ===========================================
@@ -773,87 +919,199 @@ A tres vite !"""
 # ===========================================
 
 def get_api_headers():
-    """Get Supabase API headers"""
+    """Get Supabase API headers (scoped to the current tenant by the RLS policies)"""
     return {
         "apikey": SUPABASE_ANON_KEY,
         "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
         "Content-Type": "application/json",
-        "Prefer": "return=minimal"
+        "Prefer": "return=minimal",
+        "x-tenant-id": ctx().tenant.id
     }
 
-def mark_whatsapp_sent(order_id: str, headers: dict = None):
-    """Mark order as WhatsApp sent in database"""
-    if not order_id:
-        return
-    
+def get_poll_headers():
+    """Headers of the shared orders poll: the service key reads every tenant in multi-tenant mode"""
+    key = SUPABASE_SERVICE_KEY if MULTI_TENANT and SUPABASE_SERVICE_KEY else SUPABASE_ANON_KEY
+    return {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json"
+    }
+
+def supabase_request(method: str, url: str, **kwargs):
+    """httpx request through the Supabase circuit breaker: None when offline or on a network error"""
+    if not supabase_breaker.allow():
+        return None
+    try:
+        response = httpx.request(method, url, **kwargs)
+    except httpx.TransportError as e:
+        supabase_breaker.record_failure(e)
+        return None
+    if is_outage(response.status_code):
+        supabase_breaker.record_failure(f"HTTP {response.status_code}")
+    elif supabase_breaker.record_success():
+        replay_needed.set()
+    return response
+
+def write_status(row: dict, headers: dict = None) -> bool:
+    """Upsert one order_processing_status row. False when Supabase is unreachable:
+    the row is then kept in the offline journal and written when the connection is back."""
     if not headers:
         headers = get_api_headers()
+    response = supabase_request(
+        'POST', f"{SUPABASE_URL}/rest/v1/order_processing_status",
+        headers={**headers, "Prefer": "resolution=merge-duplicates"},
+        json=row,
+        timeout=10.0
+    )
+    if response is None or response.status_code >= 500:
+        ctx().journal.add(offline.STATUS, row['order_id'], row)
+        return False
+    if response.status_code not in [200, 201, 204]:
+        safe_print(f"[WARN] Could not update WhatsApp status: {response.status_code}")
+    return True
+
+def mark_whatsapp_sent(order_id: str, headers: dict = None) -> bool:
+    """Mark order as WhatsApp sent in database"""
+    if not order_id:
+        return True
     
-    try:
-        data = {
-            "order_id": order_id,
-            "whatsapp_sent": True,
-            "whatsapp_attempts": 1,
-            "last_whatsapp_attempt": datetime.now().isoformat()
-        }
-        
-        response = httpx.post(
-            f"{SUPABASE_URL}/rest/v1/order_processing_status",
-            headers={**headers, "Prefer": "resolution=merge-duplicates"},
-            json=data,
-            timeout=10.0
-        )
-        
-        if response.status_code not in [200, 201, 204]:
-            safe_print(f"[WARN] Could not update WhatsApp status: {response.status_code}")
-    except Exception as e:
-        safe_print(f"[WARN] DB update error: {e}")
+    return write_status({
+        "order_id": order_id,
+        "whatsapp_sent": True,
+        "whatsapp_attempts": 1,
+        "last_whatsapp_attempt": datetime.now().isoformat()
+    }, headers)
 
-def mark_whatsapp_attempt(order_id: str, error_msg: str, headers: dict = None):
+def mark_whatsapp_attempt(order_id: str, error_msg: str, headers: dict = None) -> bool:
     """Mark failed WhatsApp attempt in database"""
     if not order_id:
-        return
+        return True
     
     if not headers:
         headers = get_api_headers()
     
-    try:
-        # Get current attempts
-        attempts = 1
-        try:
-            response = httpx.get(
-                f"{SUPABASE_URL}/rest/v1/order_processing_status",
-                headers=headers,
-                params={"select": "whatsapp_attempts", "order_id": f"eq.{order_id}"},
-                timeout=10.0
+    # Get current attempts
+    attempts = 1
+    response = supabase_request(
+        'GET', f"{SUPABASE_URL}/rest/v1/order_processing_status",
+        headers=headers,
+        params={"select": "whatsapp_attempts", "order_id": f"eq.{order_id}"},
+        timeout=10.0
+    )
+    if response is not None and response.status_code == 200:
+        data = response.json()
+        if data and len(data) > 0:
+            attempts = (data[0].get('whatsapp_attempts') or 0) + 1
+    
+    return write_status({
+        "order_id": order_id,
+        "whatsapp_sent": False,
+        "whatsapp_attempts": attempts,
+        "last_whatsapp_attempt": datetime.now().isoformat(),
+        "whatsapp_error": error_msg
+    }, headers)
+
+def replay_offline_journal():
+    """Once Supabase is reachable again: write the journaled statuses (in order, in batches,
+    the latest per order), then send the confirmations that failed while offline"""
+    context = ctx()
+    journal = context.journal
+    if not len(journal):
+        return
+    headers = get_api_headers()
+    safe_print(f"\n[RECOVERY] Rejeu du journal hors ligne ({len(journal)} ecriture(s), {context.tenant.name})...")
+    
+    # 1. Statuses: one row per order (the latest wins), batched by column set (PostgREST bulk upsert)
+    latest, seqs = {}, {}
+    for record in journal.pending(offline.STATUS):
+        latest.pop(record['o'], None)
+        latest[record['o']] = record['d']
+        seqs.setdefault(record['o'], []).append(record['n'])
+    batches = {}
+    for order_id, row in latest.items():
+        batches.setdefault(tuple(sorted(row)), []).append(row)
+    written = 0
+    for rows in batches.values():
+        for start in range(0, len(rows), REPLAY_BATCH_SIZE):
+            chunk = rows[start:start + REPLAY_BATCH_SIZE]
+            response = supabase_request(
+                'POST', f"{SUPABASE_URL}/rest/v1/order_processing_status",
+                headers={**headers, "Prefer": "resolution=merge-duplicates"},
+                json=chunk,
+                timeout=30.0
             )
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    attempts = (data[0].get('whatsapp_attempts') or 0) + 1
-        except:
-            pass
-        
-        data = {
-            "order_id": order_id,
-            "whatsapp_sent": False,
-            "whatsapp_attempts": attempts,
-            "last_whatsapp_attempt": datetime.now().isoformat(),
-            "whatsapp_error": error_msg
-        }
-        
-        response = httpx.post(
-            f"{SUPABASE_URL}/rest/v1/order_processing_status",
-            headers={**headers, "Prefer": "resolution=merge-duplicates"},
-            json=data,
-            timeout=10.0
+            if response is None or response.status_code >= 500:
+                safe_print("[WARN] Supabase de nouveau injoignable - rejeu interrompu")
+                return
+            if response.status_code not in [200, 201, 204]:
+                safe_print(f"[WARN] Statuts hors ligne refuses ({response.status_code}) - abandonnes")
+            journal.ack([seq for row in chunk for seq in seqs[row['order_id']]])
+            written += len(chunk)
+    
+    # 2. Confirmations that failed while offline, oldest order first (the ledger prevents duplicates)
+    pending = {}
+    for record in journal.pending(offline.ORDER):
+        pending.setdefault(record['o'], []).append(record['n'])
+    resent = 0
+    order_ids = list(pending)
+    for start in range(0, len(order_ids), REPLAY_BATCH_SIZE):
+        chunk = order_ids[start:start + REPLAY_BATCH_SIZE]
+        response = supabase_request(
+            'GET', f"{SUPABASE_URL}/rest/v1/orders",
+            headers=headers,
+            params={"select": "*", "id": f"in.({','.join(chunk)})", "order": "created_at.asc"},
+            timeout=30.0
         )
-    except Exception as e:
-        safe_print(f"[WARN] DB update error: {e}")
+        if response is None or response.status_code >= 500:
+            safe_print("[WARN] Supabase de nouveau injoignable - rejeu interrompu")
+            return
+        orders = decode_orders(response.content) if response.status_code == 200 else []
+        for order in orders:
+            if context.ledger.should_send(order.id, 'confirmation'):
+                safe_print(f"[RECOVERY] Envoi a {order.customer_name} (N{order.order_number})...")
+                resent += send_order_confirmation(order)
+        # Failures are now recorded in the database (or journaled again if the connection dropped)
+        journal.ack([seq for order_id in chunk for seq in pending[order_id]])
+    
+    safe_print(f"[RECOVERY] Journal hors ligne rejoue: {written} statut(s), {resent} confirmation(s) envoyee(s)")
+
+def reconcile_ledger(headers: dict):
+    """Startup check of the local ledger against order_processing_status:
+    confirmations sent just before a crash get their whatsapp_sent flag, interrupted sends are reported."""
+    sent_ledger = ctx().ledger
+    sent_ids = [order_id for order_id, kind, _ in sent_ledger.entries(ledger.SENT, since=time.time() - 86400)
+                if kind == 'confirmation']
+    marked = set()
+    for start in range(0, len(sent_ids), 100):
+        chunk = sent_ids[start:start + 100]
+        response = supabase_request(
+            'GET', f"{SUPABASE_URL}/rest/v1/order_processing_status",
+            headers=headers,
+            params={"select": "order_id,whatsapp_sent", "order_id": f"in.({','.join(chunk)})"},
+            timeout=30.0
+        )
+        if response is None:
+            safe_print("[WARN] Reconciliation du journal impossible (Supabase injoignable)")
+            return
+        if response.status_code != 200:
+            safe_print(f"[WARN] Reconciliation du journal impossible ({response.status_code})")
+            return
+        marked.update(r['order_id'] for r in response.json() if r.get('whatsapp_sent'))
+    
+    unmarked = [order_id for order_id in sent_ids if order_id not in marked]
+    for order_id in unmarked:
+        mark_whatsapp_sent(order_id, headers)
+    if unmarked:
+        safe_print(f"[RECOVERY] {len(unmarked)} envoi(s) confirme(s) dans la base (crash avant mise a jour)")
+    
+    interrupted = sent_ledger.entries(ledger.INTENT, since=time.time() - 86400)
+    for order_id, kind, _ in interrupted:
+        safe_print(f"[WARN] Envoi '{kind}' interrompu pour la commande {order_id} - a verifier manuellement")
 
 def recover_missed_messages(headers: dict):
-    """Recover and send ONLY orders explicitly marked as whatsapp_sent=false in DB.
+    """Recover ONLY orders explicitly marked as whatsapp_sent=false in DB.
     Orders without a tracking record are assumed to have been sent already (pre-tracking).
+    Each resend is queued on its own at recovery priority, so new orders go first.
     """
     safe_print("\n" + "="*50)
     safe_print("[RECOVERY] VERIFICATION DES MESSAGES MANQUES...")
@@ -890,7 +1148,7 @@ def recover_missed_messages(headers: dict):
         safe_print(f"\n[!] {len(order_ids)} commande(s) avec envoi WhatsApp echoue")
         safe_print("[*] Recuperation en cours...\n")
         
-        recovered = 0
+        queued = 0
         failed = 0
         
         for order_id in order_ids:
@@ -903,12 +1161,12 @@ def recover_missed_messages(headers: dict):
                 )
                 
                 if response.status_code == 200:
-                    full_orders = response.json()
-                    if full_orders and full_orders[0].get('customer_phone'):
+                    full_orders = decode_orders(response.content)
+                    if full_orders and full_orders[0].customer_phone:
                         order = full_orders[0]
-                        safe_print(f"[RECOVERY] Envoi a {order.get('customer_name', 'Client')} (N{order.get('order_number', '?')})...")
-                        send_order_confirmation(order)
-                        recovered += 1
+                        safe_print(f"[RECOVERY] Renvoi a {order.customer_name} (N{order.order_number}) en file")
+                        route(ctx(), 'recovery', order, None)
+                        queued += 1
                     else:
                         failed += 1
                 else:
@@ -916,18 +1174,129 @@ def recover_missed_messages(headers: dict):
             except Exception as e:
                 safe_print(f"[ERROR] {e}")
                 failed += 1
-            
-            time.sleep(5)
         
-        safe_print(f"\n[RECOVERY COMPLETE] {recovered} envoyes, {failed} echecs")
+        safe_print(f"\n[RECOVERY COMPLETE] {queued} renvoi(s) en file, {failed} echecs")
         safe_print("-" * 50 + "\n")
         
-        return recovered, failed
+        return queued, failed
         
     except Exception as e:
         safe_print(f"[ERROR] Recovery error: {e}")
         return 0, 0
 
+# ===========================================
+# SCHEDULED MESSAGES (see scheduler.py)
+# ===========================================
+
+def plan_scheduled_messages():
+    """Plan the follow-ups of the current tenant. Idempotent: every message has a stable key,
+    so overlapping passes (and restarts) never plan the same message twice."""
+    context = ctx()
+    scheduler = context.scheduler
+    headers = get_api_headers()
+    now = datetime.now(timezone.utc)
+    planned = 0
+    
+    response = supabase_request('GET', f"{SUPABASE_URL}/rest/v1/opening_hours", headers=headers,
+                                params={"select": "*"}, timeout=30.0)
+    if response is not None and response.status_code == 200 and response.json():
+        scheduler.hours = OpeningHours(response.json())
+    
+    if 'feedback' in scheduled_kinds:
+        # "How was your pizza?" FEEDBACK_DELAY_MINUTES after the order became ready
+        response = supabase_request('GET', f"{SUPABASE_URL}/rest/v1/orders", headers=headers, params={
+            "select": "id,order_number,customer_name,customer_phone,updated_at",
+            "status": "in.(ready,completed)",
+            "updated_at": f"gte.{(now - timedelta(hours=3)).isoformat()}",
+        }, timeout=30.0)
+        for row in (response.json() if response is not None and response.status_code == 200 else []):
+            if not row.get('customer_phone') or not row.get('updated_at'):
+                continue
+            due = _parse_timestamp(row['updated_at']).timestamp() + FEEDBACK_DELAY_MINUTES * 60
+            planned += scheduler.schedule(f"feedback:{row['id']}", due, 'feedback', row['customer_phone'], {
+                'customer_name': row.get('customer_name') or 'Client', 'order_number': row.get('order_number')})
+    
+    # Lapsed customers / unused rewards: last order exactly N days ago (one day window per pass)
+    for kind, days, extra in (('reengage', REENGAGE_AFTER_DAYS, []),
+                              ('loyalty', LOYALTY_REMINDER_DAYS, [("pending_rewards", "neq.[]")])):
+        if kind not in scheduled_kinds:
+            continue
+        newest = now - timedelta(days=days)
+        response = supabase_request('GET', f"{SUPABASE_URL}/rest/v1/loyalty_points", headers=headers, params=[
+            ("select", "customer_phone,customer_name,last_order_at"),
+            ("last_order_at", f"gte.{(newest - timedelta(days=1)).isoformat()}"),
+            ("last_order_at", f"lt.{newest.isoformat()}"),
+        ] + extra, timeout=30.0)
+        for row in (response.json() if response is not None and response.status_code == 200 else []):
+            phone = row.get('customer_phone')
+            if not phone:
+                continue
+            key = f"{kind}:{phones.normalize(phone) or phone}:{row['last_order_at'][:10]}"
+            planned += scheduler.schedule(key, time.time(), kind, phone,
+                                          {'customer_name': row.get('customer_name') or 'Client'})
+    
+    if planned:
+        safe_print(f"[*] {planned} message(s) programme(s) ({context.tenant.name}, {len(scheduler)} en attente)")
+
+def send_scheduled_message(entry: dict):
+    """One due message, on the bulk lane (at most once: the send ledger records the attempt)"""
+    context = ctx()
+    key, phone = entry['key'], entry['phone']
+    if not context.ledger.should_send(key, 'scheduled'):
+        context.scheduler.done(key)
+        return
+    try:
+        deliver_scheduled(context, entry)
+    except Exception as e:
+        # pop_due() took the entry off the heap: put it back or it waits for the next restart
+        if context.ledger.state(key, 'scheduled') == ledger.SENT:
+            context.scheduler.done(key)
+            return
+        if context.ledger.state(key, 'scheduled') == ledger.INTENT:
+            context.ledger.fail(key, 'scheduled')
+        attempts = entry.get('attempts', 0) + 1
+        if attempts >= SCHEDULE_MAX_ATTEMPTS:
+            safe_print(f"[ERROR] Message programme '{entry['kind']}' abandonne apres {attempts} erreurs ({phone}): {e}")
+            context.scheduler.done(key)
+            return
+        delay = SCHEDULE_RETRY_SECONDS * 2 ** (attempts - 1)
+        safe_print(f"[WARN] Message programme '{entry['kind']}' en erreur ({phone}): {e} - nouvel essai dans {delay // 60} min")
+        entry['attempts'] = attempts
+        context.scheduler.reschedule(entry, time.time() + delay)
+
+def deliver_scheduled(context: TenantContext, entry: dict):
+    """Render and send a scheduled message, then report it to the scheduler (done / reschedule)"""
+    key, phone = entry['key'], entry['phone']
+    values = {'shop_name': context.tenant.shop_name, 'portal_url': shorten_url(phone), **entry['values']}
+    message = context.templates.render(entry['kind'], values)
+    context.ledger.begin(key, 'scheduled')
+    def send_whatsapp():
+        _local.context = context
+        return send_whatsapp_message(phone, message, BULK)
+    success = context.router.deliver(send_whatsapp, phone, None, {}) is not None
+    (context.ledger.commit if success else context.ledger.fail)(key, 'scheduled')
+    if not success and (context.last_send_error or '').startswith(CAP_REACHED):
+        # Daily bulk cap reached: try again at the next opening tomorrow
+        tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        context.scheduler.reschedule(entry, context.scheduler.hours.next_open(tomorrow).timestamp())
+        return
+    if not success and (context.last_send_error or '').startswith(HELD):
+        # Paused by hand: due again as soon as sending resumes (release_scheduled waits meanwhile)
+        context.scheduler.reschedule(entry, time.time())
+        return
+    context.scheduler.done(key)
+    safe_print(f"[{'OK' if success else 'WARN'}] Message programme '{entry['kind']}' "
+               f"{'envoye' if success else 'non envoye'} ({phone})")
+
+def release_scheduled(context: TenantContext, client: httpx.Client):
+    """Hand the next due scheduled message to the tenant, only when no order is waiting and
+    at most one every SCHEDULE_RELEASE_INTERVAL seconds (none while sending is paused)"""
+    if context.busy or context.governor.held or time.monotonic() - context.last_release < SCHEDULE_RELEASE_INTERVAL:
+        return
+    for entry in context.scheduler.pop_due(1):
+        context.last_release = time.monotonic()
+        route(context, 'scheduled', entry, client)
+
 # ===========================================
 # SUPABASE REALTIME LISTENER
 # ===========================================
@@ -946,27 +1315,379 @@ def handle_update(payload):
     # Check if status changed to 'ready'
     if new_order.get('status') == 'ready' and old_order.get('status') != 'ready':
         safe_print(f"\n[READY] Commande prete ! a {datetime.now().strftime('%H:%M:%S')}")
-        send_ready_notification(new_order)
+        hand_over_ready(ctx(), as_order(new_order), None)
+
+# ===========================================
+# REMOTE COMMANDS (see remote_commands.py)
+# ===========================================
+
+def restart_browser(argument: str, payload: dict) -> str:
+    if not heal_browser(RESTART):
+        raise RuntimeError("WhatsApp Web n'a pas redemarre")
+    return "navigateur relance"
+
+def resend_order(argument: str, payload: dict) -> str:
+    order_id = argument or payload.get('order_id')
+    if not order_id:
+        raise ValueError("id de commande manquant")
+    response = httpx.get(f"{SUPABASE_URL}/rest/v1/orders", headers=get_api_headers(),
+                         params={"select": "*", "id": f"eq.{order_id}"}, timeout=30.0)
+    orders = decode_orders(response.content) if response.status_code == 200 else []
+    if not orders:
+        raise ValueError(f"commande {order_id} introuvable")
+    if not send_order_confirmation(orders[0], force=True):
+        raise RuntimeError(ctx().last_send_error or "echec de l'envoi")
+    return f"confirmation N{orders[0].order_number} renvoyee"
+
+def drain_queue(argument: str, payload: dict) -> str:
+    queued, failed = recover_missed_messages(get_api_headers())
+    return f"{queued} renvoi(s) en file, {failed} echec(s)"
+
+def pause_sending(argument: str, payload: dict) -> str:
+    ctx().governor.hold(argument or payload.get('reason') or 'pause a distance')
+    return "envois suspendus"
+
+def resume_sending(argument: str, payload: dict) -> str:
+    ctx().governor.release()
+    # Confirmations refused during the pause are pending in order_processing_status
+    return "envois repris - " + drain_queue('', {})
+
+remote.register('restart-browser', restart_browser)
+remote.register('resend-order', resend_order)
+remote.register('drain-queue', drain_queue)
+remote.register('pause', pause_sending)
+remote.register('resume', resume_sending)
+
+# ===========================================
+# BROWSER WATCHDOG (see watchdog.py)
+# ===========================================
+
+def restart_whatsapp() -> bool:
+    """Close Chrome (if still there) and start it again on the same profile: no new QR scan"""
+    context = ctx()
+    context.is_ready = False
+    context.chat_phone = None
+    if context.driver:
+        try:
+            context.driver.quit()
+        except Exception:
+            pass
+        context.driver = None
+    return init_whatsapp()
+
+def reload_whatsapp() -> bool:
+    """Reload WhatsApp Web in the same tab (frees the page's memory) and wait for the chat list"""
+    context = ctx()
+    context.chat_phone = None
+    try:
+        context.driver.get(WHATSAPP_WEB_URL)
+        WebDriverWait(context.driver, CHAT_OPEN_TIMEOUT * 3, poll_frequency=1).until(
+            lambda d: any(d.find_elements(By.CSS_SELECTOR, selector) for selector in LOGIN_SELECTORS))
+        return True
+    except Exception as e:
+        safe_print(f"[WARN] Rechargement de WhatsApp Web en echec: {e}")
+        return False
+
+def heal_browser(action: str) -> bool:
+    """Reload the tab or restart Chrome (a failed reload escalates to a restart)"""
+    context = ctx()
+    started = time.monotonic()
+    safe_print(f"[*] {'Rechargement de WhatsApp Web' if action == RELOAD else 'Redemarrage de Chrome'} "
+               f"({context.tenant.name})...")
+    ok = reload_whatsapp() if action == RELOAD else restart_whatsapp()
+    if not ok and action == RELOAD:
+        action, ok = RESTART, restart_whatsapp()
+    outage = context.watchdog.down_since is not None
+    context.watchdog.recovered(action, ok)  # Reports the time-to-recovery of an outage
+    if ok and not outage:
+        safe_print(f"[OK] Navigateur pret en {time.monotonic() - started:.0f}s")
+    return ok
+
+def watch_browser(context: TenantContext, idle: bool):
+    """Probe the tenant's browser and repair it (runs in its worker: queued messages wait)"""
+    try:
+        action = context.watchdog.check(context.driver, idle)
+        if action:
+            heal_browser(action)
+    except Exception as e:
+        safe_print(f"[ERROR] Surveillance du navigateur ({context.tenant.name}): {e}")
+
+# ===========================================
+# TENANTS (see tenants.py)
+# ===========================================
+
+def start_tenants(client: httpx.Client) -> list:
+    """Contexts to serve, each with a worker thread serving its priority inbox. In multi-tenant
+    mode every active tenant gets its own worker and browser, so one stuck session never
+    delays another tenant."""
+    if not MULTI_TENANT or not SUPABASE_SERVICE_KEY:
+        if MULTI_TENANT:
+            safe_print("[WARN] BOT_MULTI_TENANT=1 sans BOT_SUPABASE_SERVICE_KEY - seul le restaurant par defaut est servi")
+        start_worker(default_context)
+        return [default_context]
+    while True:
+        try:
+            tenants = load_tenants(client, SUPABASE_URL, get_poll_headers())
+            break
+        except httpx.TransportError as e:
+            safe_print(f"[WARN] Liste des restaurants indisponible ({e}) - nouvel essai dans {SUPABASE_RETRY_SECONDS}s")
+            time.sleep(SUPABASE_RETRY_SECONDS)
+    for tenant in tenants:
+        context = contexts.get(tenant.id)
+        if context is None:
+            context = contexts[tenant.id] = make_context(tenant, len(contexts))
+        start_worker(context)
+    safe_print(f"[OK] {len(contexts)} restaurant(s) servi(s): {', '.join(c.tenant.name for c in contexts.values())}")
+    return list(contexts.values())
+
+def start_worker(context: TenantContext):
+    context.thread = threading.Thread(target=tenant_worker, args=(context,),
+                                      name=f"tenant-{context.tenant.slug}", daemon=True)
+    context.thread.start()
+
+def startup_recovery(context: TenantContext):
+    """Confirmations sent right before a crash, then missed messages (runs in the tenant's thread)"""
+    headers = get_api_headers()
+    replay_offline_journal()
+    reconcile_ledger(headers)
+    safe_print(f"\n[*] Verification des messages manques ({context.tenant.name})...")
+    queued, failed = recover_missed_messages(headers)
+    if queued > 0:
+        show_notification("WhatsApp Bot Recovery", f"{queued} message(s) de recuperation en cours d'envoi")
+
+def handle_work(context: TenantContext, kind: str, item, client: httpx.Client, ready: bool = False):
+    """One order, ready notification, recovery resend, remote command, offline journal replay
+    or scheduled message of a tenant (`ready`: see send_order_confirmation)"""
+    if kind == 'command':
+        remote.dispatch(client, get_poll_headers(), [item])
+        return
+    if kind == 'replay':
+        replay_offline_journal()
+        return
+    if kind == 'plan':
+        plan_scheduled_messages()
+        return
+    if kind == 'scheduled':
+        send_scheduled_message(item)
+        return
+    if kind == 'recovery':
+        send_order_confirmation(item, kind='recovery', ready=ready)
+        return
+    if kind == 'ready':
+        send_ready_notification(item)
+        return
+    safe_print(f"\n{'='*50}")
+    safe_print("[NEW ORDER] NOUVELLE COMMANDE DETECTEE !" + (f" ({context.tenant.name})" if MULTI_TENANT else ''))
+    safe_print(f"   Numero: N{item.order_number}")
+    safe_print(f"   Client: {item.customer_name}")
+    safe_print(f"   Tel: {item.customer_phone or 'N/A'}")
+    safe_print(f"{'='*50}")
+    send_order_confirmation(item, ready=ready)
+    if item.id not in context.pushed:
+        context.ledger.advance(item.created_at)  # A pushed order may be newer than orders not polled yet
+
+def tenant_worker(context: TenantContext):
+    """Serve one tenant's inbox with its own browser session"""
+    _local.context = context
+    client = httpx.Client(timeout=30.0)
+    if not context.is_ready and not init_whatsapp():
+        safe_print(f"[ERROR] WhatsApp non initialise pour {context.tenant.name} (commande restart-browser pour reessayer)")
+    startup_recovery(context)
+    while True:
+        work = context.inbox.get(timeout=WATCHDOG_INTERVAL)
+        if work is None or context.watchdog.due(WATCHDOG_INTERVAL):
+            # Idle: probe and recycle if due; busy: probe only (a crashed Chrome is restarted first)
+            watch_browser(context, idle=work is None)
+        if work is None:
+            continue
+        batch = coalesce(context, *work)
+        for kind, item, ready in merge_work(batch):
+            try:
+                handle_work(context, kind, item, client, ready)
+            except Exception as e:
+                safe_print(f"[ERROR] {context.tenant.name}: {e}")
+        context.chat_phone = None  # Never type into a chat left open by an earlier batch
+        for _ in batch:
+            context.inbox.task_done()
+
+# Kinds of work that message a customer about an order (coalesced per phone)
+COALESCED_KINDS = ('order', 'recovery', 'ready')
+
+def work_phone(kind: str, item) -> str:
+    """Normalized phone a work item messages, '' if it is not coalesced"""
+    if kind not in COALESCED_KINDS:
+        return ''
+    return phones.normalize(as_order(item).customer_phone or '')
+
+def coalesce(context: TenantContext, kind: str, item) -> list:
+    """`(kind, item)` plus the other messages to the same customer queued within COALESCE_WINDOW,
+    taken out of the inbox so they are sent in the same chat visit"""
+    phone = work_phone(kind, item)
+    if not phone or COALESCE_WINDOW <= 0:
+        return [(kind, item)]
+    return [(kind, item)] + context.inbox.take(lambda work: work_phone(*work) == phone, COALESCE_WINDOW)
+
+def merge_work(batch: list) -> list:
+    """Drop the superseded messages of a coalesced batch: one confirmation per order (the live
+    one wins over a recovery resend), and the ready notice of an order whose confirmation is
+    still pending goes in the same message. Returns (kind, item, ready) triples."""
+    if len(batch) == 1:
+        return [batch[0] + (False,)]
+    confirmations, readies = {}, {}
+    for kind, item in batch:
+        order_id = as_order(item).id or id(item)
+        if kind == 'ready':
+            readies.setdefault(order_id, (kind, item))
+        elif order_id not in confirmations or (confirmations[order_id][0], kind) == ('recovery', 'order'):
+            confirmations[order_id] = (kind, item)
+    merged = [work + (order_id in readies,) for order_id, work in confirmations.items()]
+    merged += [work + (False,) for order_id, work in readies.items() if order_id not in confirmations]
+    safe_print(f"[*] {len(batch)} message(s) pour {work_phone(*batch[0])} regroupe(s) "
+               f"en {len(merged)} envoi(s) dans la meme conversation")
+    return merged
+
+# Priority class of each kind of work (see priority.py)
+WORK_CLASSES = {'ready': READY, 'command': READY, 'order': CONFIRMATION, 'recovery': RECOVERY,
+                'replay': RECOVERY, 'plan': MARKETING, 'scheduled': MARKETING}
+
+def route(context: TenantContext, kind: str, item, client: httpx.Client):
+    """Hand work to the tenant's worker (most urgent first), or run it inline without a worker"""
+    if context.thread:
+        context.inbox.put((kind, item), WORK_CLASSES[kind])
+    else:
+        handle_work(context, kind, item, client)
+
+# ===========================================
+# SHARED ORDERS POLL
+# ===========================================
+
+def polls_all_tenants() -> bool:
+    """The poll uses the service key: it must be filtered to the tenants served (see tenant_ids)"""
+    return MULTI_TENANT and bool(SUPABASE_SERVICE_KEY)
+
+def order_context(order) -> TenantContext:
+    """Tenant serving an order (None: a tenant this process doesn't serve)"""
+    return contexts.get(order.tenant_id) if polls_all_tenants() else default_context
+
+def hand_over(context: TenantContext, order, client: httpx.Client, pushed: bool = False) -> bool:
+    """Queue a new order for its confirmation, unless it was already handed over or confirmed"""
+    with handover_lock:
+        if order.id in context.enqueued or context.ledger.state(order.id, 'confirmation'):
+            return False
+        if len(context.enqueued) > 1000:
+            context.enqueued.clear()  # Long past the overlap window
+            context.pushed.clear()
+        context.enqueued.add(order.id)
+        if pushed:
+            context.pushed.add(order.id)
+    route(context, 'order', order, client)
+    return True
+
+def hand_over_ready(context: TenantContext, order, client: httpx.Client) -> bool:
+    """Queue the ready notice of an order once (the poll re-reads READY_LOOKBACK_SECONDS)"""
+    with handover_lock:
+        if order.id in context.readied or context.ledger.state(order.id, 'ready'):
+            return False
+        if len(context.readied) > 1000:
+            context.readied.clear()
+        context.readied.add(order.id)
+    route(context, 'ready', order, client)
+    return True
+
+def poll_ready(client: httpx.Client, headers: dict, tenant_ids: list):
+    """Orders marked ready within READY_LOOKBACK_SECONDS (by updated_at, placed within
+    CATCHUP_MAX_AGE_HOURS) -> their ready notice. A confirmation still queued for the same
+    customer goes out with it in one message (see coalesce / merge_work)."""
+    now = datetime.now(timezone.utc)
+    params = [("select", "*"), ("status", "eq.ready"),
+              ("updated_at", f"gt.{(now - timedelta(seconds=READY_LOOKBACK_SECONDS)).isoformat()}"),
+              ("created_at", f"gt.{(now - timedelta(hours=CATCHUP_MAX_AGE_HOURS)).isoformat()}"),
+              ("order", "updated_at.asc"), ("limit", str(POLL_LIMIT))]
+    if tenant_ids:
+        params.append(("tenant_id", f"in.({','.join(tenant_ids)})"))
+    response = client.get(f"{SUPABASE_URL}/rest/v1/orders", headers=headers, params=params)
+    if response.status_code != 200:
+        safe_print(f"[WARN] Erreur API (commandes pretes): {response.status_code}")
+        return
+    for order in decode_orders(response.content):
+        context = order_context(order)
+        if context is not None and order.id and hand_over_ready(context, order, client):
+            safe_print(f"\n[READY] Commande N{order.order_number} prete ({context.tenant.name})")
+
+def ingest_order(body: dict):
+    """POST /orders of the local ingest endpoint (see ingest.py): `order` row or `order_id`.
+    Returns (queued, message); raises IngestError when the order is refused."""
+    if isinstance(body.get('order'), dict):
+        order = as_order(body['order'])
+    elif body.get('order_id'):
+        try:
+            response = httpx.get(f"{SUPABASE_URL}/rest/v1/orders", headers=get_poll_headers(),
+                                 params={"select": "*", "id": f"eq.{body['order_id']}"}, timeout=10.0)
+        except httpx.TransportError as e:
+            raise IngestError(503, f"Supabase injoignable: {e}")
+        orders = decode_orders(response.content) if response.status_code == 200 else []
+        if not orders:
+            raise IngestError(404, f"commande {body['order_id']} introuvable")
+        order = orders[0]
+    else:
+        raise IngestError(400, "order ou order_id manquant")
+    if not order.id:
+        raise IngestError(400, "commande sans id")
+    context = order_context(order)
+    if context is None:
+        raise IngestError(404, "restaurant non servi par ce bot")
+    try:
+        if _parse_timestamp(order.created_at) < datetime.now(timezone.utc) - timedelta(hours=CATCHUP_MAX_AGE_HOURS):
+            return False, "commande trop ancienne"
+    except (AttributeError, ValueError):
+        pass  # No usable created_at: treated as new
+    if not hand_over(context, order, None, pushed=True):
+        return False, "commande deja prise en charge"
+    safe_print(f"[*] Commande N{order.order_number} recue en direct ({context.tenant.name})")
+    return True, f"N{order.order_number} en file"
+
+def start_ingest():
+    """Local endpoint the print server / hub push new orders to (off without BOT_INGEST_SECRET)"""
+    if not INGEST_SECRET or not INGEST_PORT:
+        return None
+    try:
+        server = IngestServer(INGEST_PORT, INGEST_SECRET, ingest_order)
+    except OSError as e:
+        safe_print(f"[WARN] Reception locale des commandes indisponible (port {INGEST_PORT}): {e}")
+        return None
+    server.start()
+    safe_print(f"[OK] Reception locale des commandes: http://127.0.0.1:{INGEST_PORT}/orders")
+    return server
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def poll_since(context: TenantContext = None) -> str:
+    """Lower bound of created_at for the next poll: the tenant's ledger cursor minus an overlap
+    (orders committed late), but never older than CATCHUP_MAX_AGE_HOURS"""
+    cursor = (context or ctx()).ledger.cursor
+    since = datetime.now(timezone.utc) - timedelta(hours=CATCHUP_MAX_AGE_HOURS)
+    if cursor:
+        try:
+            since = max(since, _parse_timestamp(cursor) - timedelta(seconds=POLL_OVERLAP_SECONDS))
+        except ValueError:
+            pass
+    return since.isoformat()
 
 def listen_for_orders():
-    """Start listening for orders from Supabase using REST API"""
+    """Start listening for orders from Supabase using REST API (one shared poll for every tenant)"""
     
     safe_print("\n[*] Demarrage de l'ecoute des commandes...")
     
     # Supabase REST API headers
-    headers = {
-        "apikey": SUPABASE_ANON_KEY,
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-        "Content-Type": "application/json"
-    }
+    headers = get_poll_headers()
     
     base_url = f"{SUPABASE_URL}/rest/v1/orders"
     
     try:
-        safe_print("[*] Mode: Polling des nouvelles commandes (toutes les 10 secondes)")
+        safe_print(f"[*] Mode: Polling des nouvelles commandes (toutes les {POLL_INTERVAL:g} secondes)")
         
-        # Get the last order ID we've seen
-        last_seen_id = None
         last_order_number = None
         
         # Create HTTP client
@@ -974,83 +1695,157 @@ def listen_for_orders():
         
         # Initial fetch to get the latest order
         safe_print("[*] Connexion a Supabase...")
-        response = client.get(
-            base_url,
-            headers=headers,
-            params={"select": "*", "order": "created_at.desc", "limit": "1"}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                last_seen_id = data[0].get('id')
-                last_order_number = data[0].get('order_number')
-                safe_print(f"[OK] Connecte a Supabase ! Derniere commande: N{last_order_number}")
+        active = start_tenants(client)
+        # With the service key every request is filtered to the tenants served, even a single one
+        tenant_ids = [context.tenant.id for context in active] if polls_all_tenants() else None
+        for context in active:
+            params = {"select": "*", "order": "created_at.desc", "limit": "1"}
+            if tenant_ids:
+                params["tenant_id"] = f"eq.{context.tenant.id}"
+            try:
+                response = client.get(base_url, headers=headers, params=params)
+            except httpx.TransportError as e:
+                # Offline start: the cursor in the ledger is enough to catch up once the connection is back
+                supabase_breaker.record_failure(e)
+                safe_print(f"[WARN] Supabase injoignable au demarrage ({context.tenant.name}): {e}")
+                continue
+            
+            if response.status_code == 200:
+                data = response.json()
+                if data:
+                    last_order_number = data[0].get('order_number')
+                    safe_print(f"[OK] Connecte a Supabase ! Derniere commande ({context.tenant.name}): N{last_order_number}")
+                    if context.ledger.cursor:
+                        safe_print(f"[*] Reprise des commandes passees depuis {context.ledger.cursor[:19]}")
+                    else:
+                        # First start: only orders placed from now on
+                        context.ledger.advance(data[0].get('created_at'))
+                else:
+                    safe_print(f"[*] Aucune commande existante trouvee ({context.tenant.name})")
+            elif is_outage(response.status_code):
+                # Supabase down at start: same as offline, the ledger cursor catches up later
+                supabase_breaker.record_failure(f"HTTP {response.status_code}")
+                safe_print(f"[WARN] Supabase indisponible au demarrage ({context.tenant.name}): "
+                           f"HTTP {response.status_code}")
             else:
-                safe_print("[*] Aucune commande existante trouvee")
-        else:
-            safe_print(f"[ERROR] Erreur Supabase: {response.status_code} - {response.text}")
-            return
+                safe_print(f"[ERROR] Erreur Supabase: {response.status_code} - {response.text}")
+                return
         
+        start_ingest()
         safe_print("\n[OK] Bot pret ! En attente de nouvelles commandes...\n")
         safe_print("-" * 50)
         
         # Show Windows notification that bot is ready
         show_notification("WhatsApp Bot ✅", "Bot connecte et pret! En attente de commandes...")
         
-        # RECOVERY: Send missed messages
-        safe_print("\n[*] Verification des messages manques...")
-        recovered, failed = recover_missed_messages(headers)
-        if recovered > 0:
-            show_notification("WhatsApp Bot Recovery", f"{recovered} message(s) de recuperation envoye(s)!")
-        
         poll_count = 0
+        last_plan = -SCHEDULE_PLAN_INTERVAL
         while True:
             try:
+                # Offline: no request until the breaker lets a probe through
+                if not supabase_breaker.allow():
+                    time.sleep(min(POLL_INTERVAL, 1))
+                    continue
                 poll_count += 1
                 
-                # Check for new orders
-                response = client.get(
-                    base_url,
-                    headers=headers,
-                    params={"select": "*", "order": "created_at.desc", "limit": "5"}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        # Check the most recent order
-                        latest = data[0]
-                        latest_id = latest.get('id')
-                        
-                        if latest_id != last_seen_id:
-                            order_num = latest.get('order_number')
-                            customer = latest.get('customer_name', 'Client')
-                            phone = latest.get('customer_phone', 'N/A')
-                            
-                            safe_print(f"\n{'='*50}")
-                            safe_print(f"[NEW ORDER] NOUVELLE COMMANDE DETECTEE !")
-                            safe_print(f"   Numero: N{order_num}")
-                            safe_print(f"   Client: {customer}")
-                            safe_print(f"   Tel: {phone}")
-                            safe_print(f"{'='*50}")
-                            
-                            send_order_confirmation(latest)
-                            last_seen_id = latest_id
-                            last_order_number = order_num
+                # Every order created after the oldest tenant cursor, oldest first,
+                # plus the remote commands claimed in the same request
+                since = min(poll_since(context) for context in active)
+                rows = None
+                polled = remote.poll(client, headers, since, POLL_LIMIT, tenant_ids)
+                if polled is not None:
+                    rows, commands = polled
+                    for command in commands:
+                        route(contexts.get(command.get('tenant_id')) or default_context, 'command', command, client)
                 else:
-                    safe_print(f"[WARN] Erreur API: {response.status_code}")
+                    params = {"select": "*", "created_at": f"gt.{since}",
+                              "order": "created_at.asc", "limit": str(POLL_LIMIT)}
+                    if tenant_ids:
+                        params["tenant_id"] = f"in.({','.join(tenant_ids)})"
+                    response = client.get(base_url, headers=headers, params=params)
+                    if response.status_code == 200:
+                        rows = response.content
+                    elif is_outage(response.status_code):
+                        response.raise_for_status()  # Counted by the breaker below
+                    else:
+                        safe_print(f"[WARN] Erreur API: {response.status_code}")
+                if supabase_breaker.record_success() or replay_needed.is_set():
+                    # Back online: write what was journaled, resend what failed meanwhile
+                    replay_needed.clear()
+                    for context in active:
+                        if len(context.journal):
+                            route(context, 'replay', None, client)
+                
+                if rows is not None:
+                    newest = None
+                    for latest in decode_orders(rows):
+                        newest = latest.created_at or newest
+                        context = order_context(latest)
+                        if context is not None:
+                            hand_over(context, latest, client)  # Skipped if pushed (ingest.py) or confirmed
+                            last_order_number = latest.order_number
+                    # Everything up to the newest polled order has been seen: idle tenants move on
+                    for context in active:
+                        if newest and not context.busy:
+                            context.ledger.advance(newest)
+                    if READY_NOTIFICATIONS:
+                        poll_ready(client, headers, tenant_ids)
+                
+                # Scheduled messages: re-plan every few minutes, release what is due when idle
+                if scheduled_kinds:
+                    if time.monotonic() - last_plan >= SCHEDULE_PLAN_INTERVAL:
+                        last_plan = time.monotonic()
+                        for context in active:
+                            route(context, 'plan', None, client)
+                    for context in active:
+                        release_scheduled(context, client)
                 
                 # Show status every ~30 seconds (3 polls)
                 if poll_count % 3 == 0:
                     now = datetime.now().strftime('%H:%M:%S')
-                    safe_print(f"[{now}] Bot actif - derniere commande connue: N{last_order_number}")
+                    status = ' | '.join(f"{c.tenant.slug}: {c.governor.status()}" for c in active) \
+                        if len(active) > 1 else default_context.governor.status()
+                    pending = sum(len(c.journal) for c in active)
+                    if pending:
+                        status += f", {pending} ecriture(s) hors ligne en attente"
+                    planned = sum(len(c.scheduler) for c in active)
+                    if planned:
+                        status += f", {planned} message(s) programme(s)"
+                    channels = ' | '.join(f"{c.tenant.slug}: {c.router.stats_line()}" if len(active) > 1
+                                          else c.router.stats_line()
+                                          for c in active if c.router.fallbacks and c.router.stats_line())
+                    if channels:
+                        status += f" - canaux: {channels}"
+                    waits = ' | '.join(f"{c.tenant.slug}: {c.inbox.stats_line()}" if len(active) > 1
+                                       else c.inbox.stats_line()
+                                       for c in active if c.inbox.stats_line())
+                    if waits:
+                        status += f" - attente: {waits}"
+                    browsers = ' | '.join(f"{c.tenant.slug}: {c.watchdog.status()}" if len(active) > 1
+                                          else c.watchdog.status()
+                                          for c in active if c.watchdog.status())
+                    if browsers:
+                        status += f" - navigateur: {browsers}"
+                    safe_print(f"[{now}] Bot actif - derniere commande connue: N{last_order_number} ({status})")
                 
                 # Wait before next poll
-                time.sleep(10)
+                time.sleep(POLL_INTERVAL)
                 
             except KeyboardInterrupt:
                 raise
+            except httpx.TransportError as e:
+                # Connection lost: the breaker opens after a few failures (status writes are journaled)
+                supabase_breaker.record_failure(e)
+                time.sleep(min(POLL_INTERVAL, 5))
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if is_outage(status):
+                    # Supabase down or overloaded: same as a lost connection, no traceback
+                    supabase_breaker.record_failure(f"HTTP {status}")
+                    safe_print(f"[WARN] Supabase indisponible (HTTP {status})")
+                else:
+                    safe_print(f"[WARN] Erreur de polling: HTTP {status}")
+                time.sleep(min(POLL_INTERVAL, 5))
             except Exception as e:
                 safe_print(f"[WARN] Erreur de polling: {e}")
                 import traceback
@@ -1068,7 +1863,6 @@ def listen_for_orders():
 
 def main():
     """Main entry point"""
-    global driver
     
     print_banner()
     
@@ -1085,9 +1879,13 @@ def main():
     except KeyboardInterrupt:
         safe_print("\n\n[*] Arret du bot...")
     finally:
-        if driver:
-            safe_print("[*] Fermeture du navigateur...")
-            driver.quit()
+        for context in contexts.values():
+            if context.driver:
+                safe_print(f"[*] Fermeture du navigateur ({context.tenant.name})...")
+                context.driver.quit()
+        if image_cache:
+            image_cache.flush()
+        notifier.stop()
         safe_print("[*] Au revoir !")
 
 if __name__ == "__main__":
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+WhatsApp broadcast campaigns from a customer CSV
+
+Streams the CSV (phone;name or phone,name, with or without header),
+deduplicates by normalized phone, renders a per-recipient template,
+paces sends with a token bucket and checkpoints progress after every
+recipient, so an interrupted campaign resumes exactly where it stopped.
+
+Template placeholders: $name, $prenom (first name), $phone, plus any CSV
+header column ($Nom, $Mobile, ...). Write $$ for a literal dollar.
+
+With --image (URL or local file) every recipient gets the image with the
+message as its caption; a URL is downloaded once through the bot's image
+cache (image_cache.py) and resized to what WhatsApp keeps.
+
+Numbers already known as not on WhatsApp (phone_status.json) are skipped;
+--precheck probes every unknown number first, without sending anything.
+
+Sends go through the bot's send governor (BULK lane): its rate caps --rate,
+and once its daily cap is reached (or sending is paused) the campaign stops
+at the current row - run the same command again to resume.
+
+Run me with:
+    python campaign.py ../clients_52_clean.csv --name promo-mardi \\
+        --template campaign_promo.txt --rate 6/min --burst 2
+    python campaign.py ../clients_52_clean.csv --name promo-mardi --message "Bonjour $prenom !" --dry-run
+    python campaign.py ../clients_52_clean.csv --name menu-hiver --template campaign_promo.txt \\
+        --image https://twinpizza.fr/images/menu-hiver.jpg
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from string import Template
+
+# Fix Windows console encoding
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+from console import safe_print
+from config import PHONE_CACHE_FILE, STATE_FOLDER
+from governor import BULK, CAP_REACHED, HELD
+from phone_cache import PhoneStatusCache, REASONS
+from phones import normalize as normalize_phone
+from rate_limit import TokenBucket, parse_rate
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.path.join(BOT_DIR, 'campaigns')
+PHONE_COLUMNS = ('phone', 'telephone', 'téléphone', 'mobile', 'tel', 'customer_phone')
+NAME_COLUMNS = ('name', 'nom', 'customer_name', 'prenom', 'prénom')
+
+# ===========================================
+# CSV STREAMING
+# ===========================================
+
+def _digits(text: str) -> int:
+    return sum(ch.isdigit() for ch in text)
+
+
+def iter_recipients(path: str):
+    """Yield (row_number, phone, name, fields) for each data row, streaming the file"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        first_line = f.readline()
+        delimiter = ';' if first_line.count(';') >= first_line.count(',') else ','
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+
+        header = None
+        phone_idx, name_idx = 0, 1
+        for row_number, row in enumerate(reader):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if row_number == 0 and _digits(row[0]) < 6:
+                # Header row: locate phone / name columns by name
+                header = [cell.strip() for cell in row]
+                lowered = [cell.lower() for cell in header]
+                phone_idx = next((i for i, c in enumerate(lowered) if c in PHONE_COLUMNS), 0)
+                name_idx = next((i for i, c in enumerate(lowered) if c in NAME_COLUMNS), 1)
+                continue
+
+            phone = row[phone_idx].strip() if phone_idx < len(row) else ''
+            name = row[name_idx].strip() if name_idx < len(row) else ''
+            fields = dict(zip(header, row)) if header else {}
+            yield row_number, phone, name, fields
+
+
+def count_rows(path: str) -> int:
+    """Fast line count, used only for the ETA"""
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 16), b''))
+
+
+def file_fingerprint(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        h.update(f.read(1 << 16))
+    return f"{os.path.getsize(path)}-{h.hexdigest()[:12]}"
+
+# ===========================================
+# CHECKPOINT
+# ===========================================
+
+class Checkpoint:
+    """Progress of one campaign, rewritten atomically after every recipient"""
+
+    def __init__(self, path: str, state: dict, persist: bool = True):
+        self.path = path
+        self.state = state
+        self.persist = persist
+
+    @classmethod
+    def load(cls, name: str, csv_path: str, persist: bool = True):
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        path = os.path.join(CHECKPOINT_DIR, f"{name}.json")
+        fingerprint = file_fingerprint(csv_path)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('fingerprint') != fingerprint:
+                raise SystemExit(f"[ERROR] {csv_path} a change depuis le debut de la campagne '{name}'. "
+                                 f"Utilisez un autre --name ou supprimez {path}")
+            return cls(path, state, persist)
+        return cls(path, {
+            'campaign': name, 'csv': os.path.abspath(csv_path), 'fingerprint': fingerprint,
+            'next_row': 0, 'in_flight': None,
+            'sent': 0, 'failed': 0, 'duplicates': 0, 'invalid': 0, 'not_on_whatsapp': 0,
+            'failed_phones': [], 'started_at': time.time(), 'finished_at': None,
+        }, persist)
+
+    def save(self):
+        if not self.persist:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+# ===========================================
+# CAMPAIGN
+# ===========================================
+
+def render(template: Template, phone: str, name: str, fields: dict) -> str:
+    first_name = name.split()[0] if name else ''
+    values = {**fields, 'name': name or 'cher client', 'prenom': first_name or 'cher client', 'phone': phone}
+    return template.safe_substitute(values)
+
+
+def precheck(csv_path: str, cache: PhoneStatusCache, probe) -> dict:
+    """Probe every distinct, not-yet-cached number of the CSV (no message is sent)"""
+    phones = []
+    seen = set()
+    for _, phone, _, _ in iter_recipients(csv_path):
+        normalized = normalize_phone(phone)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            phones.append(normalized)
+
+    groups = cache.partition(phones)
+    safe_print(f"[PRECHECK] {len(groups['valid'])} valides, {len(groups['bad'])} deja exclus, "
+               f"{len(groups['unknown'])} a verifier")
+    for i, phone in enumerate(groups['unknown'], 1):
+        status = probe(phone)
+        safe_print(f"[PRECHECK] {i}/{len(groups['unknown'])} {phone}: {status or 'inconnu'}")
+    return cache.partition(phones)
+
+
+def run_campaign(csv_path: str, name: str, template: Template, rate: float, burst: int,
+                 dry_run: bool = False, send=None, cache: PhoneStatusCache = None,
+                 governor=None, refusal=None) -> dict:
+    """`governor`: the bot's SendGovernor (BULK lane), `refusal()`: reason of the last failed send.
+    state['stopped'] is the governor refusal that stopped the run (None once every row is done)."""
+    checkpoint = Checkpoint.load(name, csv_path, persist=not dry_run)
+    state = checkpoint.state
+    state['stopped'] = None
+    total_rows = count_rows(csv_path)
+    bucket = TokenBucket(rate, capacity=burst)
+    if governor is not None and not dry_run and governor.lane_rate(BULK) < rate:
+        safe_print(f"[*] Debit limite a {governor.lane_rate(BULK) * 60:.1f}/min par le limiteur d'envoi "
+                   f"(BOT_BULK_RATE), {governor.remaining_today(BULK)} message(s) restant(s) aujourd'hui")
+
+    if state['in_flight'] is not None:
+        # Crashed between "about to send" and "sent": don't risk a duplicate message
+        safe_print(f"[WARN] Ligne {state['in_flight']} interrompue pendant l'envoi - ignoree")
+        state['next_row'] = state['in_flight'] + 1
+        state['in_flight'] = None
+        checkpoint.save()
+
+    if state['next_row']:
+        safe_print(f"[*] Reprise de '{name}' a la ligne {state['next_row']} "
+                   f"({state['sent']} envoyes, {state['failed']} echecs)")
+
+    seen = set()
+    session_sent = 0
+    session_started = time.monotonic()
+
+    for row_number, phone, customer, fields in iter_recipients(csv_path):
+        normalized = normalize_phone(phone)
+        if row_number < state['next_row']:
+            # Already processed: only rebuild the dedupe set
+            if normalized:
+                seen.add(normalized)
+            continue
+
+        if not normalized:
+            state['invalid'] += 1
+        elif normalized in seen:
+            state['duplicates'] += 1
+        elif cache and cache.is_known_bad(normalized):
+            seen.add(normalized)
+            state['not_on_whatsapp'] += 1
+            safe_print(f"[SKIP] {normalized}: {REASONS.get(cache.get(normalized), '')}")
+        else:
+            if governor is not None and not dry_run:
+                state['stopped'] = governor.blocked(BULK)
+                if state['stopped']:
+                    break  # Daily cap / pause: this row is resumed next time
+            seen.add(normalized)
+            message = render(template, phone, customer, fields)
+            bucket.acquire()
+
+            state['in_flight'] = row_number
+            checkpoint.save()
+            if dry_run:
+                safe_print(f"[DRY-RUN] {normalized} ({customer}):\n{message}\n")
+                ok = True
+            else:
+                ok = send(phone, message)
+            state['in_flight'] = None
+
+            reason = None if ok or refusal is None else refusal() or ''
+            if reason and reason.startswith((CAP_REACHED, HELD)):
+                # Refused by the governor before anything was sent: not this recipient's failure
+                state['stopped'] = reason
+                break
+
+            if ok:
+                state['sent'] += 1
+                session_sent += 1
+            else:
+                state['failed'] += 1
+                state['failed_phones'].append(phone)
+
+            elapsed = time.monotonic() - session_started
+            if session_sent and elapsed > 0:
+                throughput = session_sent / elapsed * 60
+                remaining = max(0, total_rows - row_number - 1)
+                eta = remaining / (session_sent / elapsed)
+                today = ''
+                if governor is not None and not dry_run:
+                    left = governor.remaining_today(BULK)
+                    if left < remaining:
+                        today = f" (plafond du jour: encore {left}, la suite demain)"
+                safe_print(f"[{row_number + 1}/{total_rows}] {throughput:.1f} msg/min - "
+                           f"reste ~{remaining} lignes, ETA {eta / 60:.0f} min{today}")
+
+        state['next_row'] = row_number + 1
+        checkpoint.save()
+
+    if not state['stopped']:
+        state['finished_at'] = time.time()
+    checkpoint.save()
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campagne WhatsApp depuis un fichier CSV clients")
+    parser.add_argument('csv', help="Fichier CSV (telephone;nom ou telephone,nom)")
+    parser.add_argument('--name', required=True, help="Nom de la campagne (cle du checkpoint)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--template', help="Fichier texte du message ($name, $prenom, $phone...)")
+    source.add_argument('--message', help="Message en ligne de commande")
+    parser.add_argument('--rate', default='6/min',
+                        help="Debit max (ex: 6/min, 1/s, 200/h), plafonne par le limiteur d'envoi du bot "
+                             "(BOT_BULK_RATE, plafond journalier BOT_BULK_DAILY_CAP)")
+    parser.add_argument('--burst', type=int, default=1, help="Rafale max autorisee")
+    parser.add_argument('--image', help="Image jointe (URL ou fichier local), le message servant de legende")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher les messages sans envoyer")
+    parser.add_argument('--precheck', action='store_true',
+                        help="Verifier d'abord quels numeros sont sur WhatsApp (sans envoyer)")
+    args = parser.parse_args()
+
+    if args.template:
+        with open(args.template, encoding='utf-8') as f:
+            template = Template(f.read())
+    else:
+        template = Template(args.message.replace('\\n', '\n'))
+
+    send = refusal = governor = None
+    cache = PhoneStatusCache(os.path.join(STATE_FOLDER or BOT_DIR, PHONE_CACHE_FILE))
+    if not args.dry_run or args.precheck:
+        import bot
+        if not bot.ctx().is_ready:
+            safe_print("[*] WhatsApp not ready, initializing...")
+            if not bot.init_whatsapp():
+                safe_print("[ERROR] Could not initialize WhatsApp!")
+                return 1
+        if args.image:
+            image = args.image if args.image.startswith(('http://', 'https://')) else os.path.abspath(args.image)
+            send = lambda phone, message: bot.send_whatsapp_image(phone, image, message, lane=BULK)
+        else:
+            send = lambda phone, message: bot.send_whatsapp_message(phone, message, lane=BULK)
+        refusal = lambda: bot.ctx().last_send_error
+        governor = bot.ctx().governor
+        cache = bot.phone_status
+        if args.precheck:
+            precheck(args.csv, cache, bot.check_whatsapp_number)
+
+    try:
+        state = run_campaign(args.csv, args.name, template, parse_rate(args.rate), args.burst,
+                             dry_run=args.dry_run, send=send, cache=cache, governor=governor, refusal=refusal)
+    except KeyboardInterrupt:
+        safe_print("\n[*] Campagne interrompue - relancez la meme commande pour reprendre.")
+        return 130
+    finally:
+        if send and bot.image_cache:
+            bot.image_cache.flush()
+
+    safe_print("\n" + "=" * 50)
+    safe_print(f"[CAMPAGNE] {args.name}: {state['sent']} envoyes, {state['failed']} echecs, "
+               f"{state['duplicates']} doublons, {state['invalid']} numeros invalides, "
+               f"{state['not_on_whatsapp']} hors WhatsApp")
+    safe_print("=" * 50)
+    if state['stopped']:
+        safe_print(f"[*] Campagne arretee ligne {state['next_row']}: {state['stopped']} - "
+                   f"relancez la meme commande pour reprendre.")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Fallback channels for order confirmations (when WhatsApp misses its deadline)
+
+WhatsApp Web is the primary channel, but a stuck browser, a number that is
+not on WhatsApp or a long governor wait used to mean the customer got
+nothing. `ChannelRouter.deliver()` bounds the confirmation latency:
+
+- the WhatsApp send runs on the tenant's browser thread (one send at a
+  time, the driver is not thread-safe) and gets `deadline` seconds;
+- if it fails or misses the deadline, the customer fallbacks are tried in
+  order (SMS through the send-sms edge function);
+- orders of `hedge_above` EUR or more are hedged: if WhatsApp hasn't
+  confirmed after `hedge_delay` seconds the SMS goes out in parallel;
+- when no channel reached the customer, the staff devices get a push alert
+  (send-push-notification) so someone calls them;
+- every channel keeps its success rate and latency (`stats_line()`).
+
+A late WhatsApp send can't be interrupted halfway: deliver() only returns
+once it is over, so nothing else (watchdog, restart-browser, the next
+message) drives the browser meanwhile, and a late success is reported (the
+message then simply arrives after the SMS). The load harness serves the
+edge functions from loadtest/fake_supabase.py, which records what each
+channel "sent".
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import httpx
+
+import phones
+from console import safe_print
+
+PRIMARY = 'whatsapp'
+
+
+class ChannelStats:
+    """Attempts, deliveries and recent latencies of one channel"""
+
+    __slots__ = ('attempts', 'delivered', 'latencies', '_lock')
+
+    def __init__(self, window: int = 200):
+        self.attempts = 0
+        self.delivered = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, seconds: float):
+        with self._lock:
+            self.attempts += 1
+            self.delivered += ok
+            self.latencies.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> str:
+        return f"{self.delivered}/{self.attempts} ok, p50 {self.percentile(0.5):.1f}s, p95 {self.percentile(0.95):.1f}s"
+
+# ===========================================
+# CHANNELS (Supabase edge functions)
+# ===========================================
+
+class EdgeFunctionChannel:
+    """A Supabase edge function used as a delivery channel"""
+
+    name = None
+    function = None
+    customer_facing = True  # False: alerts the staff instead of reaching the customer
+
+    def __init__(self, supabase_url: str, api_key: str, tenant_id: str = None, timeout: float = 15.0):
+        self.supabase_url = supabase_url
+        self.url = f"{supabase_url}/functions/v1/{self.function}"
+        self.headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json"}
+        if tenant_id:
+            self.headers["x-tenant-id"] = tenant_id
+        self.timeout = timeout
+
+    def payload(self, phone: str, text: str, order):
+        """JSON body for the function, or None if this channel can't reach `phone`"""
+        raise NotImplementedError
+
+    def send(self, phone: str, text: str, order) -> bool:
+        body = self.payload(phone, text, order)
+        if body is None:
+            return False
+        response = httpx.post(self.url, headers=self.headers, json=body, timeout=self.timeout)
+        if response.status_code != 200:
+            safe_print(f"[WARN] {self.function}: HTTP {response.status_code}")
+            return False
+        result = response.json() or {}
+        return result.get('success', True) is not False
+
+
+class SmsChannel(EdgeFunctionChannel):
+    """SMS to the customer (send-sms, Twilio)"""
+
+    name = 'sms'
+    function = 'send-sms'
+
+    def payload(self, phone: str, text: str, order):
+        canonical = phones.normalize(phone)
+        if not canonical:
+            return None
+        return {"to": '+' + canonical, "message": text, "type": "order_notification"}
+
+
+class PushChannel(EdgeFunctionChannel):
+    """Web push to the staff devices (send-push-notification): the customer must be called"""
+
+    name = 'push'
+    function = 'send-push-notification'
+    customer_facing = False
+
+    def payload(self, phone: str, text: str, order):
+        response = httpx.get(f"{self.supabase_url}/rest/v1/push_subscriptions", headers=self.headers,
+                             params={"select": "endpoint,keys", "is_active": "eq.true"}, timeout=self.timeout)
+        subscriptions = response.json() if response.status_code == 200 else []
+        if not subscriptions:
+            return None
+        return {"subscriptions": subscriptions,
+                "payload": {"title": "Confirmation non envoyee", "body": text,
+                            "tag": f"order-{getattr(order, 'id', '')}", "url": "/admin"}}
+
+    def send(self, phone: str, text: str, order) -> bool:
+        body = self.payload(phone, text, order)
+        if body is None:
+            return False
+        response = httpx.post(self.url, headers=self.headers, json=body, timeout=self.timeout)
+        return response.status_code == 200 and (response.json() or {}).get('successful', 0) > 0
+
+
+CHANNELS = {channel.name: channel for channel in (SmsChannel, PushChannel)}
+
+
+def channels_from_names(names, supabase_url: str, api_key: str, tenant_id: str = None) -> list:
+    """Build fallback channels from a list of names such as ['sms', 'push']"""
+    channels = []
+    for name in names:
+        channel_cls = CHANNELS.get(name.strip().lower())
+        if channel_cls is None:
+            if name.strip():
+                safe_print(f"[WARN] Canal de secours inconnu: {name}")
+            continue
+        channels.append(channel_cls(supabase_url, api_key, tenant_id))
+    return channels
+
+# ===========================================
+# ROUTER
+# ===========================================
+
+class ChannelRouter:
+    """WhatsApp first, with a deadline; fallbacks, hedging and per-channel stats"""
+
+    def __init__(self, fallbacks=(), deadline: float = 45.0, hedge_above: float = None, hedge_delay: float = 5.0):
+        self.fallbacks = list(fallbacks)
+        self.deadline = deadline
+        self.hedge_above = hedge_above
+        self.hedge_delay = hedge_delay
+        self.stats = {PRIMARY: ChannelStats()}
+        self.stats.update({channel.name: ChannelStats() for channel in self.fallbacks})
+        self._browser = ThreadPoolExecutor(max_workers=1, thread_name_prefix='whatsapp-send') \
+            if self.fallbacks else None
+
+    def _timed(self, name: str, send, *args) -> bool:
+        started = time.monotonic()
+        try:
+            ok = bool(send(*args))
+        except Exception as e:
+            safe_print(f"[WARN] Canal {name} en echec: {e}")
+            ok = False
+        self.stats[name].record(ok, time.monotonic() - started)
+        return ok
+
+    @staticmethod
+    def _wait(future, timeout: float) -> bool:
+        """True if the WhatsApp send succeeded within `timeout`"""
+        try:
+            return future.result(timeout=max(0.0, timeout))
+        except FutureTimeout:
+            return False
+
+    def deliver(self, primary, phone: str, order, messages: dict, total: float = 0.0):
+        """Send with `primary()` (WhatsApp), falling back to the channels that have a text in `messages`.
+        Returns the name of the channel that reached the customer, or None. Always returns after
+        the WhatsApp send is over (the caller's browser is free again)."""
+        if not self._browser:
+            return PRIMARY if self._timed(PRIMARY, primary) else None
+
+        deadline = time.monotonic() + self.deadline
+        future = self._browser.submit(self._timed, PRIMARY, primary)
+        hedged = self.hedge_above is not None and total >= self.hedge_above
+        if self._wait(future, self.hedge_delay if hedged else self.deadline):
+            return PRIMARY
+
+        if not future.done():
+            safe_print("[WARN] WhatsApp n'a pas confirme a temps - canal de secours"
+                       + (" (commande prioritaire)" if hedged else ''))
+        reached = None
+        for channel in self.fallbacks:
+            if channel.customer_facing and channel.name in messages \
+                    and self._timed(channel.name, channel.send, phone, messages[channel.name], order):
+                safe_print(f"[OK] Confirmation envoyee par {channel.name}")
+                reached = channel.name
+                break
+
+        # No fallback reached the customer: WhatsApp may still make it before the deadline
+        if reached is None and not self._wait(future, deadline - time.monotonic()):
+            for channel in self.fallbacks:
+                if not channel.customer_facing and channel.name in messages:
+                    self._timed(channel.name, channel.send, phone, messages[channel.name], order)
+
+        # The driver is not thread-safe: wait for the send in progress (Selenium timeouts bound it)
+        if future.result() and reached is None:
+            if time.monotonic() > deadline:
+                safe_print("[OK] WhatsApp a fini par envoyer (apres le delai)")
+            return PRIMARY
+        return reached
+
+    def stats_line(self) -> str:
+        return ' | '.join(f"{name} {stats.summary()}" for name, stats in self.stats.items() if stats.attempts)
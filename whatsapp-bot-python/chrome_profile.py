@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Maintenance of the Chrome profile used for WhatsApp Web (whatsapp_session/)
+
+The user-data-dir only ever grows (HTTP cache, V8 code cache, service
+worker caches, GPU shader caches, crash reports), and Chrome start-up and
+the WhatsApp Web load slow down over the months. This module:
+
+- prunes the cache directories (CACHE_DIRS), which Chrome rebuilds on
+  demand, and never touches what keeps WhatsApp linked (IndexedDB, Local
+  Storage, cookies, preferences - see KEEP);
+- runs at every Chrome start of the bot (`maintain()`, called by
+  bot.init_whatsapp while Chrome is closed): caches are pruned once they
+  exceed PROFILE_CACHE_LIMIT_MB;
+- keeps a history of the profile size and of the launch time of every
+  start (profile_history.jsonl) to see both evolve over time;
+- snapshots a known-good profile (logged in, caches excluded) and restores
+  it instantly, instead of scanning a QR code again.
+
+Run me from whatsapp-bot-python/ with Chrome (and the bot) closed:
+    python chrome_profile.py report
+    python chrome_profile.py prune
+    python chrome_profile.py snapshot
+    python chrome_profile.py restore
+(--profile tenants/<slug>/whatsapp_session for another restaurant)
+
+bench_launch.py measures the launch time before / after pruning.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from console import safe_print
+from config import DATA_FOLDER, PROFILE_HISTORY_FILE, PROFILE_CACHE_LIMIT_MB
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rebuilt by Chrome on demand: safe to delete while Chrome is closed
+CACHE_DIRS = (
+    'Default/Cache',
+    'Default/Code Cache',
+    'Default/GPUCache',
+    'Default/DawnCache',
+    'Default/DawnGraphiteCache',
+    'Default/DawnWebGPUCache',
+    'Default/Service Worker/CacheStorage',
+    'Default/Service Worker/ScriptCache',
+    'ShaderCache',
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'component_crx_cache',
+    'BrowserMetrics',
+    'Crashpad/reports',
+)
+CACHE_FILES = ('chrome_debug.log',)
+
+# The WhatsApp Web login lives here: never pruned, always part of a snapshot
+KEEP = ('Default/IndexedDB', 'Default/Local Storage', 'Default/Session Storage',
+        'Default/Cookies', 'Default/Preferences', 'Local State')
+
+# Present only while Chrome runs (and never copied into a snapshot)
+LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile')
+
+MB = 1024 * 1024
+
+
+def folder_size(path: str) -> int:
+    """Bytes used by everything under `path` (0 if it doesn't exist)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # Removed meanwhile, or a dangling symlink
+    return total
+
+
+def cache_paths(profile: str) -> list:
+    return [os.path.join(profile, *relative.split('/')) for relative in CACHE_DIRS + CACHE_FILES]
+
+
+def cache_size(profile: str) -> int:
+    return sum(folder_size(path) for path in cache_paths(profile))
+
+
+def profile_in_use(profile: str) -> bool:
+    """Is a Chrome instance running on this profile? (its caches must not be touched then)"""
+    singleton = os.path.join(profile, 'SingletonLock')  # Linux / macOS: symlink to "<host>-<pid>"
+    if os.path.islink(singleton):
+        try:
+            os.kill(int(os.readlink(singleton).rsplit('-', 1)[1]), 0)
+            return True
+        except (ValueError, IndexError, ProcessLookupError):
+            return False  # Stale lock left by a crash
+        except PermissionError:
+            return True
+    lockfile = os.path.join(profile, 'lockfile')  # Windows: held open while Chrome runs
+    if os.path.exists(lockfile):
+        try:
+            os.remove(lockfile)
+        except PermissionError:
+            return True
+        except OSError:
+            pass
+    return False
+
+
+def prune(profile: str) -> int:
+    """Delete the cache directories of a (closed) profile; returns the bytes freed"""
+    freed = 0
+    for path in cache_paths(profile):
+        if not os.path.exists(path):
+            continue
+        size = folder_size(path)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        freed += size - folder_size(path)
+    return freed
+
+
+class ProfileHistory:
+    """Size of the profile (and launch time) at every Chrome start, as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record(self, entry: dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def entries(self, profile: str = None) -> list:
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line
+                    if profile is None or entry.get('profile') == os.path.abspath(profile):
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+
+def maintain(profile: str, cache_limit_mb: float = PROFILE_CACHE_LIMIT_MB) -> dict:
+    """Start-up hook (Chrome closed): prune the caches once they exceed `cache_limit_mb`.
+    Returns the history entry of this start (the bot adds the launch time and records it)."""
+    entry = {'t': time.time(), 'profile': os.path.abspath(profile), 'size': folder_size(profile),
+             'cache': cache_size(profile), 'pruned': 0}
+    if entry['cache'] > cache_limit_mb * MB and not profile_in_use(profile):
+        entry['pruned'] = prune(profile)
+        safe_print(f"[*] Profil Chrome: {entry['pruned'] / MB:.0f} Mo de cache supprimes "
+                   f"({entry['size'] / MB:.0f} -> {(entry['size'] - entry['pruned']) / MB:.0f} Mo)")
+    return entry
+
+
+def snapshot(profile: str, dest: str):
+    """Copy a closed, logged-in profile without its caches"""
+    skipped = {os.path.normcase(os.path.abspath(path)) for path in cache_paths(profile)}
+
+    def ignore(folder, names):
+        return [name for name in names
+                if name in LOCK_FILES or os.path.normcase(os.path.abspath(os.path.join(folder, name))) in skipped]
+
+    tmp = dest + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.copytree(profile, tmp, ignore=ignore, symlinks=True)
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    os.replace(tmp, dest)
+
+
+def restore(snapshot_path: str, profile: str) -> str:
+    """Put a snapshot back in place; the current profile is kept aside. Returns where."""
+    aside = None
+    if os.path.exists(profile):
+        aside = f"{profile}.old-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        os.replace(profile, aside)
+    shutil.copytree(snapshot_path, profile, symlinks=True)
+    return aside
+
+
+def report(profile: str, history: ProfileHistory, last: int = 15):
+    safe_print(f"Profil: {os.path.abspath(profile)}")
+    safe_print(f"  Taille: {folder_size(profile) / MB:.0f} Mo, dont cache {cache_size(profile) / MB:.0f} Mo")
+    for relative in KEEP:
+        path = os.path.join(profile, *relative.split('/'))
+        if os.path.exists(path):
+            safe_print(f"  {relative}: {folder_size(path) / MB:.1f} Mo (conserve)")
+    entries = history.entries(profile)[-last:]
+    if entries:
+        safe_print(f"\n{'Demarrage':<17} {'Taille':>8} {'Cache':>8} {'Libere':>8} {'Lancement':>10}")
+        for entry in entries:
+            launch = f"{entry['launch']:.1f}s" if entry.get('launch') is not None else '-'
+            safe_print(f"{datetime.fromtimestamp(entry['t']).strftime('%Y-%m-%d %H:%M'):<17} "
+                       f"{entry['size'] / MB:>6.0f}Mo {entry['cache'] / MB:>6.0f}Mo "
+                       f"{entry['pruned'] / MB:>6.0f}Mo {launch:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance du profil Chrome de WhatsApp Web")
+    parser.add_argument('action', choices=('report', 'prune', 'snapshot', 'restore'))
+    parser.add_argument('--profile', default=os.path.join(BOT_DIR, DATA_FOLDER), help="Dossier du profil")
+    parser.add_argument('--snapshot', help="Dossier de la copie de reference (defaut: <profil>.snapshot)")
+    args = parser.parse_args()
+
+    profile = os.path.abspath(args.profile)
+    snapshot_path = args.snapshot or profile + '.snapshot'
+    # The bot keeps the history next to the profile (tenant folder)
+    history = ProfileHistory(os.path.join(os.path.dirname(profile), PROFILE_HISTORY_FILE))
+
+    if args.action == 'report':
+        report(profile, history)
+        return 0
+    if profile_in_use(profile):
+        safe_print("[ERROR] Chrome utilise ce profil - arretez le bot d'abord.")
+        return 1
+    if args.action == 'prune':
+        before = folder_size(profile)
+        freed = prune(profile)
+        safe_print(f"[OK] {freed / MB:.0f} Mo supprimes ({before / MB:.0f} -> {(before - freed) / MB:.0f} Mo), "
+                   f"connexion WhatsApp conservee")
+    elif args.action == 'snapshot':
+        snapshot(profile, snapshot_path)
+        safe_print(f"[OK] Copie de reference: {snapshot_path} ({folder_size(snapshot_path) / MB:.0f} Mo)")
+    else:
+        if not os.path.isdir(snapshot_path):
+            safe_print(f"[ERROR] Pas de copie de reference dans {snapshot_path}")
+            return 1
+        aside = restore(snapshot_path, profile)
+        safe_print(f"[OK] Profil restaure depuis {snapshot_path}"
+                   + (f" (ancien profil: {aside})" if aside else ''))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+Console helpers shared by the bot modules
+"""
+
+import re
+
+_EMOJI_PATTERN = re.compile(r'[\U0001F300-\U0001F9FF]')
+
+
+def safe_print(text):
+    """Print with fallback for unsupported characters"""
+    try:
+        print(text)
+    except UnicodeEncodeError:
+        # Remove or replace emojis if console doesn't support them
+        cleaned = _EMOJI_PATTERN.sub('*', text)
+        print(cleaned)
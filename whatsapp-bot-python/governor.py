@@ -0,0 +1,215 @@
+"""
+Send rate governor for one WhatsApp session
+
+Every send goes through `SendGovernor.acquire(lane)`:
+
+- a session-wide token bucket caps the total rate of the WhatsApp account,
+- each lane has its own bucket and daily cap, so a campaign or a recovery
+  run (BULK) can never eat the budget of order confirmations (TRANSACTIONAL),
+- when WhatsApp shows a rate-limit / warning popup, all rates are halved and
+  sending pauses for a cooldown; rates recover step by step after quiet periods,
+- sending can be suspended by hand (hold / release, e.g. a remote 'pause').
+
+Daily counters, the slow-down factor and the pauses survive restarts
+(governor_state.json), so a crash loop can't reset the caps.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date
+
+from console import safe_print
+from rate_limit import TokenBucket, parse_rate
+
+TRANSACTIONAL = 'transactional'
+BULK = 'bulk'
+
+# Refusals that last (until resumed by hand / until tomorrow): a whole run stops on them
+HELD = 'Envois suspendus'
+CAP_REACHED = 'Plafond journalier atteint'
+
+MIN_FACTOR = 0.125        # Never slower than 1/8 of the configured rates
+RECOVER_AFTER = 15 * 60   # Quiet seconds before the factor doubles again
+
+
+class SendGovernor:
+    """Session bucket + per-lane buckets and daily caps, with automatic slow-down"""
+
+    def __init__(self, session_rate: str, session_burst: int, lanes: dict,
+                 state_path: str = None, cooldown: float = 600, clock=time.time):
+        """`lanes`: {lane: (rate, burst, daily_cap)}, rates as accepted by parse_rate"""
+        self.state_path = state_path
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._session = TokenBucket(parse_rate(session_rate), capacity=session_burst)
+        self._buckets = {lane: TokenBucket(parse_rate(rate), capacity=burst)
+                         for lane, (rate, burst, _) in lanes.items()}
+        self._base_rates = {lane: bucket.rate for lane, bucket in self._buckets.items()}
+        self._base_rates[None] = self._session.rate
+        self.daily_caps = {lane: cap for lane, (_, _, cap) in lanes.items()}
+        self.day = self._today()
+        self.counts = {lane: 0 for lane in lanes}
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self.last_warning = 0.0
+        self.held = None  # Reason, while sending is suspended by hand (remote 'pause')
+        self._load()
+        self._apply_factor()
+
+    # ---- persistence ---------------------------------------------------
+
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (ValueError, TypeError) as e:
+            safe_print(f"[WARN] Etat du limiteur d'envoi illisible, ignore: {e}")
+            return
+        if state.get('day') == self.day:
+            self.counts.update({lane: n for lane, n in state.get('counts', {}).items() if lane in self.counts})
+        self.factor = max(MIN_FACTOR, min(1.0, state.get('factor', 1.0)))
+        self.paused_until = state.get('paused_until', 0.0)
+        self.last_warning = state.get('last_warning', 0.0)
+        self.held = state.get('held')
+
+    def _save(self):
+        if not self.state_path:
+            return
+        tmp = self.state_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'day': self.day, 'counts': self.counts, 'factor': self.factor,
+                           'paused_until': self.paused_until, 'last_warning': self.last_warning,
+                           'held': self.held}, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            safe_print(f"[WARN] Etat du limiteur d'envoi non sauvegarde: {e}")
+
+    # ---- rates ---------------------------------------------------------
+
+    def _apply_factor(self):
+        self._session.set_rate(self._base_rates[None] * self.factor)
+        for lane, bucket in self._buckets.items():
+            bucket.set_rate(self._base_rates[lane] * self.factor)
+
+    def _recover(self):
+        """Double the factor for every quiet RECOVER_AFTER period since the last warning (caller holds the lock)"""
+        if self.factor >= 1.0:
+            return
+        quiet = self._clock() - max(self.last_warning, self.paused_until)
+        if quiet < RECOVER_AFTER:
+            return
+        self.factor = min(1.0, self.factor * 2)
+        self.last_warning = self._clock()  # Next step after another quiet period
+        self._apply_factor()
+        self._save()
+        safe_print(f"[*] Debit d'envoi retabli a {self.factor:.0%}")
+
+    def _today(self) -> str:
+        return date.fromtimestamp(self._clock()).isoformat()
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.counts = {lane: 0 for lane in self.counts}
+
+    # ---- API -----------------------------------------------------------
+
+    def remaining_today(self, lane: str) -> int:
+        with self._lock:
+            self._roll_day()
+            return max(0, self.daily_caps[lane] - self.counts[lane])
+
+    def lane_rate(self, lane: str) -> float:
+        """Current messages per second allowed on `lane` (slow-down included)"""
+        return min(self._buckets[lane].rate, self._session.rate)
+
+    def _blocked(self, lane: str):
+        """Caller holds the lock"""
+        self._roll_day()
+        if self.held:
+            return f"{HELD} ({self.held})"
+        if self.counts[lane] >= self.daily_caps[lane]:
+            return f"{CAP_REACHED} ({self.daily_caps[lane]} messages {lane})"
+        return None
+
+    def blocked(self, lane: str):
+        """Why `lane` can't send at all right now (held, daily cap reached), else None"""
+        with self._lock:
+            return self._blocked(lane)
+
+    def acquire(self, lane: str = TRANSACTIONAL, timeout: float = None):
+        """Wait for a send slot. Returns None when granted, else the reason it was refused
+        (daily cap reached, or no slot within `timeout`). A granted slot counts against the daily
+        cap; refund() gives it back when no message went out."""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._lock:
+            self._recover()
+            refused = self._blocked(lane)
+            if refused:
+                return refused
+            paused_for = self.paused_until - self._clock()
+
+        if paused_for > 0:
+            if deadline is not None and self._clock() + paused_for > deadline:
+                return "Envois en pause (avertissement WhatsApp)"
+            safe_print(f"[*] Envois en pause encore {paused_for:.0f}s (avertissement WhatsApp)")
+            time.sleep(paused_for)
+
+        remaining = lambda: None if deadline is None else max(0.0, deadline - self._clock())
+        if not self._buckets[lane].acquire(timeout=remaining()):
+            return "Debit d'envoi depasse"
+        if not self._session.acquire(timeout=remaining()):
+            return "Debit d'envoi depasse"
+
+        with self._lock:
+            self._roll_day()
+            self.counts[lane] += 1
+            self._save()
+        return None
+
+    def refund(self, lane: str = TRANSACTIONAL):
+        """A granted slot ended without a message (invalid number, chat not found...): it doesn't
+        count against today's cap"""
+        with self._lock:
+            self._roll_day()
+            self.counts[lane] = max(0, self.counts[lane] - 1)
+            self._save()
+
+    def hold(self, reason: str = 'pause'):
+        """Refuse every send until release() (kept across restarts)"""
+        with self._lock:
+            self.held = reason
+            self._save()
+
+    def release(self):
+        with self._lock:
+            self.held = None
+            self._save()
+
+    def report_warning(self, text: str = ''):
+        """WhatsApp showed a rate-limit / ban warning: halve every rate and pause sending"""
+        with self._lock:
+            now = self._clock()
+            self.factor = max(MIN_FACTOR, self.factor / 2)
+            self.last_warning = now
+            self.paused_until = max(self.paused_until, now + self.cooldown)
+            self._apply_factor()
+            self._save()
+        safe_print(f"[WARN] Avertissement WhatsApp ({text[:80] or 'limite'}): pause {self.cooldown:.0f}s, "
+                   f"debit reduit a {self.factor:.0%}")
+
+    def status(self) -> str:
+        with self._lock:
+            self._roll_day()
+            used = ', '.join(f"{lane} {self.counts[lane]}/{self.daily_caps[lane]}" for lane in self.counts)
+        held = f"suspendu ({self.held}), " if self.held else ''
+        return f"{held}debit {self.factor:.0%}, aujourd'hui: {used}"
@@ -0,0 +1,208 @@
+"""
+Disk cache for images sent with send_whatsapp_image
+
+Entries are keyed by URL; files are named after the SHA-256 of their
+(processed) content, so two URLs serving the same picture share one file.
+Stale entries are revalidated with ETag / Last-Modified (a 304 costs no
+download), the cache is bounded in size with LRU eviction, and images are
+downscaled / recompressed with Pillow to what WhatsApp keeps anyway
+(1600 px on the long side) so the upload through WhatsApp Web is faster.
+
+A cache hit only updates the index in memory; the index file is rewritten
+when an image is added or evicted, at most every INDEX_FLUSH_INTERVAL
+seconds otherwise, and on flush() (bot shutdown). Losing the last hits in a
+crash only makes the LRU order slightly stale.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import httpx
+from PIL import Image, UnidentifiedImageError
+
+from console import safe_print
+
+# WhatsApp recompresses anything larger than this on its side
+MAX_DIMENSION = 1600
+JPEG_QUALITY = 82
+# Images already within bounds and below this size are stored untouched
+RECOMPRESS_ABOVE_BYTES = 300 * 1024
+
+# Cache hits (used_at / checked_at) are written to index.json at most this often
+INDEX_FLUSH_INTERVAL = 60.0
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+def optimize_image(content: bytes):
+    """Return (bytes, extension), downscaled/recompressed when it is worth it,
+    or None when `content` is not an image (HTML error page served with a 200...)"""
+    try:
+        image = Image.open(io.BytesIO(content))
+    except UnidentifiedImageError:
+        return None
+    try:
+        image_format = image.format or 'PNG'
+        too_big = max(image.size) > MAX_DIMENSION
+        if not too_big and len(content) <= RECOMPRESS_ABOVE_BYTES:
+            return content, EXTENSIONS.get(image_format, '.png')
+        if image_format == 'GIF' and getattr(image, 'is_animated', False):
+            return content, '.gif'
+
+        if too_big:
+            image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+        output = io.BytesIO()
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha:
+            image.save(output, 'PNG', optimize=True)
+            extension = '.png'
+        else:
+            image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            extension = '.jpg'
+        optimized = output.getvalue()
+        if len(optimized) >= len(content) and not too_big:
+            return content, EXTENSIONS.get(image_format, '.png')
+        return optimized, extension
+    except Exception as e:
+        safe_print(f"[WARN] Image non optimisee: {e}")
+        return content, EXTENSIONS.get(image.format, '.png')
+
+
+class ImageCache:
+    """url -> local file, revalidated after `revalidate_after` seconds, at most `max_bytes` on disk"""
+
+    def __init__(self, folder: str, max_bytes: int = 200 * 1024 * 1024, revalidate_after: float = 3600,
+                 client: httpx.Client = None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._client = client
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(folder, 'index.json')
+        os.makedirs(folder, exist_ok=True)
+        self._index = self._load_index()
+        self._dirty = False  # Index changed since the last write
+        self._saved_at = time.monotonic()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            safe_print(f"[WARN] Index du cache images illisible, ignore: {e}")
+            return {}
+        return {url: entry for url, entry in index.items() if os.path.exists(self._path(entry))}
+
+    def _save_index(self):
+        """Write the index (lock held)"""
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """Write the cache hits not saved yet"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _path(self, entry: dict) -> str:
+        return os.path.join(self.folder, entry['file'])
+
+    def _fetch(self, url: str, headers: dict) -> httpx.Response:
+        if self._client:
+            return self._client.get(url, headers=headers, timeout=30.0, follow_redirects=True)
+        return httpx.get(url, headers=headers, timeout=30.0, follow_redirects=True)
+
+    def get(self, url: str) -> str:
+        """Local path of the image at `url` ('' if it can't be obtained)"""
+        with self._lock:
+            entry = self._index.get(url)
+        if entry and not os.path.exists(self._path(entry)):
+            entry = None  # File removed behind our back: download again
+        now = time.time()
+        if entry and now - entry['checked_at'] < self.revalidate_after:
+            return self._touch(url, entry)
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self._fetch(url, headers)
+        except httpx.HTTPError as e:
+            safe_print(f"[WARN] Could not download image: {e}")
+            return self._touch(url, entry) if entry else ''
+
+        if response.status_code == 304 and entry:
+            entry['checked_at'] = now
+            return self._touch(url, entry)
+        if response.status_code != 200:
+            safe_print(f"[WARN] Could not download image: HTTP {response.status_code}")
+            return self._touch(url, entry) if entry else ''
+
+        optimized = optimize_image(response.content)
+        if optimized is None:
+            content_type = response.headers.get('content-type') or 'type inconnu'
+            safe_print(f"[WARN] Could not download image: not an image ({content_type})")
+            return self._touch(url, entry) if entry else ''
+        content, extension = optimized
+        filename = hashlib.sha256(content).hexdigest()[:32] + extension
+        path = os.path.join(self.folder, filename)
+        if not os.path.exists(path):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+        entry = {
+            'file': filename, 'size': len(content), 'checked_at': now, 'used_at': now,
+            'etag': response.headers.get('etag'), 'last_modified': response.headers.get('last-modified'),
+        }
+        with self._lock:
+            self._index[url] = entry
+            self._evict(keep=url)
+            self._save_index()
+        return path
+
+    def _touch(self, url: str, entry: dict) -> str:
+        """Record a hit in memory (written with the next flush)"""
+        with self._lock:
+            entry['used_at'] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= INDEX_FLUSH_INTERVAL:
+                self._save_index()
+        return self._path(entry)
+
+    def _evict(self, keep: str = None):
+        """Drop least recently used entries until the files fit in max_bytes (lock held).
+        `keep` (the image being returned) is never evicted."""
+        sizes = {entry['file']: entry['size'] for entry in self._index.values()}
+        total = sum(sizes.values())
+        for url, entry in sorted(self._index.items(), key=lambda item: item[1]['used_at']):
+            if total <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+            del self._index[url]
+            if not any(other['file'] == entry['file'] for other in self._index.values()):
+                total -= sizes[entry['file']]
+                try:
+                    os.remove(self._path(entry))
+                except OSError:
+                    pass
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum({e['file']: e['size'] for e in self._index.values()}.values())
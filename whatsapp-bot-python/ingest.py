@@ -0,0 +1,98 @@
+"""
+Local push-ingest endpoint: other services hand new orders to the bot
+
+The print server and the TwinPizza hub see a new order the instant it is
+inserted (Supabase realtime), while the bot only finds it at its next poll
+(up to POLL_INTERVAL seconds later). They POST it here instead:
+
+    POST http://127.0.0.1:<BOT_INGEST_PORT>/orders
+    X-Bot-Secret: <BOT_INGEST_SECRET>        (or Authorization: Bearer <secret>)
+    {"order": {...orders row...}}   or   {"order_id": "<uuid>"}
+
+- the server listens on 127.0.0.1 only and is off without a shared secret;
+- the order goes through the same path as a polled one (bot.ingest_order):
+  an order already handed over by the poll, or already confirmed (ledger),
+  is acknowledged and skipped - the poll skips it the same way afterwards;
+- answers 202 (queued), 200 (already known, nothing to do), 400 (bad body),
+  401 (bad secret), 404 (unknown order / tenant), 503 (Supabase unreachable
+  to resolve an order id). Callers never wait on the send itself.
+"""
+
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from console import safe_print
+
+HOST = '127.0.0.1'  # Never exposed on the network
+MAX_BODY = 256 * 1024
+
+
+class IngestError(Exception):
+    """Refused order: `status` is the HTTP answer"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'TwinPizzaBot'
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        given = self.headers.get('X-Bot-Secret') or ''
+        bearer = self.headers.get('Authorization') or ''
+        if not given and bearer.lower().startswith('bearer '):
+            given = bearer[7:].strip()
+        return hmac.compare_digest(given.encode(), self.server.secret.encode())
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/orders':
+            return self._reply(404, {'error': 'not found'})
+        if not self._authorized():
+            return self._reply(401, {'error': 'unauthorized'})
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if not 0 < length <= MAX_BODY:
+                raise ValueError
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError
+        except ValueError:
+            return self._reply(400, {'error': 'corps JSON invalide'})
+        try:
+            queued, message = self.server.accept(body)
+        except IngestError as e:
+            return self._reply(e.status, {'error': str(e)})
+        except Exception as e:
+            safe_print(f"[WARN] Reception locale: {e}")
+            return self._reply(500, {'error': str(e)})
+        self._reply(202 if queued else 200, {'queued': queued, 'message': message})
+
+    def log_message(self, format, *args):
+        pass  # The bot logs what it does with the order
+
+
+class IngestServer(ThreadingHTTPServer):
+    """`accept(body)` -> (queued, message) is called for every authenticated POST /orders"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int, secret: str, accept, host: str = HOST):
+        super().__init__((host, port), _Handler)
+        self.secret = secret
+        self.accept = accept
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='ingest', daemon=True)
+        thread.start()
+        return thread
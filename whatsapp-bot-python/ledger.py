@@ -0,0 +1,141 @@
+"""
+Local write-ahead ledger of sent WhatsApp messages
+
+One JSON line per event, flushed and fsync'ed before we act on it:
+
+    {"o": order_id, "k": "confirmation", "s": "intent", "t": ...}  before opening the chat
+    {"o": order_id, "k": "confirmation", "s": "sent", "t": ...}    once WhatsApp accepted it
+    {"o": order_id, "k": "confirmation", "s": "failed", "t": ...}  send failed, may be retried
+    {"cursor": "<created_at>", "t": ...}                            newest order handled by the poll
+
+The whole ledger is replayed into a dict at startup, so "was this sent?" is
+an O(1) lookup with no network call. An intent with no outcome means we
+crashed mid-send: the message may have gone out, so it is never resent
+automatically (at most once), only reported. The cursor lets the poll catch
+up on orders placed while the bot was stopped.
+"""
+
+import json
+import os
+import threading
+import time
+
+from console import safe_print
+
+INTENT = 'intent'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Entries older than this are dropped when the file is compacted
+RETENTION = 7 * 86400
+COMPACT_ABOVE_LINES = 5000
+
+
+class SendLedger:
+    """(order_id, kind) -> state, persisted as an fsync'ed JSON-lines log"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {}   # (order_id, kind) -> (state, timestamp)
+        self.cursor = None
+        lines, torn = self._replay()
+        if lines > COMPACT_ABOVE_LINES:
+            self.compact()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn and lines <= COMPACT_ABOVE_LINES:
+            self._file.write('\n')  # Next record starts on its own line
+
+    def _replay(self):
+        """Load the log; returns (line count, whether the last line is unterminated)"""
+        lines, torn = 0, False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    torn = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a power cut
+                    if 'cursor' in record:
+                        self.cursor = record['cursor']
+                    else:
+                        self._states[(record['o'], record['k'])] = (record['s'], record['t'])
+        except FileNotFoundError:
+            pass
+        return lines, torn
+
+    def _append(self, record: dict):
+        """Write one record durably (caller holds the lock)"""
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _record(self, order_id: str, kind: str, state: str):
+        now = self._clock()
+        with self._lock:
+            self._states[(order_id, kind)] = (state, now)
+            self._append({'o': order_id, 'k': kind, 's': state, 't': now})
+
+    # ---- queries -------------------------------------------------------
+
+    def state(self, order_id: str, kind: str):
+        entry = self._states.get((order_id, kind))
+        return entry[0] if entry else None
+
+    def should_send(self, order_id: str, kind: str) -> bool:
+        """True unless the message was sent, or may have been (interrupted send)"""
+        return self.state(order_id, kind) in (None, FAILED)
+
+    def entries(self, state: str = None, since: float = 0):
+        with self._lock:
+            return [(order_id, kind, entry_state) for (order_id, kind), (entry_state, at) in self._states.items()
+                    if (state is None or entry_state == state) and at >= since]
+
+    # ---- transitions ---------------------------------------------------
+
+    def begin(self, order_id: str, kind: str):
+        self._record(order_id, kind, INTENT)
+
+    def commit(self, order_id: str, kind: str):
+        self._record(order_id, kind, SENT)
+
+    def fail(self, order_id: str, kind: str):
+        self._record(order_id, kind, FAILED)
+
+    def advance(self, created_at: str):
+        """Move the poll cursor forward (never backwards)"""
+        if not created_at or (self.cursor and created_at <= self.cursor):
+            return
+        with self._lock:
+            self.cursor = created_at
+            self._append({'cursor': created_at, 't': self._clock()})
+
+    # ---- maintenance ---------------------------------------------------
+
+    def compact(self):
+        """Rewrite the log with one line per live entry (atomic replace)"""
+        cutoff = self._clock() - RETENTION
+        with self._lock:
+            self._states = {key: entry for key, entry in self._states.items() if entry[1] >= cutoff}
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for (order_id, kind), (state, at) in self._states.items():
+                    f.write(json.dumps({'o': order_id, 'k': kind, 's': state, 't': at}, separators=(',', ':')) + '\n')
+                if self.cursor:
+                    f.write(json.dumps({'cursor': self.cursor, 't': self._clock()}, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            reopen = getattr(self, '_file', None) is not None
+            if reopen:
+                self._file.close()
+            os.replace(tmp, self.path)
+            if reopen:
+                self._file = open(self.path, 'a', encoding='utf-8')
+        safe_print(f"[*] Journal des envois compacte ({len(self._states)} entrees)")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
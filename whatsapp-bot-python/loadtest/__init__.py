@@ -0,0 +1,3 @@
+"""
+Local load-test harness for the WhatsApp bot (fake Supabase + fake WhatsApp Web)
+"""
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Fake Supabase (PostgREST subset) + fake WhatsApp Web server
+
+Serves, from a single local port and with no network access:
+  - /rest/v1/<table>          in-memory tables (orders, order_processing_status, loyalty_points, ...)
+  - /rest/v1/rpc/get_next_order_number, bot_poll, complete_remote_command
+  - /functions/v1/send-sms, send-push-notification  (fallback channels, recorded in sent_messages)
+  - /send, /                  the static fake WhatsApp Web page (fake_whatsapp.html)
+  - /__harness/sent           messages "sent" through the fake WhatsApp page
+
+Supported PostgREST features: select, eq/neq/gt/gte/lt/lte/is/in filters,
+order=col.asc|desc, limit, Prefer: return=representation and
+resolution=merge-duplicates upserts, PATCH and DELETE with filters.
+Unique constraints listed in UNIQUE_CONSTRAINTS are enforced (409 / 23505).
+
+Run me with: python -m loadtest.fake_supabase --port 54321
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+FAKE_WHATSAPP_PAGE = os.path.join(os.path.dirname(__file__), 'fake_whatsapp.html')
+
+# Upsert conflict target per table (PostgREST uses the primary key / on_conflict)
+CONFLICT_KEYS = {
+    'orders': 'id',
+    'order_processing_status': 'order_id',
+    'loyalty_points': 'customer_phone',
+}
+
+# Multi-column unique constraints (orders_order_number_date_key)
+UNIQUE_CONSTRAINTS = {
+    'orders': [('order_number', 'order_date')],
+}
+
+
+class UniqueViolation(Exception):
+    """Raised like Postgres error 23505"""
+
+# ===========================================
+# IN-MEMORY DATABASE
+# ===========================================
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _coerce(value):
+    """Turn a PostgREST filter operand / column value into something comparable"""
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text == 'null':
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.astimezone()  # Naive timestamps are local time, like the bot sends them
+        return parsed.timestamp()
+    except ValueError:
+        return text
+
+
+def _matches(row: dict, column: str, expr: str) -> bool:
+    op, _, operand = expr.partition('.')
+    value = row.get(column)
+    if op == 'is':
+        return _coerce(value) == _coerce(operand)
+    if op == 'in':
+        options = [o.strip().strip('"') for o in operand.strip('()').split(',')]
+        return str(value) in options
+    if value is None:
+        return False
+    left, right = _coerce(value), _coerce(operand)
+    if type(left) is not type(right) and not (isinstance(left, (int, float)) and isinstance(right, (int, float))):
+        left, right = str(value), operand
+    if op == 'eq':
+        return left == right
+    if op == 'neq':
+        return left != right
+    if op == 'gt':
+        return left > right
+    if op == 'gte':
+        return left >= right
+    if op == 'lt':
+        return left < right
+    if op == 'lte':
+        return left <= right
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class FakeDatabase:
+    """Thread-safe in-memory tables with just enough PostgREST semantics"""
+
+    def __init__(self, first_order_number: int = 100):
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.order_counter = first_order_number - 1
+        self.sent_messages = []   # Filled by the fake WhatsApp page
+        self.insert_times = {}    # order id -> monotonic insert time
+
+    def table(self, name: str) -> list:
+        return self.tables.setdefault(name, [])
+
+    def next_order_number(self) -> str:
+        # Same contract as get_next_order_number(): atomic increment of a single counter
+        with self.lock:
+            self.order_counter += 1
+            return str(self.order_counter)
+
+    def select(self, name: str, filters: list, order: str = None, limit: int = None, columns: str = '*') -> list:
+        with self.lock:
+            rows = [r for r in self.table(name) if all(_matches(r, c, e) for c, e in filters)]
+        if order:
+            for part in reversed(order.split(',')):
+                column, _, direction = part.partition('.')
+                rows.sort(key=lambda r: (r.get(column) is None, _coerce(r.get(column))),
+                          reverse=direction.startswith('desc'))
+        if limit is not None:
+            rows = rows[:limit]
+        if columns and columns != '*':
+            wanted = [c.strip() for c in columns.split(',')]
+            rows = [{c: r.get(c) for c in wanted} for r in rows]
+        return [dict(r) for r in rows]
+
+    def _check_unique(self, name: str, rows: list, record: dict):
+        for columns in UNIQUE_CONSTRAINTS.get(name, []):
+            values = tuple(record.get(c) for c in columns)
+            if any(tuple(r.get(c) for c in columns) == values for r in rows):
+                raise UniqueViolation(
+                    f"duplicate key value violates unique constraint \"{name}_{'_'.join(columns)}_key\"")
+
+    def insert(self, name: str, records: list, upsert: bool = False) -> list:
+        key = CONFLICT_KEYS.get(name, 'id')
+        inserted = []
+        with self.lock:
+            rows = self.table(name)
+            for record in records:
+                record = dict(record)
+                if name == 'orders':
+                    record.setdefault('order_date', date.today().isoformat())
+                existing = None
+                if upsert and record.get(key) is not None:
+                    existing = next((r for r in rows if r.get(key) == record[key]), None)
+                if existing is not None:
+                    existing.update(record)
+                    existing['updated_at'] = utc_now_iso()
+                    inserted.append(dict(existing))
+                    continue
+                record.setdefault('id', str(uuid.uuid4()))
+                record.setdefault('created_at', utc_now_iso())
+                self._check_unique(name, rows, record)
+                rows.append(record)
+                inserted.append(dict(record))
+                if name == 'orders':
+                    # Mirrors the on_order_created_processing_status trigger
+                    self.insert_times[record['id']] = time.monotonic()
+                    status_rows = self.table('order_processing_status')
+                    if not any(r.get('order_id') == record['id'] for r in status_rows):
+                        status_rows.append({
+                            'id': str(uuid.uuid4()), 'order_id': record['id'],
+                            'whatsapp_sent': False, 'whatsapp_attempts': 0,
+                            'created_at': utc_now_iso(),
+                        })
+        return inserted
+
+    def update(self, name: str, filters: list, values: dict) -> list:
+        updated = []
+        with self.lock:
+            for row in self.table(name):
+                if all(_matches(row, c, e) for c, e in filters):
+                    row.update(values)
+                    row['updated_at'] = utc_now_iso()
+                    updated.append(dict(row))
+        return updated
+
+    def delete(self, name: str, filters: list) -> list:
+        with self.lock:
+            rows = self.table(name)
+            removed = [r for r in rows if all(_matches(r, c, e) for c, e in filters)]
+            self.tables[name] = [r for r in rows if r not in removed]
+        return removed
+
+    def bot_poll(self, since: str, limit: int, server_name: str, commands: list, tenant_ids: list = None) -> dict:
+        # Same contract as the bot_poll() RPC: new orders + atomically claimed commands
+        filters = [('created_at', f"gt.{since}")]
+        if tenant_ids:
+            filters.append(('tenant_id', f"in.({','.join(tenant_ids)})"))
+        orders = self.select('orders', filters, order='created_at.asc', limit=limit)
+        claimed = []
+        with self.lock:
+            for row in sorted(self.table('system_remote_commands'), key=lambda r: r.get('created_at', '')):
+                if len(claimed) >= 5:
+                    break
+                if (row.get('server_name') == server_name and row.get('status') == 'pending'
+                        and (row.get('command') or '').split(' ')[0] in commands
+                        and (not tenant_ids or row.get('tenant_id') in tenant_ids)):
+                    row['status'] = 'processing'
+                    row['updated_at'] = utc_now_iso()
+                    claimed.append(dict(row))
+        return {'orders': orders, 'commands': claimed}
+
+    def record_sent(self, phone: str, text: str, kind: str = 'text'):
+        with self.lock:
+            self.sent_messages.append({
+                'phone': phone, 'text': text, 'kind': kind,
+                'received_at': time.monotonic(),
+            })
+
+# ===========================================
+# HTTP HANDLER
+# ===========================================
+
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict'}
+
+
+class FakeSupabaseHandler(BaseHTTPRequestHandler):
+    db = None             # Set by make_server()
+    invalid_prefixes = () # Phones the fake WhatsApp page reports as "not on WhatsApp"
+    latency = 0.0         # Artificial per-request latency (seconds)
+    rpc_error_rate = 0.0  # Fraction of RPC calls answered with a 500 (exercises client fallbacks)
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- helpers ----
+
+    def _send_json(self, status: int, payload=None, headers: dict = None):
+        body = b'' if payload is None else json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _parse(self):
+        parts = urlsplit(self.path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        filters = [(k, v) for k, v in params if k not in RESERVED_PARAMS]
+        options = {k: v for k, v in params if k in RESERVED_PARAMS}
+        return parts.path, filters, options
+
+    def _prefer(self) -> str:
+        return self.headers.get('Prefer', '')
+
+    def _table_name(self, path: str):
+        prefix = '/rest/v1/'
+        if path.startswith(prefix):
+            return path[len(prefix):].strip('/')
+        return None
+
+    # ---- routes ----
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path, filters, options = self._parse()
+
+        if path in ('/', '/send'):
+            with open(FAKE_WHATSAPP_PAGE, 'rb') as f:
+                page = f.read()
+            page = page.replace(b'__INVALID_PREFIXES__', json.dumps(list(self.invalid_prefixes)).encode())
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+            return
+
+        if path == '/__harness/sent':
+            with self.db.lock:
+                sent = list(self.db.sent_messages)
+            self._send_json(200, sent)
+            return
+
+        table = self._table_name(path)
+        if not table:
+            self._send_json(404, {'message': 'Not found'})
+            return
+        try:
+            limit = int(options['limit']) if 'limit' in options else None
+            rows = self.db.select(table, filters, options.get('order'), limit, options.get('select', '*'))
+        except ValueError as e:
+            self._send_json(400, {'message': str(e)})
+            return
+        self._send_json(200, rows)
+
+    def do_POST(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path, filters, options = self._parse()
+        body = self._read_json()
+
+        if path == '/__harness/sent':
+            self.db.record_sent(body.get('phone', ''), body.get('text', ''), body.get('kind', 'text'))
+            self._send_json(204)
+            return
+
+        if path.startswith('/functions/v1/'):
+            # Edge functions used as fallback channels (channels.py): recorded like WhatsApp messages
+            function = path[len('/functions/v1/'):]
+            if function == 'send-push-notification':
+                subscriptions = body.get('subscriptions') or []
+                self.db.record_sent('', (body.get('payload') or {}).get('body', ''), kind='push')
+                self._send_json(200, {'successful': len(subscriptions), 'failed': 0, 'total': len(subscriptions)})
+            else:
+                self.db.record_sent(body.get('to', ''), body.get('message', ''), kind=function)
+                self._send_json(200, {'success': True})
+            return
+
+        if path == '/rest/v1/rpc/get_next_order_number':
+            if self.rpc_error_rate and random.random() < self.rpc_error_rate:
+                self._send_json(500, {'code': 'XX000', 'message': 'injected failure'})
+                return
+            self._send_json(200, self.db.next_order_number())
+            return
+
+        if path == '/rest/v1/rpc/bot_poll':
+            self._send_json(200, self.db.bot_poll(body.get('p_since'), body.get('p_limit') or 50,
+                                                  body.get('p_server_name'), body.get('p_commands') or [],
+                                                  body.get('p_tenant_ids')))
+            return
+
+        if path == '/rest/v1/rpc/complete_remote_command':
+            self.db.update('system_remote_commands',
+                           [('id', f"eq.{body.get('p_id')}"), ('status', 'eq.processing')],
+                           {'status': 'completed' if body.get('p_ok') else 'failed',
+                            'error_message': body.get('p_error')})
+            self._send_json(204)
+            return
+
+        table = self._table_name(path)
+        if not table or table.startswith('rpc/'):
+            self._send_json(404, {'message': 'Not found'})
+            return
+
+        records = body if isinstance(body, list) else [body or {}]
+        upsert = 'merge-duplicates' in self._prefer()
+        try:
+            rows = self.db.insert(table, records, upsert=upsert)
+        except UniqueViolation as e:
+            self._send_json(409, {'code': '23505', 'message': str(e)})
+            return
+        if 'return=representation' in self._prefer():
+            self._send_json(201, rows)
+        else:
+            self._send_json(201)
+
+    def do_PATCH(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path, filters, options = self._parse()
+        table = self._table_name(path)
+        if not table:
+            self._send_json(404, {'message': 'Not found'})
+            return
+        rows = self.db.update(table, filters, self._read_json() or {})
+        if 'return=representation' in self._prefer():
+            self._send_json(200, rows)
+        else:
+            self._send_json(204)
+
+    def do_DELETE(self):
+        path, filters, options = self._parse()
+        table = self._table_name(path)
+        if not table:
+            self._send_json(404, {'message': 'Not found'})
+            return
+        self.db.delete(table, filters)
+        self._send_json(204)
+
+
+def make_server(host: str = '127.0.0.1', port: int = 0, db: FakeDatabase = None,
+                invalid_prefixes=(), latency: float = 0.0, rpc_error_rate: float = 0.0):
+    """Create (but don't start) the fake server. port=0 picks a free port."""
+    handler = type('BoundFakeSupabaseHandler', (FakeSupabaseHandler,), {
+        'db': db or FakeDatabase(),
+        'invalid_prefixes': tuple(invalid_prefixes),
+        'latency': latency,
+        'rpc_error_rate': rpc_error_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.db = handler.db
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start the fake server in a daemon thread, return (server, base_url)"""
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, name="fake-supabase", daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Supabase + WhatsApp Web for local tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--invalid-prefix', action='append', default=[],
+                        help="Phones starting with this prefix are 'not on WhatsApp'")
+    parser.add_argument('--latency', type=float, default=0.0, help="Artificial latency per request (s)")
+    parser.add_argument('--rpc-error-rate', type=float, default=0.0, help="Fraction of failing RPC calls")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, invalid_prefixes=args.invalid_prefix,
+                         latency=args.latency, rpc_error_rate=args.rpc_error_rate)
+    print(f"[*] Fake Supabase + WhatsApp Web sur http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Arret.")
+
+
+if __name__ == "__main__":
+    main()
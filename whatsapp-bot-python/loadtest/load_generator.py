@@ -0,0 +1,149 @@
+"""
+Order load generator for the local harness
+
+Inserts orders into the fake Supabase at a steady rate with optional bursts,
+the same way the website does (get_next_order_number RPC, then insert).
+"""
+
+import json
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+from loadtest.stats import summarize
+
+
+@dataclass
+class LoadProfile:
+    rate_per_min: float = 6.0   # Steady-state orders per minute
+    duration: float = 120.0     # Seconds of load
+    burst_size: int = 0         # Extra orders inserted at once...
+    burst_every: float = 60.0   # ...every this many seconds (0 burst_size = no bursts)
+
+
+@dataclass
+class InsertedOrder:
+    order_id: str
+    order_number: str
+    phone: str
+    inserted_at: float  # time.monotonic()
+
+
+@dataclass
+class LoadReport:
+    inserted: list = field(default_factory=list)
+    delivered: dict = field(default_factory=dict)  # order_id -> latency (s)
+    elapsed: float = 0.0
+
+    @property
+    def missed(self) -> list:
+        return [o for o in self.inserted if o.order_id not in self.delivered]
+
+    @property
+    def orders_per_minute(self) -> float:
+        return len(self.delivered) / self.elapsed * 60 if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'inserted': len(self.inserted),
+            'delivered': len(self.delivered),
+            'missed': len(self.missed),
+            'missed_order_numbers': [o.order_number for o in self.missed],
+            'orders_per_minute': round(self.orders_per_minute, 2),
+            'latency_s': summarize(list(self.delivered.values())),
+        }
+
+
+def _request(method: str, url: str, payload=None, headers: dict = None):
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url, data=data, method=method, headers={
+        'Content-Type': 'application/json', **(headers or {})
+    })
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        body = resp.read()
+        return json.loads(body) if body else None
+
+
+def make_order(seq: int, order_number: str) -> dict:
+    """Synthetic order shaped like NewCheckout.tsx inserts. Phone is unique per order."""
+    return {
+        'order_number': order_number,
+        'order_type': ('livraison', 'emporter', 'surplace')[seq % 3],
+        'items': [
+            {'item': {'name': 'Margherita', 'category': 'pizzas', 'price': 10.0},
+             'quantity': 1 + seq % 2, 'totalPrice': 10.0 * (1 + seq % 2),
+             'customization': {'size': 'mega' if seq % 4 == 0 else 'senior'}},
+            {'item': {'name': 'Coca-Cola 33cl', 'category': 'boissons', 'price': 2.0},
+             'quantity': 1, 'totalPrice': 2.0},
+        ],
+        'customer_name': f'Client Test {seq}',
+        'customer_phone': f'06{seq:08d}',
+        'customer_address': '1 rue du Test' if seq % 3 == 0 else None,
+        'customer_notes': '[LOADTEST]',
+        'payment_method': 'en_ligne',
+        'subtotal': 10.0, 'tva': 1.0, 'total': 12.0 + 10.0 * (seq % 2), 'delivery_fee': 0,
+        'status': 'pending',
+    }
+
+
+def insert_order(base_url: str, seq: int) -> InsertedOrder:
+    order_number = _request('POST', f"{base_url}/rest/v1/rpc/get_next_order_number", {})
+    rows = _request('POST', f"{base_url}/rest/v1/orders", make_order(seq, order_number),
+                    headers={'Prefer': 'return=representation'})
+    row = rows[0]
+    return InsertedOrder(row['id'], order_number, row['customer_phone'], time.monotonic())
+
+
+def run_load(base_url: str, profile: LoadProfile, log=print) -> list:
+    """Insert orders following `profile`, return the InsertedOrder list"""
+    inserted = []
+    interval = 60.0 / profile.rate_per_min if profile.rate_per_min > 0 else None
+    start = time.monotonic()
+    next_steady = start
+    next_burst = start + profile.burst_every if profile.burst_size else None
+    seq = 0
+
+    while time.monotonic() - start < profile.duration:
+        now = time.monotonic()
+        batch = 0
+        if interval and now >= next_steady:
+            batch += 1
+            next_steady += interval
+        if next_burst is not None and now >= next_burst:
+            batch += profile.burst_size
+            log(f"[LOAD] Rafale de {profile.burst_size} commandes")
+            next_burst += profile.burst_every
+        for _ in range(batch):
+            seq += 1
+            inserted.append(insert_order(base_url, seq))
+        time.sleep(0.05)
+
+    log(f"[LOAD] {len(inserted)} commandes inserees en {time.monotonic() - start:.0f}s")
+    return inserted
+
+
+def _last_digits(phone: str) -> str:
+    return ''.join(ch for ch in phone if ch.isdigit())[-9:]
+
+
+def collect_report(db, inserted: list, drain: float, started_at: float) -> LoadReport:
+    """Wait up to `drain` seconds for confirmations, then match them to orders by phone"""
+    by_phone = {_last_digits(o.phone): o for o in inserted}
+    report = LoadReport(inserted=inserted)
+    deadline = time.monotonic() + drain
+    last_delivery = started_at
+
+    while True:
+        with db.lock:
+            sent = list(db.sent_messages)
+        for message in sent:
+            order = by_phone.get(_last_digits(message['phone']))
+            if order and order.order_id not in report.delivered and message['kind'] == 'text':
+                report.delivered[order.order_id] = message['received_at'] - order.inserted_at
+                last_delivery = max(last_delivery, message['received_at'])
+        if len(report.delivered) == len(inserted) or time.monotonic() >= deadline:
+            break
+        time.sleep(0.5)
+
+    report.elapsed = last_delivery - started_at
+    return report
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the WhatsApp bot, fully offline
+
+Starts the fake Supabase + fake WhatsApp Web server, launches bot.py
+(headless Chrome) against it, inserts orders following a load profile and
+reports orders/minute, missed orders and confirmation latency percentiles.
+
+Run me from whatsapp-bot-python/ with:
+    python -m loadtest.run_harness --rate 12 --duration 120 --burst-size 10 --burst-every 60
+
+Needs a local Chrome/Chromium and a matching chromedriver
+(--chromedriver or BOT_CHROMEDRIVER_PATH) - no network access is required.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from loadtest.fake_supabase import start_in_thread
+from loadtest.load_generator import LoadProfile, run_load, collect_report
+from loadtest.stats import format_summary
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for_log(path: str, marker: str, timeout: float, proc) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                if marker in f.read():
+                    return True
+        except FileNotFoundError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_bot(base_url: str, args, workdir: str):
+    env = dict(os.environ)
+    env.update({
+        'BOT_SUPABASE_URL': base_url,
+        'BOT_SUPABASE_ANON_KEY': 'loadtest',
+        'BOT_WHATSAPP_WEB_URL': base_url,
+        'BOT_DATA_FOLDER': os.path.join(workdir, 'session'),
+        # Ledger + cursor, governor counters, phone cache, journals: never the production bot's files
+        'BOT_STATE_FOLDER': os.path.join(workdir, 'state'),
+        'BOT_HEADLESS': '1',
+        'BOT_POLL_INTERVAL': str(args.poll_interval),
+        'BOT_NOTIFICATION_BACKENDS': 'log',
+        'PYTHONUNBUFFERED': '1',
+    })
+    if args.chromedriver:
+        env['BOT_CHROMEDRIVER_PATH'] = args.chromedriver
+    if args.chrome:
+        env['BOT_CHROME_PATH'] = args.chrome
+
+    log_path = os.path.join(workdir, 'bot.log')
+    log_file = open(log_path, 'w', encoding='utf-8')
+    proc = subprocess.Popen([sys.executable, 'bot.py'], cwd=BOT_DIR, env=env,
+                            stdout=log_file, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+    return proc, log_path, log_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test of the WhatsApp bot")
+    parser.add_argument('--rate', type=float, default=6.0, help="Steady orders per minute")
+    parser.add_argument('--duration', type=float, default=120.0, help="Load duration (s)")
+    parser.add_argument('--burst-size', type=int, default=0, help="Orders per burst (0 = no bursts)")
+    parser.add_argument('--burst-every', type=float, default=60.0, help="Seconds between bursts")
+    parser.add_argument('--drain', type=float, default=180.0, help="Max wait for pending confirmations (s)")
+    parser.add_argument('--poll-interval', type=float, default=10.0, help="Bot polling interval (s)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Fake Supabase latency per request (s)")
+    parser.add_argument('--chromedriver', default=os.environ.get('BOT_CHROMEDRIVER_PATH', ''))
+    parser.add_argument('--chrome', default=os.environ.get('BOT_CHROME_PATH', ''))
+    parser.add_argument('--no-bot', action='store_true', help="Don't launch bot.py (already running)")
+    parser.add_argument('--port', type=int, default=0, help="Fake server port (0 = random)")
+    parser.add_argument('--json', dest='json_path', help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='twinpizza-loadtest-')
+    server, base_url = start_in_thread(port=args.port, latency=args.latency)
+    print(f"[*] Fake Supabase + WhatsApp Web: {base_url}")
+
+    proc = log_file = None
+    try:
+        if not args.no_bot:
+            proc, log_path, log_file = start_bot(base_url, args, workdir)
+            print(f"[*] Bot lance (log: {log_path}), attente de 'Bot pret'...")
+            if not wait_for_log(log_path, "Bot pret", timeout=120, proc=proc):
+                print("[ERROR] Le bot n'a pas demarre - voir le log")
+                return 1
+
+        profile = LoadProfile(args.rate, args.duration, args.burst_size, args.burst_every)
+        started_at = time.monotonic()
+        inserted = run_load(base_url, profile)
+        print(f"[*] Attente des confirmations (max {args.drain:.0f}s)...")
+        report = collect_report(server.db, inserted, args.drain, started_at)
+
+        result = report.as_dict()
+        print("\n" + "=" * 50)
+        print("[RESULTATS]")
+        print(f"   Commandes inserees : {result['inserted']}")
+        print(f"   Confirmations      : {result['delivered']}")
+        print(f"   Manquees           : {result['missed']} {result['missed_order_numbers'] or ''}")
+        print(f"   Debit              : {result['orders_per_minute']:.1f} commandes/min")
+        print(f"   Latence            : {format_summary(result['latency_s'])}")
+        print("=" * 50)
+
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+        return 0 if result['missed'] == 0 else 2
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if log_file:
+            log_file.close()
+        server.shutdown()
+        if not args.no_bot:
+            shutil.rmtree(os.path.join(workdir, 'session'), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
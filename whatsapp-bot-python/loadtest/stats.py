@@ -0,0 +1,34 @@
+"""
+Latency statistics helpers for the load-test harness
+"""
+
+
+def percentile(values, pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0..100) of an unsorted sequence"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values) -> dict:
+    """p50/p90/p95/p99/max summary of latencies (same unit as the input)"""
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else 0.0,
+    }
+
+
+def format_summary(summary: dict, unit: str = 's') -> str:
+    return (f"p50={summary['p50']:.2f}{unit} p90={summary['p90']:.2f}{unit} "
+            f"p95={summary['p95']:.2f}{unit} p99={summary['p99']:.2f}{unit} "
+            f"max={summary['max']:.2f}{unit}")
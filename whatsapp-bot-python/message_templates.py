@@ -0,0 +1,148 @@
+"""
+Precompiled WhatsApp message templates
+
+Wording lives in templates/*.txt so the kitchen can edit it without touching
+code. Files use $placeholders (string.Template syntax, $$ for a literal
+dollar) and may have per-order-type variants: `confirmation.livraison.txt`
+is used for deliveries, `confirmation.txt` for everything else. A tenant
+folder only needs the files it overrides: the rest comes from `fallback`.
+
+Every file is compiled once, at startup, into a str.format_map pattern;
+item lines are built with a list + join instead of repeated +=.
+"""
+
+import os
+from string import Template
+
+from console import safe_print
+from models import OrderItem, as_order
+
+KINDS = ('confirmation', 'ready', 'recovery')
+
+ORDER_TYPE_LABELS = {
+    'livraison': 'Livraison',
+    'emporter': 'A emporter',
+    'surplace': 'Sur place',
+    'sur_place': 'Sur place',
+}
+
+# (OrderItem attribute, label) for the list-valued options, in display order
+LIST_OPTIONS = (
+    ('sauces', 'Sauces'),
+    ('garnitures', 'Garnitures'),
+    ('supplements', 'Supplements'),
+    ('cheese', 'Fromages'),
+)
+
+NO_ITEMS = '  (aucun article)'
+
+
+class _KeepMissing(dict):
+    """Unknown placeholders render as-is, like Template.safe_substitute"""
+
+    def __missing__(self, key):
+        return '$' + key
+
+
+def compile_template(text: str) -> str:
+    """Translate $name / ${name} / $$ into an equivalent str.format pattern"""
+    parts = []
+    position = 0
+    for match in Template.pattern.finditer(text):
+        parts.append(text[position:match.start()].replace('{', '{{').replace('}', '}}'))
+        name = match.group('named') or match.group('braced')
+        if name:
+            parts.append('{' + name + '}')
+        elif match.group('escaped') is not None:
+            parts.append('$')
+        else:
+            parts.append(match.group(0).replace('{', '{{').replace('}', '}}'))
+        position = match.end()
+    parts.append(text[position:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(parts)
+
+
+class MessageTemplates:
+    """All templates of a folder, compiled once: {(kind, order_type or None): pattern}"""
+
+    def __init__(self, folder: str, fallback: str = None):
+        self.folder = folder
+        self.fallback = fallback
+        self._compiled = {}
+        self.reload()
+
+    def reload(self):
+        compiled = {}
+        for folder in (self.fallback, self.folder):
+            if not folder or not os.path.isdir(folder):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                if not filename.endswith('.txt'):
+                    continue
+                kind, _, variant = filename[:-4].partition('.')
+                with open(os.path.join(folder, filename), encoding='utf-8') as f:
+                    compiled[(kind, variant or None)] = compile_template(f.read().rstrip('\n'))
+        missing = [kind for kind in KINDS if (kind, None) not in compiled]
+        if missing:
+            raise FileNotFoundError(f"Templates manquants dans {self.folder}: {', '.join(missing)}")
+        self._compiled = compiled
+        safe_print(f"[OK] {len(compiled)} templates de messages charges")
+
+    def render(self, kind: str, values: dict, order_type: str = None) -> str:
+        pattern = self._compiled.get((kind, order_type)) or self._compiled[(kind, None)]
+        return pattern.format_map(_KeepMissing(values))
+
+# ===========================================
+# ORDER RENDERING
+# ===========================================
+
+def item_details(item: OrderItem) -> list:
+    """Size / meats / sauces / ... of an item, as short display strings"""
+    details = []
+    # Size only matters for pizzas - MEGA in bold
+    if item.size and item.is_pizza:
+        details.append('*MEGA*' if item.size.upper() == 'MEGA' else item.size.upper())
+    if item.meats:
+        details.append(f"Viandes: {', '.join(item.meats)}")
+    elif item.meat:
+        details.append(f"Viande: {item.meat}")
+    for attribute, label in LIST_OPTIONS:
+        values = getattr(item, attribute)
+        if values:
+            details.append(f"{label}: {', '.join(values)}")
+    if item.menu_option:
+        details.append(f"Menu: {item.menu_option}")
+    return details
+
+
+def render_items(items) -> str:
+    """Item block of a confirmation (one line per item, options and note indented)"""
+    lines = []
+    append = lines.append
+    for item in items:
+        line = f"  {item.quantity}x {item.name}"
+        append(f"{line} - {item.price:.2f} EUR" if item.price else line)
+        details = item_details(item)
+        if details:
+            append(f"     ({' | '.join(details)})")
+        if item.note:
+            append(f"     Note: {item.note}")
+    return '\n'.join(lines)
+
+
+def order_values(order, portal_url: str = '', shop_name: str = 'TWIN PIZZA') -> dict:
+    """Placeholder values for one order (Order or raw row dict)"""
+    order = as_order(order)
+    order_type = order.order_type
+    return {
+        'shop_name': shop_name,
+        'customer_name': order.customer_name,
+        'order_number': order.order_number,
+        'order_type': ORDER_TYPE_LABELS.get(order_type, order_type),
+        'total': f"{order.total:.2f}",
+        'items': render_items(order.items) or NO_ITEMS,
+        'address_line': f"\n- Adresse : {order.customer_address}"
+                        if order_type == 'livraison' and order.customer_address else '',
+        'notes_line': f"\n- Note : {order.customer_notes}" if order.customer_notes else '',
+        'portal_url': portal_url,
+    }
@@ -0,0 +1,115 @@
+"""
+Compact order model for the Twin Pizza WhatsApp Bot
+
+PostgREST rows are decoded once into slot-based Order objects. The items
+JSONB is only turned into OrderItem objects the first time `order.items`
+is read, and the legacy item shapes (name vs item.name, meats vs meat,
+'none' sizes...) are normalized there, once.
+
+orjson is used to decode response bodies when it is installed
+(pip install orjson), the standard json module otherwise.
+"""
+
+import json
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+JSON_BACKEND = 'orjson' if orjson else 'json'
+
+
+def _clean_option(value) -> str:
+    value = value or ''
+    return '' if value.lower() == 'none' else value
+
+
+def _as_tuple(value) -> tuple:
+    return tuple(value) if isinstance(value, list) and value else ()
+
+
+class OrderItem:
+    """One line of an order, with customizations flattened"""
+
+    __slots__ = ('quantity', 'name', 'category', 'price', 'size', 'meats', 'meat', 'sauces',
+                 'garnitures', 'supplements', 'cheese', 'menu_option', 'note')
+
+    def __init__(self, raw: dict):
+        nested = raw.get('item') or {}
+        customization = raw.get('customization') or {}
+        self.quantity = raw.get('quantity', 1)
+        self.name = raw.get('name') or nested.get('name') or 'Produit'
+        self.category = (raw.get('category') or nested.get('category') or '').lower()
+        self.price = raw.get('totalPrice', raw.get('price', 0)) or 0
+        self.size = _clean_option(customization.get('size'))
+        self.meats = _as_tuple(customization.get('meats'))
+        self.meat = '' if self.meats else customization.get('meat') or ''  # Legacy single-meat items
+        self.sauces = _as_tuple(customization.get('sauces'))
+        self.garnitures = _as_tuple(customization.get('garnitures'))
+        self.supplements = _as_tuple(customization.get('supplements'))
+        self.cheese = _as_tuple(customization.get('cheeseSupplements'))
+        self.menu_option = _clean_option(customization.get('menuOption'))
+        self.note = raw.get('note') or customization.get('note') or ''
+
+    @property
+    def is_pizza(self) -> bool:
+        return 'pizza' in self.category
+
+    def __repr__(self):
+        return f"OrderItem({self.quantity}x {self.name!r})"
+
+
+class Order:
+    """One row of the orders table"""
+
+    __slots__ = ('id', 'tenant_id', 'order_number', 'customer_name', 'customer_phone', 'customer_address',
+                 'customer_notes', 'order_type', 'status', 'total', 'created_at', 'updated_at', '_raw_items',
+                 '_items')
+
+    def __init__(self, row: dict):
+        get = row.get
+        self.id = get('id')
+        self.tenant_id = get('tenant_id')
+        self.order_number = get('order_number') or 'N/A'
+        self.customer_name = get('customer_name') or 'Client'
+        self.customer_phone = get('customer_phone') or ''
+        self.customer_address = get('customer_address') or ''
+        self.customer_notes = get('customer_notes') or ''
+        self.order_type = get('order_type') or ''
+        self.status = get('status') or ''
+        self.total = float(get('total') or 0)
+        self.created_at = get('created_at')
+        self.updated_at = get('updated_at')
+        self._raw_items = get('items')
+        self._items = None
+
+    @property
+    def items(self) -> tuple:
+        """OrderItems, built on first access (the raw JSONB is dropped afterwards)"""
+        if self._items is None:
+            raw = self._raw_items
+            if isinstance(raw, (str, bytes)):
+                raw = _loads(raw)
+            self._items = tuple(OrderItem(item) for item in raw if isinstance(item, dict)) \
+                if isinstance(raw, list) else ()
+            self._raw_items = None
+        return self._items
+
+    def __repr__(self):
+        return f"Order(N{self.order_number}, {self.customer_name!r}, {self.status or '?'})"
+
+
+def as_order(order) -> Order:
+    """Accept both Order objects and raw row dicts (realtime payloads, scripts)"""
+    return order if isinstance(order, Order) else Order(order or {})
+
+
+def decode_orders(body) -> list:
+    """PostgREST response body (bytes, str or already-decoded list) -> [Order]"""
+    rows = _loads(body) if isinstance(body, (bytes, bytearray, str)) else body
+    if isinstance(rows, dict):
+        rows = [rows]
+    return [Order(row) for row in rows or ()]
@@ -0,0 +1,199 @@
+"""
+Desktop notifications for the Twin Pizza WhatsApp Bot
+
+Notifications are queued and shown by a background worker so that a slow
+PowerShell toast never blocks order processing. Repeated notifications are
+coalesced within a time window and the queue is bounded: when it is full,
+new notifications are dropped instead of blocking the caller.
+"""
+
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from console import safe_print
+
+# ===========================================
+# BACKENDS
+# ===========================================
+
+class LogBackend:
+    """Print notifications to the console (always available)"""
+    name = "log"
+
+    def show(self, title: str, message: str, is_error: bool = False) -> bool:
+        level = "WARN" if is_error else "NOTIF"
+        safe_print(f"[{level}] {title}: {message}")
+        return True
+
+
+class PowerShellToastBackend:
+    """Windows toast notification, with a MessageBox fallback"""
+    name = "powershell"
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        # Strings are embedded in double-quoted PowerShell literals
+        return text.replace('`', '``').replace('"', '`"').replace('$', '`$')
+
+    def show(self, title: str, message: str, is_error: bool = False) -> bool:
+        title = self._escape(title)
+        message = self._escape(message)
+        ps_script = f'''
+        [Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] > $null
+        $template = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent([Windows.UI.Notifications.ToastTemplateType]::ToastText02)
+        $textNodes = $template.GetElementsByTagName("text")
+        $textNodes.Item(0).AppendChild($template.CreateTextNode("{title}")) > $null
+        $textNodes.Item(1).AppendChild($template.CreateTextNode("{message}")) > $null
+        $toast = [Windows.UI.Notifications.ToastNotification]::new($template)
+        $notifier = [Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Twin Pizza")
+        $notifier.Show($toast)
+        '''
+        try:
+            result = subprocess.run(["powershell", "-Command", ps_script],
+                                    capture_output=True, timeout=self.timeout)
+            if result.returncode == 0:
+                return True
+        except Exception:
+            pass
+
+        # Fallback to simple message box if toast fails
+        try:
+            icon = "Warning" if is_error else "Information"
+            result = subprocess.run([
+                "powershell", "-Command",
+                "Add-Type -AssemblyName System.Windows.Forms; "
+                f'[System.Windows.Forms.MessageBox]::Show("{message}", "{title}", "OK", "{icon}")'
+            ], capture_output=True, timeout=self.timeout)
+            return result.returncode == 0
+        except Exception:
+            return False
+
+
+class NotifySendBackend:
+    """Linux desktop notification via notify-send"""
+    name = "notify-send"
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+
+    def show(self, title: str, message: str, is_error: bool = False) -> bool:
+        urgency = "critical" if is_error else "normal"
+        try:
+            result = subprocess.run(
+                ["notify-send", "--app-name=Twin Pizza", f"--urgency={urgency}", title, message],
+                capture_output=True, timeout=self.timeout
+            )
+            return result.returncode == 0
+        except Exception:
+            return False
+
+
+BACKENDS = {
+    LogBackend.name: LogBackend,
+    PowerShellToastBackend.name: PowerShellToastBackend,
+    NotifySendBackend.name: NotifySendBackend,
+}
+
+
+def default_backends() -> list:
+    """Pick the desktop backend for this platform, always ending with the log backend"""
+    backends = []
+    if sys.platform == 'win32':
+        backends.append(PowerShellToastBackend())
+    elif shutil.which("notify-send"):
+        backends.append(NotifySendBackend())
+    backends.append(LogBackend())
+    return backends
+
+
+def backends_from_names(names) -> list:
+    """Build backends from a list of names such as ['notify-send', 'log']"""
+    backends = []
+    for name in names:
+        backend_cls = BACKENDS.get(name.strip().lower())
+        if backend_cls is None:
+            safe_print(f"[WARN] Backend de notification inconnu: {name}")
+            continue
+        backends.append(backend_cls())
+    if not any(isinstance(b, LogBackend) for b in backends):
+        backends.append(LogBackend())
+    return backends
+
+# ===========================================
+# NOTIFICATION SERVICE
+# ===========================================
+
+class NotificationService:
+    """Background notification dispatcher with coalescing and a bounded queue"""
+
+    def __init__(self, backends=None, max_queue: int = 20, coalesce_window: float = 60.0):
+        self.backends = backends if backends is not None else default_backends()
+        self.coalesce_window = coalesce_window
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._last_shown = {}   # (title, message, is_error) -> monotonic time
+        self._suppressed = {}   # (title, message, is_error) -> count
+        self._thread = None
+        self.dropped = 0
+
+    def start(self):
+        """Start the background worker (idempotent)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Flush pending notifications for up to `timeout` seconds, then stop"""
+        if not self._thread:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def notify(self, title: str, message: str, is_error: bool = False) -> bool:
+        """Queue a notification. Never blocks; returns False if coalesced or dropped."""
+        key = (title, message, is_error)
+        now = time.monotonic()
+
+        with self._lock:
+            last = self._last_shown.get(key)
+            if last is not None and now - last < self.coalesce_window:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            repeats = self._suppressed.pop(key, 0)
+            self._last_shown[key] = now
+
+        if repeats:
+            message = f"{message} (x{repeats + 1})"
+
+        self.start()
+        try:
+            self._queue.put_nowait((title, message, is_error))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            title, message, is_error = item
+            for backend in self.backends:
+                try:
+                    if backend.show(title, message, is_error):
+                        break
+                except Exception as e:
+                    safe_print(f"[WARN] Notification {backend.name} en echec: {e}")
@@ -0,0 +1,187 @@
+"""
+Offline operation: circuit breaker around Supabase + local journal of pending writes
+
+When the restaurant's connection drops, every Supabase call would otherwise
+time out one after the other (and the status writes were lost). Instead:
+
+- `CircuitBreaker` opens after a few consecutive failures (network errors,
+  or 5xx / 429 answers: a Supabase outage is rarely a refused connection, see
+  is_outage): calls are
+  skipped at once, and a single probe is let through after a delay that
+  doubles while Supabase stays unreachable (capped), so the return of the
+  connection is noticed within seconds.
+- `OfflineJournal` is an append-only, fsync'ed JSON-lines log of what could
+  not reach Supabase:
+
+      {"n": 1, "k": "status", "o": order_id, "d": {...}, "t": ...}  order_processing_status upsert
+      {"n": 2, "k": "order", "o": order_id, "t": ...}               confirmation not sent (offline)
+      {"ack": [1, 2], "t": ...}                                       replayed
+
+When the breaker closes again, the journal is replayed in order and in
+batches (bot.replay_offline_journal): status writes first (one upsert per
+order, the latest wins), then the unsent confirmations, which go through
+the send ledger so nothing is ever sent twice. The file is truncated once
+everything is acknowledged.
+"""
+
+import json
+import os
+import threading
+import time
+
+from console import safe_print
+
+STATUS = 'status'
+ORDER = 'order'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def is_outage(status_code: int) -> bool:
+    """HTTP answer of a Supabase that is down or overloaded (502, 503, 520..., 429)"""
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> one probe every `retry_after`s"""
+
+    def __init__(self, failure_threshold: int = 3, retry_after: float = 5, max_retry_after: float = 60,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.retry_after = retry_after
+        self.opened_at = 0.0
+        self._probe_at = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """May a request go out now? (while open: only one probe per retry period)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self._clock() >= self._probe_at:
+                # A probe whose outcome was never reported doesn't block the next one
+                self.state = HALF_OPEN
+                self._probe_at = self._clock() + self.retry_after
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """Returns True when this success closes an open breaker (connection is back)"""
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.retry_after = self.base_retry_after
+        if recovered:
+            safe_print(f"[OK] Supabase de nouveau joignable (coupure de {self._clock() - self.opened_at:.0f}s)")
+        return recovered
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Probe failed: wait longer before the next one
+                self.retry_after = min(self.max_retry_after, self.retry_after * 2)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+                safe_print(f"[WARN] Supabase injoignable ({error or 'erreur reseau'}) - mode hors ligne, "
+                           f"ecritures conservees localement")
+            else:
+                return
+            self.state = OPEN
+            self._probe_at = self._clock() + self.retry_after
+
+
+class OfflineJournal:
+    """Pending Supabase writes of one tenant, persisted as an fsync'ed JSON-lines log"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}  # seq -> record, in insertion (= seq) order
+        self._seq = 0
+        torn = self._replay()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if not self._pending:
+            self._truncate()
+        elif torn:
+            self._file.write('\n')  # Next record starts on its own line
+
+    def _replay(self) -> bool:
+        """Load the pending records; returns whether the last line is unterminated"""
+        torn = False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    torn = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a power cut
+                    if 'ack' in record:
+                        for seq in record['ack']:
+                            self._pending.pop(seq, None)
+                    else:
+                        self._pending[record['n']] = record
+                        self._seq = max(self._seq, record['n'])
+        except FileNotFoundError:
+            pass
+        if self._pending:
+            safe_print(f"[*] {len(self._pending)} ecriture(s) hors ligne a rejouer ({os.path.basename(self.path)})")
+        return torn
+
+    def _append(self, record: dict):
+        """Write one record durably (caller holds the lock)"""
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _truncate(self):
+        """Nothing pending: start from an empty file (caller holds the lock or is __init__)"""
+        self._file.close()
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, kind: str, order_id: str, data: dict = None) -> int:
+        with self._lock:
+            self._seq += 1
+            record = {'n': self._seq, 'k': kind, 'o': order_id, 't': self._clock()}
+            if data is not None:
+                record['d'] = data
+            self._pending[self._seq] = record
+            self._append(record)
+            return self._seq
+
+    def pending(self, kind: str = None) -> list:
+        """Pending records, oldest first"""
+        with self._lock:
+            return [record for record in self._pending.values() if kind is None or record['k'] == kind]
+
+    def ack(self, seqs: list):
+        if not seqs:
+            return
+        with self._lock:
+            for seq in seqs:
+                self._pending.pop(seq, None)
+            if self._pending:
+                self._append({'ack': list(seqs), 't': self._clock()})
+            else:
+                self._truncate()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,106 @@
+"""
+Persistent WhatsApp status cache for phone numbers
+
+Remembers which numbers are valid, not on WhatsApp, or badly formatted,
+each with its own TTL, so retries, recovery runs and campaigns don't pay
+the full chat-opening timeout again for a number we already know is bad.
+"""
+
+import json
+import os
+import threading
+import time
+
+from console import safe_print
+
+VALID = 'valid'
+NOT_ON_WHATSAPP = 'not_on_whatsapp'
+INVALID_FORMAT = 'invalid_format'
+
+# Human-readable reasons, stored in order_processing_status.whatsapp_error
+REASONS = {
+    NOT_ON_WHATSAPP: "Numero non inscrit sur WhatsApp",
+    INVALID_FORMAT: "Format de numero invalide",
+}
+
+DEFAULT_TTLS = {
+    VALID: 30 * 86400,            # Accounts rarely disappear
+    NOT_ON_WHATSAPP: 7 * 86400,   # Customer may install WhatsApp later
+    INVALID_FORMAT: 365 * 86400,  # The string itself won't change
+}
+
+
+class PhoneStatusCache:
+    """phone (normalized) -> (status, checked_at), persisted as JSON"""
+
+    def __init__(self, path: str, ttls: dict = None, clock=time.time):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = {phone: tuple(entry) for phone, entry in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError) as e:
+            safe_print(f"[WARN] Cache telephones illisible, ignore: {e}")
+
+    def _save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, phone: str):
+        """Cached status for `phone`, or None if unknown/expired"""
+        with self._lock:
+            entry = self._entries.get(phone)
+        if not entry:
+            return None
+        status, checked_at = entry
+        if self._clock() - checked_at > self.ttls.get(status, 0):
+            return None
+        return status
+
+    def set(self, phone: str, status: str):
+        with self._lock:
+            previous = self._entries.get(phone)
+            self._entries[phone] = (status, self._clock())
+            # Refreshing an unchanged VALID entry is the common case: skip the disk write
+            if previous and previous[0] == status == VALID and self._clock() - previous[1] < 86400:
+                return
+            try:
+                self._save()
+            except OSError as e:
+                safe_print(f"[WARN] Cache telephones non sauvegarde: {e}")
+
+    def is_known_bad(self, phone: str) -> bool:
+        return self.get(phone) in (NOT_ON_WHATSAPP, INVALID_FORMAT)
+
+    def partition(self, phones) -> dict:
+        """Batch lookup: {'valid': [...], 'bad': [...], 'unknown': [...]}"""
+        result = {'valid': [], 'bad': [], 'unknown': []}
+        for phone in phones:
+            status = self.get(phone)
+            if status == VALID:
+                result['valid'].append(phone)
+            elif status in (NOT_ON_WHATSAPP, INVALID_FORMAT):
+                result['bad'].append(phone)
+            else:
+                result['unknown'].append(phone)
+        return result
+
+    def purge_expired(self) -> int:
+        now = self._clock()
+        with self._lock:
+            expired = [p for p, (status, at) in self._entries.items() if now - at > self.ttls.get(status, 0)]
+            for phone in expired:
+                del self._entries[phone]
+            if expired:
+                self._save()
+        return len(expired)
@@ -0,0 +1,159 @@
+"""
+Phone number normalization for the Twin Pizza WhatsApp Bot
+
+One canonical form everywhere: E.164 digits without the leading '+'
+(33612345678), which is what WhatsApp's /send?phone= expects and what the
+phone status cache is keyed on. Invalid numbers normalize to ''.
+
+Accepted inputs: French national numbers (06 12 34 56 78), French numbers
+missing the trunk 0 (612345678), and international numbers for France and
+nearby / common customer countries (+33, 0033, +32 ..., 33 6 12 ...).
+"""
+
+import csv
+import re
+from functools import lru_cache
+
+# Country code -> (min, max) national significant digits
+COUNTRY_CODES = {
+    '33': (9, 9),     # France
+    '262': (9, 9),    # Reunion / Mayotte
+    '590': (9, 9),    # Guadeloupe
+    '594': (9, 9),    # Guyane
+    '596': (9, 9),    # Martinique
+    '377': (8, 9),    # Monaco
+    '32': (8, 9),     # Belgique
+    '352': (6, 11),   # Luxembourg
+    '41': (9, 9),     # Suisse
+    '49': (6, 13),    # Allemagne
+    '34': (9, 9),     # Espagne
+    '39': (6, 11),    # Italie
+    '351': (9, 9),    # Portugal
+    '31': (9, 9),     # Pays-Bas
+    '44': (10, 10),   # Royaume-Uni
+    '212': (9, 9),    # Maroc
+    '213': (9, 9),    # Algerie
+    '216': (8, 8),    # Tunisie
+}
+
+DEFAULT_COUNTRY = '33'
+
+_SEPARATORS = re.compile(r'[\s\-\.\(\)/]')
+_INTERNATIONAL_PREFIX = re.compile(r'^(?:\+|00)')
+_DIGITS_ONLY = re.compile(r'^\d+$')
+_FR_NATIONAL = re.compile(r'^0[1-9]\d{8}$')
+_FR_MISSING_TRUNK = re.compile(r'^[67]\d{8}$')
+_FR_SIGNIFICANT = re.compile(r'^[1-9]\d{8}$')
+
+
+def _split_country(digits: str):
+    """Split international digits into (country_code, national) using COUNTRY_CODES"""
+    for size in (3, 2):
+        code = digits[:size]
+        if code in COUNTRY_CODES:
+            return code, digits[size:]
+    return None, None
+
+
+def _valid_national(code: str, national: str) -> bool:
+    low, high = COUNTRY_CODES[code]
+    if not low <= len(national) <= high or national[0] == '0':
+        return False
+    if code == '33':
+        return bool(_FR_SIGNIFICANT.match(national))
+    return True
+
+
+@lru_cache(maxsize=8192)
+def normalize(phone: str) -> str:
+    """Canonical E.164 digits (no '+') for `phone`, or '' if it isn't a valid number"""
+    if not phone:
+        return ''
+    raw = _SEPARATORS.sub('', str(phone))
+    international = bool(_INTERNATIONAL_PREFIX.match(raw))
+    digits = _INTERNATIONAL_PREFIX.sub('', raw)
+    if not _DIGITS_ONLY.match(digits):
+        return ''
+
+    if not international:
+        if _FR_NATIONAL.match(digits):
+            return DEFAULT_COUNTRY + digits[1:]
+        if _FR_MISSING_TRUNK.match(digits):
+            return DEFAULT_COUNTRY + digits
+
+    code, national = _split_country(digits)
+    if code is None:
+        return ''
+    if national.startswith('0'):
+        # "+33 (0)6 12 34 56 78": drop the trunk zero written after the country code
+        national = national[1:]
+    if not _valid_national(code, national):
+        return ''
+    return code + national
+
+
+def is_valid(phone: str) -> bool:
+    return bool(normalize(phone))
+
+
+def to_national(phone: str) -> str:
+    """Form stored by the website (0612345678 for France, +<E.164> otherwise), '' if invalid"""
+    canonical = normalize(phone)
+    if not canonical:
+        return ''
+    if canonical.startswith(DEFAULT_COUNTRY) and len(canonical) == 11:
+        return '0' + canonical[2:]
+    return '+' + canonical
+
+
+def lookup_variants(phone: str) -> tuple:
+    """Every spelling a customer phone may be stored under, for PostgREST `in.(...)` filters"""
+    canonical = normalize(phone)
+    if not canonical:
+        return (phone,) if phone else ()
+    variants = [to_national(phone), '+' + canonical, canonical]
+    if phone not in variants:
+        variants.append(phone)
+    return tuple(dict.fromkeys(variants))
+
+
+def postgrest_in(phone: str) -> str:
+    """`in.(...)` filter value matching any stored spelling of `phone`"""
+    quoted = ','.join(f'"{v}"' for v in lookup_variants(phone))
+    return f"in.({quoted})"
+
+# ===========================================
+# BATCH API
+# ===========================================
+
+def normalize_many(phones) -> list:
+    """Normalize a whole column in one pass (repeated numbers hit the memo)"""
+    return [normalize(p) for p in phones]
+
+
+def normalize_rows(rows, key: str = 'customer_phone', target: str = 'phone_normalized') -> list:
+    """Add `target` = normalize(row[key]) to each dict of a PostgREST result set"""
+    for row in rows:
+        row[target] = normalize(row.get(key) or '')
+    return rows
+
+
+def normalize_csv_column(path: str, column=0, delimiter: str = None, skip_header: bool = None):
+    """Yield (raw, normalized) for one column of a CSV file, streaming it"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        first_line = f.readline()
+        if delimiter is None:
+            delimiter = ';' if first_line.count(';') >= first_line.count(',') else ','
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        for index, row in enumerate(reader):
+            if not row:
+                continue
+            if isinstance(column, str):
+                if index == 0:
+                    column = [c.strip().lower() for c in row].index(column.lower())
+                    continue
+            elif index == 0 and (skip_header or (skip_header is None and not is_valid(row[column]))):
+                continue
+            raw = row[column].strip() if column < len(row) else ''
+            yield raw, normalize(raw)
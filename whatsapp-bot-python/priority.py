@@ -0,0 +1,124 @@
+"""
+Priority inbox of a tenant's send path
+
+Every piece of work of a tenant (new order, ready notification, recovery
+resend, scheduled message...) used to go through one FIFO queue, so a
+40-order recovery after a restart delayed the next customer's confirmation
+by minutes. `PriorityInbox` serves the classes in this order:
+
+    ready > confirmation > recovery > marketing
+
+- each class has a head start (AGING, seconds): an item is served by
+  `enqueued_at + head start`, so a recovery resend overtakes a newer
+  confirmation once it has waited 2 minutes longer - nothing starves;
+- work items are single messages, so a burst of low-priority work is
+  preempted between two messages as soon as something urgent arrives;
+- the time every item spent waiting is recorded per class (`stats_line()`,
+  shown in the bot status line): transactional waits stay flat under a
+  recovery or marketing backlog.
+
+Same interface as the queue.Queue it replaces (put / get / task_done /
+unfinished_tasks), with the class as the second argument of put(), plus
+take() to pull the queued messages of one customer (see bot.coalesce).
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+
+READY = 'ready'
+CONFIRMATION = 'confirmation'
+RECOVERY = 'recovery'
+MARKETING = 'marketing'
+
+# Head start of each class in seconds (order of the classes = priority order)
+AGING = {READY: 0, CONFIRMATION: 20, RECOVERY: 120, MARKETING: 600}
+
+
+class WaitStats:
+    """Recent queue waits of one class"""
+
+    __slots__ = ('count', 'waits')
+
+    def __init__(self, window: int = 200):
+        self.count = 0
+        self.waits = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.waits.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.waits)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PriorityInbox:
+    """Thread-safe queue served by class priority with aging, and per-class wait stats"""
+
+    def __init__(self, aging: dict = None, clock=time.monotonic):
+        self.aging = dict(aging or AGING)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap = []  # (rank, seq, class, enqueued_at, work)
+        self._seq = 0
+        self.unfinished_tasks = 0
+        self.stats = {cls: WaitStats() for cls in self.aging}
+
+    def put(self, work, cls: str = CONFIRMATION):
+        with self._cond:
+            now = self._clock()
+            self._seq += 1
+            heapq.heappush(self._heap, (now + self.aging[cls], self._seq, cls, now, work))
+            self.unfinished_tasks += 1
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Most urgent work item (blocks while empty; None after `timeout` seconds without work)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._heap, timeout):
+                return None
+            _, _, cls, enqueued_at, work = heapq.heappop(self._heap)
+            self.stats[cls].record(self._clock() - enqueued_at)
+            return work
+
+    def task_done(self):
+        with self._cond:
+            if self.unfinished_tasks <= 0:
+                raise ValueError('task_done() called too many times')
+            self.unfinished_tasks -= 1
+
+    def take(self, match, window: float) -> list:
+        """Remove and return the queued work for which `match(work)` is true, enqueued within the
+        last `window` seconds, most urgent first (each one still needs its task_done())"""
+        with self._cond:
+            now = self._clock()
+            taken = sorted(item for item in self._heap if item[3] >= now - window and match(item[4]))
+            if taken:
+                seqs = {item[1] for item in taken}
+                self._heap = [item for item in self._heap if item[1] not in seqs]
+                heapq.heapify(self._heap)
+            for _, _, cls, enqueued_at, _ in taken:
+                self.stats[cls].record(now - enqueued_at)
+            return [item[4] for item in taken]
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def depth(self) -> dict:
+        """Queued items per class"""
+        with self._cond:
+            counts = {cls: 0 for cls in self.aging}
+            for item in self._heap:
+                counts[item[2]] += 1
+            return counts
+
+    def stats_line(self) -> str:
+        """'confirmation p50 0.1s p95 0.4s (12) | ...' for the classes seen so far"""
+        with self._cond:
+            return ' | '.join(f"{cls} p50 {stats.percentile(0.5):.1f}s p95 {stats.percentile(0.95):.1f}s ({stats.count})"
+                              for cls, stats in self.stats.items() if stats.count)
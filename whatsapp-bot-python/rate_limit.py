@@ -0,0 +1,75 @@
+"""
+Token-bucket rate limiting for WhatsApp sends
+"""
+
+import threading
+import time
+
+_UNITS = {'s': 1, 'sec': 1, 'min': 60, 'm': 60, 'h': 3600, 'hour': 3600, 'j': 86400, 'd': 86400}
+
+
+def parse_rate(text: str) -> float:
+    """Parse '10/min', '2/s', '300/h' (or a plain number of messages per second) into messages/second"""
+    text = str(text).strip().lower()
+    if '/' not in text:
+        return float(text)
+    count, unit = text.split('/', 1)
+    if unit not in _UNITS:
+        raise ValueError(f"Unite de debit inconnue: {unit}")
+    return float(count) / _UNITS[unit]
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` stored (burst size)"""
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        """Change the refill rate (tokens earned so far at the old rate are kept)"""
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 if available now)"""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Block until `tokens` are available. Returns False if `timeout` expires first."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            delay = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(max(delay, 0.01))
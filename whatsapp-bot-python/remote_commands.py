@@ -0,0 +1,89 @@
+"""
+Remote control of the bot from the admin dashboard (system_remote_commands)
+
+The orders poll goes through the bot_poll RPC, which also claims pending
+commands for the bot (pending -> processing, atomically) in the same
+request: the command channel costs no extra round trip. Each command is
+then run by its registered handler and reported completed / failed.
+
+Commands (an optional argument follows a space, or comes in `payload`):
+
+    restart-browser          close and relaunch Chrome / WhatsApp Web
+    resend-order <order id>  send the confirmation again, even if already sent
+    drain-queue              send every pending / failed confirmation now
+    pause / resume           stop / restart sending (orders are still recorded)
+
+Without the migration (20261019130000_bot_remote_commands.sql) the bot
+falls back to a plain orders query and remote commands are disabled.
+"""
+
+import httpx
+
+from console import safe_print
+
+SERVER_NAME = 'whatsapp'  # start / stop / restart of the process stay with print-server/dashboard.js
+
+
+class RemoteCommands:
+    """Command handlers + the combined orders/commands poll"""
+
+    def __init__(self, supabase_url: str, server_name: str = SERVER_NAME):
+        self.server_name = server_name
+        self._poll_url = f"{supabase_url}/rest/v1/rpc/bot_poll"
+        self._complete_url = f"{supabase_url}/rest/v1/rpc/complete_remote_command"
+        self.handlers = {}
+        self.available = True  # False once the RPC is known to be missing
+
+    def register(self, command: str, handler):
+        """`handler(argument, payload)` returns an optional message; raising marks the command failed"""
+        self.handlers[command] = handler
+
+    def poll(self, client: httpx.Client, headers: dict, since: str, limit: int, tenant_ids: list = None):
+        """(order rows, claimed commands) in one request, or None if bot_poll is not deployed.
+        `tenant_ids` restricts both to these tenants (multi-tenant mode, service key)."""
+        if not self.available:
+            return None
+        body = {
+            "p_since": since, "p_limit": limit,
+            "p_server_name": self.server_name, "p_commands": sorted(self.handlers),
+        }
+        if tenant_ids:
+            body["p_tenant_ids"] = tenant_ids
+        response = client.post(self._poll_url, headers=headers, json=body)
+        if response.status_code == 404:
+            self.available = False
+            safe_print("[WARN] RPC bot_poll absente (migration non appliquee) - commandes a distance desactivees")
+            return None
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(f"bot_poll: HTTP {response.status_code}",
+                                        request=response.request, response=response)
+        result = response.json() or {}
+        return result.get('orders') or [], result.get('commands') or []
+
+    def dispatch(self, client: httpx.Client, headers: dict, commands: list):
+        """Run claimed commands in order and report each outcome"""
+        for command in commands:
+            name, _, argument = (command.get('command') or '').strip().partition(' ')
+            payload = command.get('payload') or {}
+            safe_print(f"[REMOTE] Commande recue: {command.get('command')}")
+            handler = self.handlers.get(name)
+            try:
+                if handler is None:
+                    raise ValueError(f"Commande inconnue: {name}")
+                message = handler(argument.strip(), payload)
+                ok, error = True, None
+                if message:
+                    safe_print(f"[REMOTE] {name}: {message}")
+            except Exception as e:
+                ok, error = False, str(e)[:500]
+                safe_print(f"[REMOTE] {name} en echec: {error}")
+            self._complete(client, headers, command.get('id'), ok, error)
+
+    def _complete(self, client: httpx.Client, headers: dict, command_id: str, ok: bool, error: str):
+        try:
+            response = client.post(self._complete_url, headers=headers,
+                                   json={"p_id": command_id, "p_ok": ok, "p_error": error})
+            if response.status_code >= 300:
+                safe_print(f"[WARN] Statut de la commande {command_id} non enregistre ({response.status_code})")
+        except Exception as e:
+            safe_print(f"[WARN] Statut de la commande {command_id} non enregistre: {e}")
@@ -0,0 +1,231 @@
+"""
+Persistent scheduler for deferred WhatsApp messages
+
+Follow-ups ("how was your pizza?" after `ready`), loyalty reminders and
+re-engagement of lapsed customers are planned ahead and kept here until due:
+
+- due messages sit in a binary heap keyed by due time: O(log n) to
+  schedule, O(log n) to pop, comfortable with tens of thousands of entries;
+  cancelled / rescheduled entries are dropped lazily when they surface;
+- every change is appended to a JSON-lines file (like the send ledger), so
+  planned messages survive restarts; fired keys are remembered for
+  FIRED_RETENTION so re-planning the same follow-up never sends it twice;
+- a message that comes due while the restaurant is closed is moved to the
+  next opening (`OpeningHours`, from public.opening_hours).
+
+The bot releases due messages one at a time, only when the tenant has no
+order waiting, through the BULK lane of the send governor: a burst of
+scheduled messages never delays a confirmation.
+
+    {"s": {"key": "feedback:<order id>", "due": ..., "kind": "feedback", "phone": ..., "values": {...}}}
+    {"f": "feedback:<order id>", "t": ...}     fired (or cancelled)
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from console import safe_print
+
+# Fired keys are remembered this long (re-planning a follow-up is then a no-op)
+FIRED_RETENTION = 40 * 86400
+
+# Defaults when public.opening_hours can't be read: 11:00-15:00 / 17:30-00:00, closed on Sunday
+DEFAULT_HOURS = [
+    {'day_of_week': day, 'is_open': day != 0, 'morning_open': '11:00', 'morning_close': '15:00',
+     'evening_open': '17:30', 'evening_close': '00:00'}
+    for day in range(7)
+]
+
+
+def _minutes(value) -> int:
+    """'17:30' / '17:30:00' -> minutes since midnight ('00:00' as a closing time means midnight)"""
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+class OpeningHours:
+    """Weekly opening windows (rows of public.opening_hours, day_of_week 0 = Sunday)"""
+
+    def __init__(self, rows: list = None):
+        self.windows = {day: [] for day in range(7)}
+        for row in rows or DEFAULT_HOURS:
+            if not row.get('is_open'):
+                continue
+            for start, end in (('morning_open', 'morning_close'), ('evening_open', 'evening_close')):
+                if row.get(start) and row.get(end):
+                    close = _minutes(row[end]) or 24 * 60
+                    self.windows[row['day_of_week'] % 7].append((_minutes(row[start]), close))
+
+    @staticmethod
+    def _day(moment: datetime) -> int:
+        return (moment.weekday() + 1) % 7
+
+    def is_open(self, moment: datetime) -> bool:
+        minute = moment.hour * 60 + moment.minute
+        return any(start <= minute < end for start, end in self.windows[self._day(moment)])
+
+    def next_open(self, moment: datetime) -> datetime:
+        """`moment` itself if open, else the start of the next opening window (within a week).
+        Closed every day (all opening_hours rows is_open=false): the same moment tomorrow."""
+        if self.is_open(moment):
+            return moment
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        minute = moment.hour * 60 + moment.minute
+        for offset in range(8):
+            day = midnight + timedelta(days=offset)
+            for start, _ in sorted(self.windows[self._day(day)]):
+                if offset or start > minute:
+                    return day + timedelta(minutes=start)
+        return moment + timedelta(days=1)  # Never open: look again tomorrow (never due again right away)
+
+
+class MessageScheduler:
+    """key -> planned message, released in due order; persisted as a JSON-lines log"""
+
+    def __init__(self, path: str, hours: OpeningHours = None, clock=time.time):
+        self.path = path
+        self.hours = hours or OpeningHours()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> entry
+        self._heap = []      # (due, seq, key); stale items are skipped when popped
+        self._seq = 0
+        self._fired = {}     # key -> fired at
+        lines, torn = self._replay()
+        if torn or lines > 2 * (len(self._entries) + len(self._fired)) + 1000:
+            self.compact()  # Also drops a torn last line
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    # ---- persistence ---------------------------------------------------
+
+    def _replay(self):
+        """Load the log; returns (line count, whether the last line is unterminated)"""
+        lines, torn = 0, False
+        cutoff = self._clock() - FIRED_RETENTION
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    torn = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a power cut
+                    if 's' in record:
+                        self._entries[record['s']['key']] = record['s']
+                    elif record['t'] >= cutoff:
+                        self._entries.pop(record['f'], None)
+                        self._fired[record['f']] = record['t']
+        except FileNotFoundError:
+            pass
+        for entry in self._entries.values():
+            self._push(entry)
+        if self._entries:
+            safe_print(f"[*] {len(self._entries)} message(s) programme(s) ({os.path.basename(self.path)})")
+        return lines, torn
+
+    def _append(self, record: dict):
+        """Caller holds the lock"""
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def compact(self):
+        """Rewrite the log with the live entries and the recent fired keys (atomic replace)"""
+        cutoff = self._clock() - FIRED_RETENTION
+        with self._lock:
+            self._fired = {key: at for key, at in self._fired.items() if at >= cutoff}
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for key, at in self._fired.items():
+                    f.write(json.dumps({'f': key, 't': at}, separators=(',', ':')) + '\n')
+                for entry in self._entries.values():
+                    f.write(json.dumps({'s': entry}, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            reopen = getattr(self, '_file', None) is not None
+            if reopen:
+                self._file.close()
+            os.replace(tmp, self.path)
+            if reopen:
+                self._file = open(self.path, 'a', encoding='utf-8')
+
+    # ---- heap ----------------------------------------------------------
+
+    def _push(self, entry: dict):
+        """Caller holds the lock (or is __init__)"""
+        self._seq += 1
+        heapq.heappush(self._heap, (entry['due'], self._seq, entry['key']))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def schedule(self, key: str, due: float, kind: str, phone: str, values: dict = None) -> bool:
+        """Plan a message; False if `key` is already planned or was sent recently"""
+        with self._lock:
+            if key in self._entries or key in self._fired:
+                return False
+            entry = {'key': key, 'due': due, 'kind': kind, 'phone': phone, 'values': values or {}}
+            self._entries[key] = entry
+            self._push(entry)
+            self._append({'s': entry})
+            return True
+
+    def done(self, key: str):
+        """The message went out (or is abandoned): never planned again under this key"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._fired[key] = self._clock()
+            self._append({'f': key, 't': self._fired[key]})
+
+    def next_due(self):
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        """Caller holds the lock"""
+        while self._heap:
+            due, _, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry['due'] == due:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, limit: int = 1) -> list:
+        """Up to `limit` due entries, oldest first. Entries due while closed are moved to the next
+        opening; the caller reports each returned entry with done() (or reschedule())."""
+        released = []
+        now = self._clock()
+        with self._lock:
+            while len(released) < limit:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                entry = self._entries[key]
+                moment = datetime.fromtimestamp(now)
+                if not self.hours.is_open(moment):
+                    self._move(entry, self.hours.next_open(moment).timestamp())
+                    continue
+                released.append(entry)
+        return released
+
+    def reschedule(self, entry: dict, due: float):
+        with self._lock:
+            if entry['key'] in self._entries:
+                self._move(entry, due)
+
+    def _move(self, entry: dict, due: float):
+        """Caller holds the lock"""
+        entry['due'] = due
+        self._push(entry)
+        self._append({'s': entry})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
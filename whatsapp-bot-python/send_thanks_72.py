@@ -3,7 +3,7 @@
 import sys
 sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
-from bot import init_whatsapp, send_whatsapp_message, is_ready
+from bot import init_whatsapp, send_whatsapp_message, ctx
 
 phone = "0684484943"
 message = """*TWIN PIZZA*
@@ -20,7 +20,7 @@ A tres bientot !"""
 print("[*] Sending thank you message to order #72...")
 print(f"[*] Phone: {phone}")
 
-if not is_ready:
+if not ctx().is_ready:
     print("[*] WhatsApp not ready, initializing...")
     if not init_whatsapp():
         print("[ERROR] Could not initialize WhatsApp!")
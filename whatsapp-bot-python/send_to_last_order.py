@@ -79,17 +79,20 @@ def main():
         print("\n[*] Importing WhatsApp functions...")
         
         # Import the bot functions
-        from bot import init_whatsapp, send_order_confirmation, driver, is_ready
+        from bot import init_whatsapp, send_order_confirmation, ctx
         
         # Check if WhatsApp is already initialized
-        if not is_ready:
+        if not ctx().is_ready:
             print("[*] WhatsApp not initialized, starting...")
             if not init_whatsapp():
                 print("[ERROR] Could not initialize WhatsApp!")
                 return
         
         print("\n[*] Sending order confirmation to customer...")
-        send_order_confirmation(order)
+        # Explicit resend: goes out even if the send ledger already has this confirmation
+        if not send_order_confirmation(order, force=True):
+            print(f"\n[ERROR] Message not sent: {ctx().last_send_error or 'see the log above'}")
+            return
         
         print("\n[OK] Done! Message sent successfully.")
         print("[*] The main bot window should still be open - you can close it or leave it running.\n")
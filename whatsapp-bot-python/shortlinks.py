@@ -0,0 +1,125 @@
+"""
+Local short links for the order tracking portal
+
+The code of a customer's link is derived locally from their phone number
+(base62 of a SHA-256, stable across restarts and machines). Codes are
+registered in the Supabase `short_links` table by a background worker
+(register_short_link RPC) and resolved by the site's /t/<code> route
+(resolve_short_link RPC). A short link is only handed out once its code is
+registered, and sending never waits for the registration: a customer's
+first message carries the long ?phone= URL while their code is registered in
+the background, later messages get the short one.
+
+Links stay the same for a customer forever; if a code ever collides with
+another phone, that customer falls back to the long ?phone= URL.
+"""
+
+import hashlib
+import queue
+import threading
+
+import httpx
+
+import phones
+from console import safe_print
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+CODE_LENGTH = 7  # 62^7 ~ 3.5e12 codes
+
+
+def code_for(phone: str) -> str:
+    """Deterministic short code of a phone ('' if the phone is invalid)"""
+    national = phones.to_national(phone)
+    if not national:
+        return ''
+    number = int.from_bytes(hashlib.sha256(f"ticket:{national}".encode()).digest()[:8], 'big')
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, index = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return ''.join(chars)
+
+
+class ShortLinks:
+    """Portal URLs for customers, memoized, with background registration"""
+
+    def __init__(self, site_url: str, supabase_url: str, api_key: str, max_queue: int = 500):
+        self.site_url = site_url.rstrip('/')
+        self._rpc_url = f"{supabase_url}/rest/v1/rpc/register_short_link"
+        self._headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}",
+                         "Content-Type": "application/json"}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._urls = {}          # national phone -> URL handed out
+        self._registered = set()  # codes confirmed by the database
+        self._pending = set()     # codes queued for registration
+        self._thread = None
+        # False after a failed registration (e.g. table not migrated), True again after a success
+        self.healthy = True
+
+    def long_url(self, phone: str) -> str:
+        return f"{self.site_url}/ticket?phone={phones.to_national(phone) or phone.replace('+', '')}"
+
+    def url_for(self, phone: str, order_id: str = None) -> str:
+        """Short tracking URL for `phone` once its code is registered, else the long URL
+        (the registration is queued and never waited for)"""
+        national = phones.to_national(phone)
+        if not national:
+            return self.long_url(phone)
+        code = code_for(national)
+        with self._lock:
+            url = self._urls.get(national)
+            if url:
+                return url
+            if code in self._registered:
+                url = self._urls[national] = f"{self.site_url}/t/{code}"
+                return url
+            if code in self._pending:
+                return self.long_url(phone)
+            self._pending.add(code)
+
+        self._start()
+        try:
+            self._queue.put_nowait((code, national, order_id))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(code)  # Queued again on next use
+        return self.long_url(phone)
+
+    def _start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="shortlinks", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        client = httpx.Client(timeout=10.0)
+        while True:
+            code, national, order_id = self._queue.get()
+            if code in self._registered:
+                continue
+            try:
+                response = client.post(self._rpc_url, headers=self._headers,
+                                       json={"p_code": code, "p_phone": national, "p_order_id": order_id})
+                if response.status_code != 200:
+                    self._failed(code, national, f"HTTP {response.status_code}")
+                elif response.json() is True:
+                    self.healthy = True
+                    with self._lock:
+                        self._registered.add(code)
+                        self._pending.discard(code)
+                else:
+                    safe_print(f"[WARN] Lien court {code} deja pris, lien long pour {national}")
+                    with self._lock:
+                        self._urls[national] = self.long_url(national)
+                        self._pending.discard(code)
+            except Exception as e:
+                self._failed(code, national, e)
+
+    def _failed(self, code: str, national: str, reason):
+        if self.healthy:
+            safe_print(f"[WARN] Lien court {code} non enregistre ({reason}) - liens longs en attendant")
+        with self._lock:
+            self.healthy = False
+            self._pending.discard(code)  # Registered again on next use
@@ -0,0 +1,114 @@
+"""
+Tenants served by the bot (public.tenants)
+
+One bot process serves every active tenant. Each tenant gets a
+TenantContext: its own WhatsApp Web session (Chrome profile, debugging port,
+driver), send ledger and order cursor, offline journal, send governor,
+fallback channels, scheduled messages, browser watchdog, message templates
+and site URL, plus a priority inbox (priority.py) served by a dedicated
+worker thread, so a stuck browser only ever delays its own tenant's
+messages.
+
+The default tenant (Twin Pizza) keeps the historical files at the root of
+the bot folder; other tenants live in tenants/<slug>/. A tenant can override
+any message template by dropping a file in tenants/<slug>/templates/.
+"""
+
+import os
+
+import httpx
+
+from priority import PriorityInbox
+
+DEFAULT_TENANT_ID = '00000000-0000-0000-0000-000000000001'
+TENANTS_FOLDER = 'tenants'
+FIRST_DEBUG_PORT = 9222
+
+
+class Tenant:
+    """One row of public.tenants"""
+
+    __slots__ = ('id', 'name', 'slug', 'domain')
+
+    def __init__(self, id: str, name: str, slug: str, domain: str = None):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.domain = domain
+
+    @classmethod
+    def from_row(cls, row: dict) -> 'Tenant':
+        return cls(row['id'], row.get('name') or row['slug'], row['slug'], row.get('domain'))
+
+    @property
+    def is_default(self) -> bool:
+        return self.id == DEFAULT_TENANT_ID
+
+    @property
+    def shop_name(self) -> str:
+        """Name shown in bold at the top of messages and tickets"""
+        return self.name.upper()
+
+
+DEFAULT_TENANT = Tenant(DEFAULT_TENANT_ID, 'Twin Pizza', 'twin-pizza', 'twinpizza.fr')
+
+
+def tenant_folder(tenant: Tenant, root: str) -> str:
+    """Where the tenant's files live (created if needed)"""
+    if tenant.is_default:
+        return root
+    folder = os.path.join(root, TENANTS_FOLDER, tenant.slug)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+class TenantContext:
+    """Everything the send path needs for one tenant (see bot.ctx())"""
+
+    def __init__(self, tenant: Tenant, folder: str, session_folder: str, debug_port: int, site_url: str,
+                 ledger, governor, templates, short_links, journal, router, scheduler, watchdog):
+        self.tenant = tenant
+        self.folder = folder
+        self.session_folder = session_folder
+        self.debug_port = debug_port
+        self.site_url = site_url
+        self.ledger = ledger
+        self.governor = governor
+        self.templates = templates
+        self.short_links = short_links
+        self.journal = journal
+        self.router = router
+        self.scheduler = scheduler
+        self.watchdog = watchdog
+        self.last_release = 0.0  # Last scheduled message handed to the inbox (monotonic)
+        # WhatsApp Web session
+        self.driver = None
+        self.is_ready = False
+        self.last_send_error = None  # Reason of the last failed send (stored in order_processing_status)
+        self.chat_phone = None       # Chat left open for the next message of a coalesced batch
+        # Work handed over by the shared poll: ('order', Order) / ('command', row)..., most urgent first
+        self.inbox = PriorityInbox()
+        self.enqueued = set()  # Order ids already handed over (the poll re-reads an overlap window)
+        self.pushed = set()    # ...of which pushed by a local service (ingest.py): the cursor stays with the poll
+        self.readied = set()   # Order ids whose ready notice was handed over
+        self.thread = None
+
+    @property
+    def busy(self) -> bool:
+        """Work still queued or being processed"""
+        return self.inbox.unfinished_tasks > 0
+
+    def __repr__(self):
+        return f"<TenantContext {self.tenant.slug}>"
+
+
+def load_tenants(client: httpx.Client, supabase_url: str, headers: dict) -> list:
+    """Active tenants, oldest first (the default tenant is always served)"""
+    response = client.get(f"{supabase_url}/rest/v1/tenants", headers=headers,
+                          params={"select": "id,name,slug,domain", "is_active": "eq.true",
+                                  "order": "created_at.asc"})
+    response.raise_for_status()
+    tenants = [Tenant.from_row(row) for row in response.json()]
+    if not any(tenant.is_default for tenant in tenants):
+        tenants.insert(0, DEFAULT_TENANT)
+    return tenants
@@ -0,0 +1,92 @@
+"""python -m pytest tests (from whatsapp-bot-python/)"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from governor import BULK, CAP_REACHED, HELD, TRANSACTIONAL, SendGovernor  # noqa: E402
+
+NOON = datetime(2026, 10, 19, 12, 0).timestamp()
+
+
+class Clock:
+    def __init__(self, now: float = NOON):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_governor(clock, state_path=None, bulk_rate='1000/s', bulk_burst=100):
+    return SendGovernor('1000/s', 100, {
+        TRANSACTIONAL: ('1000/s', 100, 100),
+        BULK: (bulk_rate, bulk_burst, 3),
+    }, state_path=state_path, clock=clock)
+
+
+def test_bulk_rate_never_eats_the_transactional_budget():
+    governor = make_governor(Clock(), bulk_rate='1/h', bulk_burst=1)
+    assert governor.acquire(BULK, timeout=0) is None
+    assert governor.acquire(BULK, timeout=0) == "Debit d'envoi depasse"
+    assert governor.acquire(TRANSACTIONAL, timeout=0) is None
+    assert governor.remaining_today(BULK) == 2
+    assert governor.remaining_today(TRANSACTIONAL) == 99
+
+
+def test_daily_cap_refuses_with_cap_reached():
+    governor = make_governor(Clock())
+    for _ in range(3):
+        assert governor.acquire(BULK, timeout=0) is None
+    assert governor.acquire(BULK, timeout=0).startswith(CAP_REACHED)
+    assert governor.blocked(BULK).startswith(CAP_REACHED)
+    assert governor.blocked(TRANSACTIONAL) is None
+
+
+def test_refund_gives_the_slot_back_and_never_goes_below_zero():
+    governor = make_governor(Clock())
+    assert governor.acquire(BULK, timeout=0) is None
+    governor.refund(BULK)
+    governor.refund(BULK)
+    assert governor.counts[BULK] == 0
+    assert governor.remaining_today(BULK) == 3
+
+
+def test_counts_roll_over_at_midnight():
+    clock = Clock()
+    governor = make_governor(clock)
+    for _ in range(3):
+        governor.acquire(BULK, timeout=0)
+    assert governor.blocked(BULK)
+
+    clock.now += timedelta(days=1).total_seconds()
+    assert governor.blocked(BULK) is None
+    assert governor.remaining_today(BULK) == 3
+
+
+def test_counts_survive_a_restart_the_same_day_only(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / 'governor_state.json')
+    governor = make_governor(clock, path)
+    for _ in range(3):
+        governor.acquire(BULK, timeout=0)
+
+    assert make_governor(clock, path).blocked(BULK).startswith(CAP_REACHED)
+    clock.now += timedelta(days=1).total_seconds()
+    assert make_governor(clock, path).remaining_today(BULK) == 3
+
+
+def test_hold_and_release_persist_across_reload(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / 'governor_state.json')
+    make_governor(clock, path).hold('pause a distance')
+
+    governor = make_governor(clock, path)
+    assert governor.held == 'pause a distance'
+    assert governor.acquire(TRANSACTIONAL, timeout=0).startswith(HELD)
+    governor.release()
+
+    governor = make_governor(clock, path)
+    assert governor.held is None
+    assert governor.acquire(TRANSACTIONAL, timeout=0) is None
@@ -0,0 +1,98 @@
+"""python -m pytest tests (from whatsapp-bot-python/)"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import FAILED, INTENT, RETENTION, SENT, SendLedger  # noqa: E402
+
+
+def reload(ledger: SendLedger, **kwargs) -> SendLedger:
+    """Same file, as the bot sees it after a restart"""
+    ledger.close()
+    return SendLedger(ledger.path, **kwargs)
+
+
+def test_crash_between_begin_and_commit_is_never_resent(tmp_path):
+    ledger = SendLedger(str(tmp_path / 'sent_ledger.jsonl'))
+    ledger.begin('order-1', 'confirmation')
+
+    ledger = reload(ledger)
+    assert ledger.state('order-1', 'confirmation') == INTENT
+    assert not ledger.should_send('order-1', 'confirmation')
+    assert ledger.entries(INTENT) == [('order-1', 'confirmation', INTENT)]
+    ledger.close()
+
+
+def test_committed_order_is_skipped_after_reload(tmp_path):
+    ledger = SendLedger(str(tmp_path / 'sent_ledger.jsonl'))
+    ledger.begin('order-1', 'confirmation')
+    ledger.commit('order-1', 'confirmation')
+
+    ledger = reload(ledger)
+    assert ledger.state('order-1', 'confirmation') == SENT
+    assert not ledger.should_send('order-1', 'confirmation')
+    assert ledger.should_send('order-1', 'ready')  # Other kinds are tracked apart
+    ledger.close()
+
+
+def test_failed_send_is_retried_after_reload(tmp_path):
+    ledger = SendLedger(str(tmp_path / 'sent_ledger.jsonl'))
+    ledger.begin('order-1', 'confirmation')
+    ledger.fail('order-1', 'confirmation')
+
+    ledger = reload(ledger)
+    assert ledger.state('order-1', 'confirmation') == FAILED
+    assert ledger.should_send('order-1', 'confirmation')
+    ledger.begin('order-1', 'confirmation')
+    ledger.commit('order-1', 'confirmation')
+
+    ledger = reload(ledger)
+    assert ledger.state('order-1', 'confirmation') == SENT
+    ledger.close()
+
+
+def test_torn_last_line_is_ignored_and_next_record_survives(tmp_path):
+    path = str(tmp_path / 'sent_ledger.jsonl')
+    ledger = SendLedger(path)
+    ledger.commit('order-1', 'confirmation')
+    ledger.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"o":"order-2","k":"confirm')  # Power cut mid-write
+
+    ledger = SendLedger(path)
+    assert ledger.state('order-1', 'confirmation') == SENT
+    assert ledger.state('order-2', 'confirmation') is None
+    ledger.commit('order-3', 'confirmation')
+
+    ledger = reload(ledger)
+    assert ledger.state('order-1', 'confirmation') == SENT
+    assert ledger.state('order-3', 'confirmation') == SENT
+    ledger.close()
+
+
+def test_cursor_catches_up_after_restart_and_never_goes_back(tmp_path):
+    ledger = SendLedger(str(tmp_path / 'sent_ledger.jsonl'))
+    ledger.advance('2026-10-19T12:00:00+00:00')
+    ledger.advance('2026-10-19T11:00:00+00:00')
+
+    ledger = reload(ledger)
+    assert ledger.cursor == '2026-10-19T12:00:00+00:00'
+    ledger.close()
+
+
+def test_compact_drops_old_entries_and_keeps_the_cursor(tmp_path):
+    now = [1_000_000.0]
+    ledger = SendLedger(str(tmp_path / 'sent_ledger.jsonl'), clock=lambda: now[0])
+    ledger.commit('old', 'confirmation')
+    now[0] += RETENTION + 1
+    ledger.commit('recent', 'confirmation')
+    ledger.advance('2026-10-19T12:00:00+00:00')
+    ledger.compact()
+
+    ledger = reload(ledger, clock=lambda: now[0])
+    assert ledger.state('old', 'confirmation') is None
+    assert ledger.state('recent', 'confirmation') == SENT
+    assert ledger.cursor == '2026-10-19T12:00:00+00:00'
+    ledger.close()
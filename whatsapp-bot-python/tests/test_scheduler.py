@@ -0,0 +1,29 @@
+"""python -m pytest tests (from whatsapp-bot-python/)"""
+
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import MessageScheduler, OpeningHours  # noqa: E402
+
+CLOSED_EVERY_DAY = [{'day_of_week': day, 'is_open': False} for day in range(7)]
+
+
+def test_next_open_when_never_open_is_later():
+    moment = datetime(2026, 10, 19, 12, 0)
+    assert OpeningHours(CLOSED_EVERY_DAY).next_open(moment) > moment
+
+
+def test_pop_due_when_never_open_defers_once(tmp_path):
+    now = datetime(2026, 10, 19, 12, 0).timestamp()
+    path = str(tmp_path / 'scheduled.jsonl')
+    scheduler = MessageScheduler(path, OpeningHours(CLOSED_EVERY_DAY), clock=lambda: now)
+    scheduler.schedule('feedback:1', now - 60, 'feedback', '0611111111')
+
+    assert scheduler.pop_due() == []
+    assert scheduler.next_due() > now
+    scheduler.close()
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 2  # Planned, then moved once
@@ -0,0 +1,298 @@
+"""
+Receipt-style order ticket image for WhatsApp
+
+Renders an Order (items, customizations, total, address/notes) and a QR code
+of the tracking portal into a compact PNG or WebP, so customers get one
+picture instead of a 30-line text wall.
+
+Pillow re-rasterizes text with FreeType on every call, which dominates the
+render time, so glyphs are rasterized once per font and lines are composed
+from them (repeated lines - labels, common items - are cached whole).
+Fonts, the logo, QR codes and the output palette are built once and kept in
+memory; the ticket is quantized to that fixed palette before PNG encoding.
+A warm ticket renders in a few milliseconds (see bench_ticket.py).
+"""
+
+import io
+import math
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+from message_templates import ORDER_TYPE_LABELS, item_details
+from models import as_order
+
+WIDTH = 576          # 80 mm thermal receipt at 180 dpi, also fits a phone screen
+MARGIN = 28
+LOGO_SIZE = 96
+QR_SIZE = 200
+BACKGROUND = (255, 255, 255)
+INK = (20, 20, 20)
+MUTED = (110, 110, 110)
+ACCENT = (200, 30, 45)
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(BOT_DIR, '..', 'public', 'favicon.png')
+
+# First font found wins (Windows, then common Linux locations); Pillow's default otherwise
+FONT_FILES = {
+    False: ('arial.ttf', 'C:/Windows/Fonts/arial.ttf', 'DejaVuSans.ttf',
+            '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'),
+    True: ('arialbd.ttf', 'C:/Windows/Fonts/arialbd.ttf', 'DejaVuSans-Bold.ttf',
+           '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+}
+
+# ===========================================
+# CACHED ASSETS
+# ===========================================
+
+class GlyphFont:
+    """FreeType font whose glyphs are rasterized once, then pasted"""
+
+    MAX_CACHED_LINES = 2048
+
+    def __init__(self, freetype):
+        self.font = freetype
+        ascent, descent = freetype.getmetrics()
+        self.height = ascent + descent
+        self._glyphs = {}
+        self._lines = {}
+
+    def glyph(self, char: str):
+        """(mask or None, x offset, y offset, advance) of one character"""
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            left, top, right, bottom = self.font.getbbox(char)
+            mask = None
+            if right > left and bottom > top:
+                mask = Image.new('L', (right - left, bottom - top), 0)
+                ImageDraw.Draw(mask).text((-left, -top), char, font=self.font, fill=255)
+            glyph = self._glyphs[char] = (mask, left, top, self.font.getlength(char))
+        return glyph
+
+    def width(self, text: str) -> float:
+        glyph = self.glyph
+        return sum(glyph(char)[3] for char in text)
+
+    def line_mask(self, text: str):
+        """Anti-aliased coverage mask of a whole line"""
+        mask = self._lines.get(text)
+        if mask is None:
+            mask = Image.new('L', (max(1, math.ceil(self.width(text)) + 2), self.height), 0)
+            x = 0.0
+            for char in text:
+                glyph_mask, left, top, advance = self.glyph(char)
+                if glyph_mask:
+                    mask.paste(255, (int(x + left), top), glyph_mask)
+                x += advance
+            if len(self._lines) >= self.MAX_CACHED_LINES:
+                self._lines.clear()
+            self._lines[text] = mask
+        return mask
+
+
+@lru_cache(maxsize=None)
+def font(size: int, bold: bool = False) -> GlyphFont:
+    for candidate in FONT_FILES[bold]:
+        try:
+            return GlyphFont(ImageFont.truetype(candidate, size))
+        except OSError:
+            continue
+    return GlyphFont(ImageFont.load_default(size))
+
+
+@lru_cache(maxsize=1)
+def logo():
+    """Logo resized once (None if the asset is missing)"""
+    try:
+        image = Image.open(LOGO_PATH).convert('RGBA')
+    except OSError:
+        return None
+    image.thumbnail((LOGO_SIZE, LOGO_SIZE), Image.LANCZOS)
+    return image
+
+
+@lru_cache(maxsize=256)
+def qr_code(url: str):
+    """QR code of `url`, already at QR_SIZE (the portal URL repeats per customer)"""
+    qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr.make_image(fill_color='black', back_color='white').get_image().convert('RGB') \
+        .resize((QR_SIZE, QR_SIZE), Image.NEAREST)
+
+
+@lru_cache(maxsize=1)
+def dashed_rule():
+    """Dashed separator, drawn once"""
+    rule = Image.new('RGB', (WIDTH - 2 * MARGIN, 1), BACKGROUND)
+    draw = ImageDraw.Draw(rule)
+    for x in range(0, rule.width, 12):
+        draw.line((x, 0, x + 6, 0), fill=MUTED, width=1)
+    return rule
+
+
+@lru_cache(maxsize=1)
+def palette():
+    """Fixed output palette: background, anti-aliasing ramps of each ink, logo colors"""
+    colors = [BACKGROUND]
+    for ink in (INK, MUTED, ACCENT):
+        for step in range(1, 17):
+            colors.append(tuple(round(b + (i - b) * step / 16) for i, b in zip(ink, BACKGROUND)))
+    colors.append((0, 0, 0))
+    header_logo = logo()
+    if header_logo:
+        quantized = header_logo.convert('RGB').quantize(256 - len(colors) - 1)
+        logo_palette = quantized.getpalette()[:3 * len(quantized.getcolors())]
+        colors.extend(tuple(logo_palette[i:i + 3]) for i in range(0, len(logo_palette), 3))
+    image = Image.new('P', (1, 1))
+    image.putpalette([channel for color in colors for channel in color])
+    return image
+
+# ===========================================
+# LAYOUT
+# ===========================================
+
+def _wrap(text: str, text_font, max_width: int) -> list:
+    """Greedy word wrap on measured widths"""
+    if text_font.width(text) <= max_width:
+        return [text]
+    space = text_font.width(' ')
+    lines, current, current_width = [], '', 0.0
+    for word in text.split():
+        word_width = text_font.width(word)
+        if current and current_width + space + word_width > max_width:
+            lines.append(current)
+            current, current_width = word, word_width
+        elif current:
+            current, current_width = f"{current} {word}", current_width + space + word_width
+        else:
+            current, current_width = word, word_width
+    if current:
+        lines.append(current)
+    return lines or ['']
+
+
+class _Layout:
+    """Draw operations collected with their y offsets, so the canvas is allocated at the exact height"""
+
+    def __init__(self):
+        self.ops = []
+        self.y = MARGIN
+
+    def text(self, text: str, size: int, bold: bool = False, fill=INK, align: str = 'left',
+             indent: int = 0, right: str = None, gap: int = 6):
+        text_font = font(size, bold)
+        max_width = WIDTH - 2 * MARGIN - indent
+        if right:
+            max_width -= int(text_font.width(right)) + 12
+        for index, line in enumerate(_wrap(text, text_font, max_width)):
+            self.ops.append(('text', self.y, line, text_font, fill, align, indent,
+                             right if index == 0 else None))
+            self.y += size + gap
+
+    def rule(self, gap: int = 12):
+        self.y += gap // 2
+        self.ops.append(('rule', self.y))
+        self.y += gap
+
+    def image(self, image, gap: int = 10):
+        self.ops.append(('image', self.y, image))
+        self.y += image.height + gap
+
+    def render(self):
+        height = self.y + MARGIN
+        canvas = Image.new('RGB', (WIDTH, height), BACKGROUND)
+        for op in self.ops:
+            kind, y = op[0], op[1]
+            if kind == 'text':
+                _, _, line, text_font, fill, align, indent, right = op
+                mask = text_font.line_mask(line)
+                if align == 'center':
+                    x = (WIDTH - mask.width) // 2
+                else:
+                    x = MARGIN + indent
+                canvas.paste(fill, (x, y), mask)
+                if right:
+                    right_mask = text_font.line_mask(right)
+                    canvas.paste(fill, (WIDTH - MARGIN - right_mask.width, y), right_mask)
+            elif kind == 'rule':
+                canvas.paste(dashed_rule(), (MARGIN, y))
+            else:
+                image = op[2]
+                x = (WIDTH - image.width) // 2
+                if image.mode == 'RGBA':
+                    canvas.paste(image, (x, y), image)
+                else:
+                    canvas.paste(image, (x, y))
+        return canvas
+
+
+def render_ticket_image(order, portal_url: str = '', shop_name: str = 'TWIN PIZZA'):
+    """Ticket of `order` (Order or raw row) as a PIL image"""
+    order = as_order(order)
+    layout = _Layout()
+
+    header_logo = logo()
+    if header_logo:
+        layout.image(header_logo, gap=4)
+    layout.text(shop_name, 34, bold=True, fill=ACCENT, align='center', gap=10)
+    layout.text(f"Commande N{order.order_number}", 28, bold=True, align='center')
+    created = order.created_at or datetime.now().isoformat()
+    when = created[:16].replace('T', ' ')
+    order_type = ORDER_TYPE_LABELS.get(order.order_type, order.order_type)
+    layout.text(f"{order_type} - {when}" if order_type else when, 18, fill=MUTED, align='center')
+    layout.rule()
+
+    items = order.items
+    if not items:
+        layout.text('(aucun article)', 20, fill=MUTED)
+    for item in items:
+        price = f"{item.price:.2f} EUR" if item.price else None
+        layout.text(f"{item.quantity}x {item.name}", 22, bold=True, right=price, gap=4)
+        details = item_details(item)
+        if details:
+            layout.text(' | '.join(details).replace('*', ''), 17, fill=MUTED, indent=18, gap=4)
+        if item.note:
+            layout.text(f"Note: {item.note}", 17, fill=ACCENT, indent=18, gap=4)
+        layout.y += 6
+
+    layout.rule()
+    layout.text('TOTAL', 28, bold=True, right=f"{order.total:.2f} EUR")
+    if order.order_type == 'livraison' and order.customer_address:
+        layout.text(f"Adresse : {order.customer_address}", 18)
+    if order.customer_notes:
+        layout.text(f"Note : {order.customer_notes}", 18)
+
+    if portal_url:
+        layout.rule()
+        layout.image(qr_code(portal_url), gap=6)
+        layout.text('Suivez votre commande', 18, fill=MUTED, align='center')
+    layout.text('Merci pour votre confiance !', 20, bold=True, align='center')
+    return layout.render()
+
+
+def render_ticket(order, portal_url: str = '', image_format: str = 'PNG', shop_name: str = 'TWIN PIZZA') -> bytes:
+    """Encoded ticket (PNG or WEBP)"""
+    output = io.BytesIO()
+    image = render_ticket_image(order, portal_url, shop_name)
+    if image_format.upper() == 'WEBP':
+        image.save(output, 'WEBP', quality=80, method=0)
+    else:
+        # Fixed palette: no per-image color search, and an 8-bit PNG is ~10x smaller/faster to encode
+        image.quantize(palette=palette(), dither=Image.Dither.NONE).save(output, 'PNG', compress_level=1)
+    return output.getvalue()
+
+
+def save_ticket(order, folder: str, portal_url: str = '', image_format: str = 'PNG',
+                shop_name: str = 'TWIN PIZZA') -> str:
+    """Render the ticket to `folder`/ticket-<order number>.<ext> and return the path"""
+    order = as_order(order)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"ticket-{order.order_number}.{image_format.lower()}")
+    with open(path, 'wb') as f:
+        f.write(render_ticket(order, portal_url, image_format, shop_name))
+    return path
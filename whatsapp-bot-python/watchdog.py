@@ -0,0 +1,162 @@
+"""
+Health watchdog of a tenant's WhatsApp Web browser
+
+A WhatsApp Web tab left open for days keeps growing, and when Chrome
+crashed every later send failed until someone restarted the bot.
+`BrowserWatchdog.check()` probes the browser and tells the bot what to do:
+
+- liveness: any driver round-trip failing ("invalid session id", "chrome not
+  reachable"...) means Chrome is gone -> RESTART at once;
+- responsiveness: a tiny async script must come back within
+  `probe_timeout` seconds; a hung page is reloaded, then Chrome restarted
+  if it is still stuck;
+- memory: the JS heap of the page (CDP Runtime.getHeapUsage, or
+  performance.memory) above `heap_limit_mb` -> RELOAD while idle, RESTART if
+  the heap is still too big right after a reload;
+- age: the tab is reloaded every `tab_max_age` and Chrome restarted every
+  `browser_max_age` seconds, only while idle.
+
+The bot performs the action (bot.heal_browser) and reports the outcome with
+`recovered()`. Chrome restarts on the same persistent profile
+(whatsapp_session/), so WhatsApp stays linked without a new QR scan. The
+checks run in the tenant's worker thread, so queued messages simply wait
+for the browser to come back. The time-to-recovery of every outage is kept
+(`status()`, shown in the bot status line).
+"""
+
+import time
+from collections import deque
+
+from console import safe_print
+
+RELOAD = 'reload'
+RESTART = 'restart'
+
+# Resolves the async probe on the page's next task: fails if the page's main thread is stuck
+PROBE_SCRIPT = "var done = arguments[arguments.length - 1]; setTimeout(function () { done(1); }, 0);"
+
+
+class BrowserWatchdog:
+    """Probes one browser session and decides when to reload the tab or restart Chrome"""
+
+    def __init__(self, heap_limit_mb: float = 700, tab_max_age: float = 6 * 3600,
+                 browser_max_age: float = 24 * 3600, probe_timeout: float = 10, retry_after: float = 60,
+                 max_retry_after: float = 1800, clock=time.monotonic):
+        self.heap_limit_mb = heap_limit_mb
+        self.tab_max_age = tab_max_age
+        self.browser_max_age = browser_max_age
+        self.probe_timeout = probe_timeout
+        self.base_retry_after = self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._clock = clock
+        self.browser_started = self.tab_loaded = self.last_probe = clock()
+        self.heap_mb = None
+        self.latency = None
+        self.failures = 0        # Consecutive failed probes
+        self.down_since = None   # Start of the current outage
+        self.next_attempt = 0.0  # No new repair before this (after a failed restart)
+        self.restarts = 0
+        self.reloads = 0
+        self.recovery_times = deque(maxlen=20)
+
+    # ---- probes --------------------------------------------------------
+
+    def _heap(self, driver):
+        """Used JS heap of the page in MB (None if the browser can't tell)"""
+        try:
+            return driver.execute_cdp_cmd('Runtime.getHeapUsage', {})['usedSize'] / 2 ** 20
+        except Exception:
+            pass
+        try:
+            used = driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null")
+            return used / 2 ** 20 if used else None
+        except Exception:
+            return None
+
+    def probe(self, driver):
+        """None if the browser answers in time, else the reason"""
+        if driver is None:
+            return "navigateur ferme"
+        started = self._clock()
+        try:
+            driver.set_script_timeout(self.probe_timeout)
+            driver.execute_async_script(PROBE_SCRIPT)
+        except Exception as e:
+            return str(e).strip().split('\n')[0][:120] or type(e).__name__
+        self.latency = self._clock() - started
+        self.heap_mb = self._heap(driver)
+        return None
+
+    def due(self, interval: float) -> bool:
+        return self._clock() - self.last_probe >= interval
+
+    def suspect(self):
+        """A send failed oddly: probe before the next one"""
+        self.last_probe = float('-inf')
+
+    def check(self, driver, idle: bool):
+        """Probe now; returns RELOAD / RESTART when the bot should act, else None"""
+        now = self.last_probe = self._clock()
+        problem = self.probe(driver)
+        if problem:
+            self.failures += 1
+            if self.down_since is None:
+                self.down_since = now
+                safe_print(f"[WARN] Navigateur WhatsApp ne repond pas ({problem})")
+            if now < self.next_attempt:
+                return None  # Sends fail fast meanwhile (SMS fallbacks, recovery)
+            # Only a hung page can be saved by a reload, and only the first time
+            hung = 'timeout' in problem.lower() or 'timed out' in problem.lower()
+            return RELOAD if hung and self.failures == 1 else RESTART
+        self.failures = 0
+        if self.down_since is not None:
+            self.recovered(None, True)
+        if not idle:
+            return None
+        if self.heap_mb is not None and self.heap_mb > self.heap_limit_mb:
+            # A fresh page that is already too big: only a new browser helps (never twice in 10 min)
+            action = RELOAD if now - self.tab_loaded >= 600 else RESTART if now - self.browser_started >= 600 else None
+            if action:
+                safe_print(f"[*] Memoire de WhatsApp Web: {self.heap_mb:.0f} Mo (limite {self.heap_limit_mb:.0f} Mo)")
+                return action
+        if now - self.browser_started >= self.browser_max_age:
+            return RESTART
+        if now - self.tab_loaded >= self.tab_max_age:
+            return RELOAD
+        return None
+
+    def recovered(self, action, ok: bool):
+        """Outcome of a reload / restart (`action` None: the browser came back by itself)"""
+        now = self._clock()
+        if not ok:
+            # e.g. WhatsApp unlinked (QR code to scan): retry later, less and less often
+            self.next_attempt = now + self.retry_after
+            safe_print(f"[WARN] Navigateur WhatsApp non retabli - nouvel essai dans {self.retry_after:.0f}s")
+            self.retry_after = min(self.max_retry_after, self.retry_after * 2)
+            return
+        self.retry_after = self.base_retry_after
+        if action == RESTART:
+            self.restarts += 1
+            self.browser_started = self.tab_loaded = now
+        elif action == RELOAD:
+            self.reloads += 1
+            self.tab_loaded = now
+        self.failures = 0
+        self.last_probe = now
+        if self.down_since is not None:
+            seconds = now - self.down_since
+            self.recovery_times.append(seconds)
+            self.down_since = None
+            safe_print(f"[OK] Navigateur WhatsApp retabli en {seconds:.0f}s")
+
+    def status(self) -> str:
+        parts = []
+        if self.heap_mb is not None:
+            parts.append(f"tas JS {self.heap_mb:.0f} Mo")
+        if self.reloads or self.restarts:
+            parts.append(f"{self.reloads} rechargement(s), {self.restarts} redemarrage(s)")
+        if self.recovery_times:
+            parts.append(f"dernier retablissement {self.recovery_times[-1]:.0f}s")
+        if self.down_since is not None:
+            parts.append(f"HORS SERVICE depuis {self._clock() - self.down_since:.0f}s")
+        return ', '.join(parts)